@@ -0,0 +1,113 @@
+"""
+Side-by-side concurrency benchmark of the sync (WSGI) and async (ASGI) hot endpoints.
+
+Starts gunicorn with sync workers for the DRF views and gunicorn with uvicorn workers for the
+async views, both against the same throwaway SQLite database, then drives each endpoint with
+concurrent clients:
+
+    python -m benchmarks.bench_async --workers 2 --concurrency 32 --requests 2000
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+ENDPOINTS = {
+    'wsgi': {
+        'game': ('GET', '/api/games/code/BNCH/'),
+        'submit': ('POST', '/api/submit-stats/'),
+        'count': ('GET', '/stats/count/BNCH/'),
+    },
+    'asgi': {
+        'game': ('GET', '/async/games/code/BNCH/'),
+        'submit': ('POST', '/async/submit-stats/'),
+        'count': ('GET', '/async/stats/count/BNCH/'),
+    },
+}
+
+SUBMISSION = json.dumps({'gameCode': 'BNCH', 'submittedGuesses': [['a', 'b', 'c', 'd']],
+                         'timeToGuess': [12.5], 'isGameWon': False})
+
+def prepare_database(env):
+    subprocess.run([sys.executable, 'manage.py', 'migrate', '--verbosity', '0'], env=env, check=True)
+    subprocess.run([sys.executable, 'manage.py', 'shell', '-c',
+                    "from connections_app.models import ConnectionsGame; "
+                    "ConnectionsGame.objects.create(title='Benchmark', game_code='BNCH', "
+                    "num_categories=4, words_per_category=4)"], env=env, check=True)
+
+def start_server(kind, port, workers, env):
+    if kind == 'wsgi':
+        command = ['gunicorn', 'connections_proj.wsgi', '--workers', str(workers)]
+    else:
+        command = ['gunicorn', 'connections_proj.asgi:application', '-k', 'uvicorn.workers.UvicornWorker',
+                   '--workers', str(workers)]
+    process = subprocess.Popen(command + ['--bind', f'127.0.0.1:{port}', '--log-level', 'warning'], env=env)
+    for _ in range(100):
+        if process.poll() is not None:
+            break
+        try:
+            # Wait for a response: the master accepts connections even when no worker could boot
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            return process
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f'{kind} server did not start')
+
+def request(port, method, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    start = time.perf_counter()
+    body = SUBMISSION if method == 'POST' else None
+    connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return time.perf_counter() - start, response.status
+
+def drive(port, method, path, total, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: request(port, method, path), range(total)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        'requests_per_second': round(total / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        'errors': sum(1 for _, code in results if code >= 400),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='benchmarks.settings',
+                   BENCH_DB=os.path.join(directory, 'bench.sqlite3'),
+                   BENCH_CACHE_DIR=os.path.join(directory, 'cache'))
+        prepare_database(env)
+        for port, kind in ((18001, 'wsgi'), (18002, 'asgi')):
+            server = start_server(kind, port, args.workers, env)
+            try:
+                for name, (method, path) in ENDPOINTS[kind].items():
+                    result = drive(port, method, path, args.requests, args.concurrency)
+                    print(json.dumps({'server': kind, 'endpoint': name, 'workers': args.workers,
+                                      'concurrency': args.concurrency, **result}), flush=True)
+            finally:
+                server.terminate()
+                server.wait()
+
+if __name__ == '__main__':
+    main()
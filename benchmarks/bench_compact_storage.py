@@ -0,0 +1,54 @@
+"""
+Compare JSON and compact submission storage: bytes per submission and time-distribution speed.
+
+Runs on synthetic in-memory rows encoded exactly as compact.py stores them:
+
+    python -m benchmarks.bench_compact_storage --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import time
+
+from benchmarks.utils import setup_django
+
+setup_django()
+
+from benchmarks.bench_time_distribution import make_categories, make_rows  # noqa: E402
+from connections_app.compact import encode_guesses, encode_times  # noqa: E402
+from connections_app.timing import stored_time_distribution  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    categories = make_categories()
+    vocabulary = sorted(word for words in categories for word in words)
+    word_bits = {word: bit for bit, word in enumerate(vocabulary)}
+    answer_key = {frozenset(words): tuple(sorted(words)) for words in categories}
+
+    for size in args.sizes:
+        rows = make_rows(size, categories)
+        json_rows = [(guesses, times, None, None) for guesses, times in rows]
+        compact_rows = [(None, None, encode_guesses(word_bits, guesses), encode_times(times)) for guesses, times in rows]
+        json_bytes = sum(len(json.dumps(guesses)) + len(json.dumps(times)) for guesses, times in rows)
+        compact_bytes = sum(len(masks) + len(times) for _, _, masks, times in compact_rows)
+
+        start = time.perf_counter()
+        stored_time_distribution(json_rows, answer_key, vocabulary)
+        json_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        stored_time_distribution(compact_rows, answer_key, vocabulary)
+        compact_seconds = time.perf_counter() - start
+
+        print(json.dumps({
+            'submissions': size,
+            'json_bytes_per_submission': round(json_bytes / size, 1),
+            'compact_bytes_per_submission': round(compact_bytes / size, 1),
+            'shrink': round(json_bytes / compact_bytes, 1),
+            'json_seconds': round(json_seconds, 4),
+            'compact_seconds': round(compact_seconds, 4),
+        }), flush=True)
+
+if __name__ == '__main__':
+    main()
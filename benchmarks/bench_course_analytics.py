@@ -0,0 +1,84 @@
+"""
+One course analytics request versus the per-game stats calls it replaces.
+
+    python -m benchmarks.bench_course_analytics --games 100 200 --submissions 200
+"""
+import argparse
+import json
+import random
+
+from benchmarks.utils import measure, setup_django, test_database
+
+setup_django()
+
+from django.core.cache import cache  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from connections_app.aggregates import rebuild_guess_counts  # noqa: E402
+from connections_app.models import ConnectionsGame, Category, Course, Submission, Word  # noqa: E402
+
+PER_GAME_ENDPOINTS = ('/stats/count/{}/', '/stats/guessdist/{}/', '/stats/timedist/{}/')
+
+def populate(course, num_games, submissions_per_game, seed=0, batch_size=5000):
+    rng = random.Random(seed)
+    start = ConnectionsGame.objects.count()
+    games = ConnectionsGame.objects.bulk_create([
+        ConnectionsGame(title=f'Game {i}', game_code=f'C{i:04d}', num_categories=4, words_per_category=4, course=course)
+        for i in range(start, start + num_games)
+    ])
+    categories = Category.objects.bulk_create([
+        Category(related_game=game, category=f'Category {i}', difficulty=i + 1)
+        for game in games for i in range(4)
+    ], batch_size=batch_size)
+    Word.objects.bulk_create([
+        Word(category=category, word=f'{category.related_game.game_code}-{category.category}-{j}')
+        for category in categories for j in range(4)
+    ], batch_size=batch_size)
+
+    submissions = []
+    for game in games:
+        answers = [[f'{game.game_code}-Category {i}-{j}' for j in range(4)] for i in range(4)]
+        for _ in range(submissions_per_game):
+            solved = rng.sample(answers, rng.randint(1, 4))
+            submissions.append(Submission(
+                game=game,
+                guesses=solved,
+                time_taken=[round(rng.uniform(1, 60), 2) for _ in solved],
+                is_won=len(solved) == 4,
+            ))
+    Submission.objects.bulk_create(submissions, batch_size=batch_size)
+    rebuild_guess_counts()
+
+def timed(client, urls):
+    cache.clear()
+    with measure() as result:
+        for url in urls:
+            response = client.get(url)
+            assert response.status_code == 200, response.content
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--games', nargs='+', type=int, default=[100, 200], help='Games per course')
+    parser.add_argument('--submissions', type=int, default=200, help='Submissions per game')
+    args = parser.parse_args()
+
+    with test_database():
+        client = APIClient()
+        for num_games in args.games:
+            course = Course.objects.create(name=f'{num_games} games', description='Benchmark')
+            populate(course, num_games, args.submissions)
+            codes = course.games.values_list('game_code', flat=True)
+            per_game = timed(client, [url.format(code) for code in codes for url in PER_GAME_ENDPOINTS])
+            analytics = timed(client, [f'/stats/course/{course.pk}/'])
+            print(json.dumps({
+                'games': num_games,
+                'submissions': num_games * args.submissions,
+                'per_game_ms': round(per_game['seconds'] * 1000, 2),
+                'per_game_queries': per_game['queries'],
+                'course_analytics_ms': round(analytics['seconds'] * 1000, 2),
+                'course_analytics_queries': analytics['queries'],
+            }), flush=True)
+
+if __name__ == '__main__':
+    main()
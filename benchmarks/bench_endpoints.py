@@ -0,0 +1,190 @@
+"""
+Latency, throughput and query counts of every route in connections_app/urls.py over synthetic data.
+
+Runs against a throwaway SQLite database, or a throwaway copy of the Postgres database in
+BENCH_DATABASE_URL, filled by the generate_synthetic_data command's generator:
+
+    python -m benchmarks.bench_endpoints --courses 5 --games 20 --submissions 200 --requests 200
+    BENCH_DATABASE_URL=postgres://localhost/connections python -m benchmarks.bench_endpoints
+
+Prints one JSON line per endpoint; save the output of a run to compare later changes against it.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+from datetime import timedelta
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+from benchmarks.utils import measure, setup_django, test_database  # noqa: E402
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.urls import URLResolver  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from connections_app import urls  # noqa: E402
+from connections_app.models import ConnectionsGame, Course, Submission  # noqa: E402
+from connections_app.rollups import rebuild_rollups  # noqa: E402
+from connections_app.synthetic import generate  # noqa: E402
+
+def upload_data(counter, game):
+    return {
+        'title': f'Benchmark upload {next(counter)}',
+        'author': 'bench_endpoints',
+        'course': game.course.name,
+        'syntax_highlighting': 'python',
+        'num_categories': 4,
+        'words_per_category': 4,
+        'relevant_info': '',
+        'game': [{'category': f'Category {i}', 'difficulty': i + 1, 'explanation': '',
+                  'words': [f'upload-{i}-{j}' for j in range(4)]} for i in range(4)],
+    }
+
+def submission_data(game, guesses):
+    return {'gameCode': game.game_code, 'submittedGuesses': guesses,
+            'timeToGuess': [12.5] * len(guesses), 'isGameWon': True}
+
+def endpoints(game):
+    """
+    (url name, method, path, request kwargs factory, needs admin) for every route, using game
+    and its course, categories, words and submissions. Deletes are left out so every request
+    sees the same data.
+    """
+    course = game.course
+    category = game.categories.first()
+    word = category.words.first()
+    submission = Submission.objects.filter(game=game).first()
+    guesses = [list(category.words.values_list('word', flat=True)) for category in game.categories.all()]
+    submit = submission_data(game, guesses)
+    counter = itertools.count()
+    get = lambda: {}  # noqa: E731
+    return [
+        ('course_games-list', 'get', '/api/courses/', get, False),
+        ('course_games-detail', 'get', f'/api/courses/{course.pk}/', get, False),
+        ('connectionsgame-list', 'get', '/api/connectionsgames/', get, False),
+        ('connectionsgame-detail', 'get', f'/api/connectionsgames/{game.pk}/', get, False),
+        ('public_upload-list', 'post', '/api/upload/', lambda: {'data': upload_data(counter, game), 'format': 'json'}, False),
+        ('category-list', 'get', '/api/categories/', get, False),
+        ('category-detail', 'get', f'/api/categories/{category.pk}/', get, False),
+        ('word-list', 'get', '/api/words/', get, False),
+        ('word-detail', 'get', f'/api/words/{word.pk}/', get, False),
+        ('app_submit-list', 'post', '/api/submit-stats/', lambda: {'data': submit, 'format': 'json'}, False),
+        ('app_submit-batch', 'post', '/api/submit-stats/batch/', lambda: {'data': [submit] * 20, 'format': 'json'}, False),
+        ('game-code-detail-list', 'get', f'/api/games/code/{game.game_code}/', get, False),
+        ('game-code-detail-detail', 'get', f'/api/games/code/{game.game_code}/{game.pk}/', get, False),
+        ('api-root', 'get', '/api/', get, False),
+        ('admin_create-list', 'post', '/admin-tools/create/', lambda: {'data': {'file_uploaded': SimpleUploadedFile(
+            'game.json', json.dumps(upload_data(counter, game)).encode(), content_type='application/json')}, 'format': 'multipart'}, True),
+        ('admin_games-list', 'get', '/admin-tools/games/', get, True),
+        ('admin_games-detail', 'get', f'/admin-tools/games/{game.pk}/', get, True),
+        ('admin_submissions-list', 'get', '/admin-tools/listsubmissions/', get, True),
+        ('admin_submissions-detail', 'get', f'/admin-tools/listsubmissions/{submission.pk}/', get, True),
+        ('admin_publish-detail', 'put', f'/admin-tools/publish/{game.game_code}/', get, True),
+        ('admin_courses-list', 'get', '/admin-tools/courses/', get, True),
+        ('admin_courses-detail', 'get', f'/admin-tools/courses/{course.pk}/', get, True),
+        ('admin_assign-detail', 'put', f'/admin-tools/assign/{game.game_code}/',
+         lambda: {'data': {'course': course.name}, 'format': 'json'}, True),
+        ('admin_export-list', 'get', f'/admin-tools/export/?game_code={game.game_code}', get, True),
+        ('admin_metrics-list', 'get', '/admin-tools/metrics/', get, True),
+        ('guess_distribution', 'get', f'/stats/guessdist/{game.game_code}/', get, False),
+        ('average_time_per_category', 'get', f'/stats/timedist/{game.game_code}/', get, False),
+        ('submission_count', 'get', f'/stats/count/{game.game_code}/', get, False),
+        ('course_analytics', 'get', f'/stats/course/{course.pk}/', get, False),
+        ('course_rollups', 'get', f'/stats/rollups/course/{course.pk}/', get, False),
+        ('game_rollups', 'get', f'/stats/rollups/{game.game_code}/', get, False),
+        ('async_game_code_detail', 'get', f'/async/games/code/{game.game_code}/', get, False),
+        ('async_submit', 'post', '/async/submit-stats/', lambda: {'data': submit, 'format': 'json'}, False),
+        ('async_submission_count', 'get', f'/async/stats/count/{game.game_code}/', get, False),
+    ]
+
+def route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from route_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+def percentile(ordered, fraction):
+    # Nearest rank
+    return ordered[max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))]
+
+def drive(client, method, path, make_kwargs, requests, warmup):
+    latencies = []
+    queries = []
+    errors = 0
+    for index in range(warmup + requests):
+        kwargs = make_kwargs()
+        with measure() as result:
+            response = getattr(client, method)(path, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        if index < warmup:
+            continue
+        latencies.append(result['seconds'])
+        queries.append(result['queries'])
+        errors += response.status_code >= 400
+    latencies.sort()
+    return {
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'requests_per_second': round(requests / sum(latencies), 1),
+        'queries_per_request': round(sum(queries) / requests, 2),
+        'max_queries': max(queries),
+        'errors': errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--courses', type=int, default=5)
+    parser.add_argument('--games', type=int, default=20, help='Games per course')
+    parser.add_argument('--submissions', type=int, default=200, help='Submissions per game')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint first')
+    parser.add_argument('--only', nargs='+', default=None, help='Only these url names')
+    args = parser.parse_args()
+
+    with test_database():
+        cache.clear()
+        created = generate(courses=args.courses, games_per_course=args.games,
+                           submissions_per_game=args.submissions, seed=args.seed)
+        rebuild_rollups(lag=timedelta(0))
+        game = ConnectionsGame.objects.filter(course=Course.objects.order_by('id').first()).order_by('id').first()
+
+        public = APIClient()
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_superuser('bench', 'bench@example.com', 'bench'))
+
+        table = endpoints(game)
+        missing = set(route_names(urls.urlpatterns)) - {name for name, *_ in table}
+        if missing:
+            print(f'Routes without a benchmark: {", ".join(sorted(missing))}', file=sys.stderr)
+
+        started = time.strftime('%Y-%m-%dT%H:%M:%S')
+        for name, method, path, make_kwargs, needs_admin in table:
+            if args.only and name not in args.only:
+                continue
+            result = drive(admin if needs_admin else public, method, path, make_kwargs, args.requests, args.warmup)
+            print(json.dumps({
+                'endpoint': name,
+                'method': method.upper(),
+                'path': path,
+                'database': connection.vendor,
+                'started': started,
+                **created,
+                **result,
+            }), flush=True)
+
+if __name__ == '__main__':
+    main()
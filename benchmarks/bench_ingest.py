@@ -0,0 +1,74 @@
+"""
+Compare game upload ingestion with the previous one-INSERT-per-row path.
+
+    python -m benchmarks.bench_ingest --games 50 --sizes 4x4 8x8 16x16
+"""
+import argparse
+import json
+
+from benchmarks.utils import measure, setup_django, test_database
+
+setup_django()
+
+from connections_app.ingest import ingest_game, validate_game_data  # noqa: E402
+from connections_app.models import ConnectionsGame, Category, Word, Course  # noqa: E402
+
+def make_data(num_categories, words_per_category):
+    return {
+        'title': 'Benchmark',
+        'author': 'Benchmark',
+        'course': 'benchmark',
+        'syntax_highlighting': 'python',
+        'num_categories': num_categories,
+        'words_per_category': words_per_category,
+        'game': [
+            {'category': f'Category {i}', 'difficulty': i + 1, 'explanation': '',
+             'words': [f'word-{i}-{j}' for j in range(words_per_category)]}
+            for i in range(num_categories)
+        ],
+    }
+
+def legacy_ingest(data, game_code):
+    # The per-row path both upload views used before the shared ingestion service
+    course, _ = Course.objects.get_or_create(name__iexact=data['course'])
+    game = ConnectionsGame.objects.create(
+        title=data['title'], game_code=game_code, author=data['author'],
+        syntax_highlighting=data['syntax_highlighting'], num_categories=data['num_categories'],
+        words_per_category=data['words_per_category'], course=course,
+    )
+    for category_data in data['game']:
+        category = Category.objects.create(related_game=game, category=category_data['category'],
+                                           difficulty=category_data['difficulty'],
+                                           explanation=category_data['explanation'])
+        for word in category_data['words']:
+            Word.objects.create(category=category, word=word)
+
+def service_ingest(data, game_code):
+    validate_game_data(data)
+    ingest_game(data, game_code, course_name=data['course'], create_course=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--games', type=int, default=50, help='Games ingested per measurement')
+    parser.add_argument('--sizes', nargs='+', default=['4x4', '8x8', '16x16'],
+                        help='Game sizes as <categories>x<words per category>')
+    args = parser.parse_args()
+
+    with test_database():
+        Course.objects.create(name='benchmark', description='')
+        counter = 0
+        for size in args.sizes:
+            num_categories, words_per_category = (int(part) for part in size.split('x'))
+            data = make_data(num_categories, words_per_category)
+            result = {'size': size, 'games': args.games}
+            for name, ingest in (('legacy', legacy_ingest), ('service', service_ingest)):
+                with measure() as stats:
+                    for _ in range(args.games):
+                        counter += 1
+                        ingest(data, f'{counter:04d}')
+                result[f'{name}_seconds'] = round(stats['seconds'], 4)
+                result[f'{name}_queries_per_game'] = stats['queries'] / args.games
+            print(json.dumps(result), flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Overhead of RequestTimingMiddleware: the same endpoints with and without it.
+
+    python -m benchmarks.bench_instrumentation --requests 500
+"""
+import argparse
+import json
+
+# Importing the endpoint benchmark sets Django up with the benchmark settings
+from benchmarks.bench_endpoints import drive, endpoints
+from benchmarks.utils import test_database
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from connections_app.models import ConnectionsGame
+from connections_app.synthetic import generate
+
+MIDDLEWARE = 'connections_proj.middleware.RequestTimingMiddleware'
+DEFAULT_ENDPOINTS = ['game-code-detail-list', 'submission_count', 'average_time_per_category', 'app_submit-list',
+                     'admin_games-list']
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--submissions', type=int, default=200, help='Submissions per game')
+    parser.add_argument('--requests', type=int, default=500, help='Timed requests per endpoint and setup')
+    parser.add_argument('--endpoints', nargs='+', default=DEFAULT_ENDPOINTS, help='Url names to drive')
+    args = parser.parse_args()
+
+    with test_database():
+        cache.clear()
+        generate(games_per_course=args.games, submissions_per_game=args.submissions)
+        game = ConnectionsGame.objects.order_by('id').first()
+        admin = User.objects.create_superuser('bench', 'bench@example.com', 'bench')
+        without = [name for name in settings.MIDDLEWARE if name != MIDDLEWARE]
+        for name, method, path, make_kwargs, needs_admin in endpoints(game):
+            if name not in args.endpoints:
+                continue
+            results = {}
+            for label, middleware in (('without', without), ('with', [MIDDLEWARE] + without)):
+                with override_settings(MIDDLEWARE=middleware):
+                    # A new client loads the overridden middleware
+                    client = APIClient()
+                    if needs_admin:
+                        client.force_authenticate(admin)
+                    results[label] = drive(client, method, path, make_kwargs, args.requests, warmup=10)
+            print(json.dumps({
+                'endpoint': name,
+                'requests': args.requests,
+                'p50_ms_without': results['without']['p50_ms'],
+                'p50_ms_with': results['with']['p50_ms'],
+                'p99_ms_without': results['without']['p99_ms'],
+                'p99_ms_with': results['with']['p99_ms'],
+                'overhead_p50_ms': round(results['with']['p50_ms'] - results['without']['p50_ms'], 3),
+            }), flush=True)
+
+if __name__ == '__main__':
+    main()
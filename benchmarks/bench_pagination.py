@@ -0,0 +1,68 @@
+"""
+Deep-page latency of /api/words/ with page numbers versus keyset cursors.
+
+    python -m benchmarks.bench_pagination --words 200000 --page-size 100 --depths 1 100 1000 1999
+"""
+import argparse
+import json
+
+from benchmarks.utils import measure, setup_django, test_database
+
+setup_django()
+
+from rest_framework.test import APIClient  # noqa: E402
+
+from connections_app.models import ConnectionsGame, Category, Word  # noqa: E402
+from connections_app.pagination import KeysetPagination  # noqa: E402
+
+def populate(num_words, words_per_category=4, batch_size=5000):
+    game = ConnectionsGame.objects.create(title='Benchmark', game_code='PAGE', num_categories=0, words_per_category=0)
+    categories = Category.objects.bulk_create(
+        [Category(related_game=game, category=f'Category {i}', difficulty=1) for i in range(num_words // words_per_category)],
+        batch_size=batch_size
+    )
+    Word.objects.bulk_create(
+        [Word(category=category, word=f'word-{i}-{j}') for i, category in enumerate(categories) for j in range(words_per_category)],
+        batch_size=batch_size
+    )
+
+def timed_get(client, params, repeat):
+    best = None
+    for _ in range(repeat):
+        with measure() as result:
+            response = client.get('/api/words/', params)
+        assert response.status_code == 200, response.content
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--words', type=int, default=200000)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--depths', nargs='+', type=int, default=[1, 100, 1000, 1999], help='Page numbers to fetch')
+    parser.add_argument('--repeat', type=int, default=5, help='Requests per measurement; the fastest is reported')
+    args = parser.parse_args()
+
+    with test_database():
+        populate(args.words)
+        client = APIClient()
+        ids = list(Word.objects.order_by('id').values_list('id', flat=True))
+        for depth in args.depths:
+            page = timed_get(client, {'page': depth, 'page_size': args.page_size}, args.repeat)
+            params = {'pagination': 'cursor', 'page_size': args.page_size}
+            if depth > 1:
+                # The cursor a client would hold after walking to this page
+                params['cursor'] = KeysetPagination().encode_cursor([ids[(depth - 1) * args.page_size - 1]], False)
+            cursor = timed_get(client, params, args.repeat)
+            print(json.dumps({
+                'words': args.words,
+                'page': depth,
+                'page_number_ms': round(page['seconds'] * 1000, 2),
+                'page_number_queries': page['queries'],
+                'cursor_ms': round(cursor['seconds'] * 1000, 2),
+                'cursor_queries': cursor['queries'],
+            }), flush=True)
+
+if __name__ == '__main__':
+    main()
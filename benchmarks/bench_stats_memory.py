@@ -0,0 +1,80 @@
+"""
+Measure peak Python memory of the time distribution stats against the number of submissions.
+
+Compares the streaming pipeline the view uses with materializing every Submission, which is
+what the stats views did before. Runs against a throwaway test database:
+
+    python -m benchmarks.bench_stats_memory --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import random
+import tracemalloc
+
+from benchmarks.utils import setup_django, test_database
+
+setup_django()
+
+from connections_app.models import ConnectionsGame, Category, Word, Submission  # noqa: E402
+from connections_app.stats import stream_submissions  # noqa: E402
+from connections_app.timing import build_answer_key, guess_time_distribution  # noqa: E402
+
+def make_game():
+    game = ConnectionsGame.objects.create(title='Memory benchmark', game_code='MEMB',
+                                          num_categories=4, words_per_category=4)
+    categories = []
+    for i in range(4):
+        category = Category.objects.create(related_game=game, category=f'Category {i}', difficulty=i + 1)
+        words = [f'word-{i}-{j}' for j in range(4)]
+        Word.objects.bulk_create([Word(category=category, word=word) for word in words])
+        categories.append(words)
+    return game, categories
+
+def add_submissions(game, categories, count, seed=0):
+    rng = random.Random(seed)
+    batch = []
+    for _ in range(count):
+        guesses = [rng.sample(words, len(words)) for words in rng.sample(categories, len(categories))]
+        batch.append(Submission(game=game, guesses=guesses, time_taken=[rng.uniform(2, 60) for _ in guesses],
+                                is_won=True))
+        if len(batch) == 5000:
+            Submission.objects.bulk_create(batch)
+            batch = []
+    Submission.objects.bulk_create(batch)
+
+def peak_memory(func):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    with test_database():
+        game, categories = make_game()
+        answer_key = build_answer_key(game)
+        total = 0
+        for size in sorted(args.sizes):
+            add_submissions(game, categories, size - total)
+            total = size
+            submissions = Submission.objects.filter(game=game)
+
+            def streaming():
+                guess_time_distribution(stream_submissions(submissions, 'guesses', 'time_taken'), answer_key)
+
+            def materialized():
+                rows = [(s.guesses, s.time_taken) for s in Submission.objects.filter(game=game)]
+                guess_time_distribution(rows, answer_key)
+
+            print(json.dumps({
+                'submissions': size,
+                'streaming_peak_kib': round(peak_memory(streaming) / 1024, 1),
+                'materialized_peak_kib': round(peak_memory(materialized) / 1024, 1),
+            }), flush=True)
+
+if __name__ == '__main__':
+    main()
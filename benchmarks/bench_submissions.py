@@ -0,0 +1,65 @@
+"""
+Compare submission throughput of the synchronous and buffered write paths.
+
+Posts submissions through the full Django/DRF stack with the test client:
+
+    python -m benchmarks.bench_submissions --requests 2000
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+
+from benchmarks.utils import measure, setup_django, test_database
+
+setup_django()
+
+from django.test import override_settings  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from connections_app.buffer import get_submission_buffer  # noqa: E402
+from connections_app.models import ConnectionsGame, Submission  # noqa: E402
+
+def payloads(count, seed=0):
+    rng = random.Random(seed)
+    words = [f'word-{i}' for i in range(16)]
+    for _ in range(count):
+        guesses = [rng.sample(words, 4) for _ in range(rng.randint(4, 7))]
+        yield {'gameCode': 'BNCH', 'submittedGuesses': guesses,
+               'timeToGuess': [round(rng.uniform(2, 60), 2) for _ in guesses], 'isGameWon': True}
+
+def run(mode, count, fsync, directory):
+    client = APIClient()
+    with override_settings(SUBMISSION_WRITE_MODE=mode, SUBMISSION_BUFFER_DIR=directory,
+                           SUBMISSION_BUFFER_MAX_BATCH=200, SUBMISSION_BUFFER_MAX_DELAY=3600,
+                           SUBMISSION_BUFFER_FSYNC=fsync):
+        Submission.objects.all().delete()
+        start = time.perf_counter()
+        with measure() as stats:
+            for payload in payloads(count):
+                client.post('/api/submit-stats/', payload, format='json')
+            accepted = time.perf_counter() - start
+            if mode == 'buffered':
+                get_submission_buffer().flush()
+        assert Submission.objects.count() == count
+    return {
+        'mode': mode if mode == 'sync' else f'{mode}{"" if fsync else " (no fsync)"}',
+        'requests': count,
+        'accept_per_second': round(count / accepted, 1),
+        'end_to_end_per_second': round(count / stats['seconds'], 1),
+        'queries_per_submission': round(stats['queries'] / count, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    with test_database(), tempfile.TemporaryDirectory() as directory:
+        ConnectionsGame.objects.create(title='Benchmark', game_code='BNCH', num_categories=4, words_per_category=4)
+        for mode, fsync in (('sync', True), ('buffered', True), ('buffered', False)):
+            print(json.dumps(run(mode, args.requests, fsync, directory)), flush=True)
+
+if __name__ == '__main__':
+    main()
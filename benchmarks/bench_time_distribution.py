@@ -0,0 +1,76 @@
+"""
+Benchmark the average-time-per-category engine against the previous implementation.
+
+Runs on synthetic in-memory rows, so it measures the algorithm rather than the database:
+
+    python -m benchmarks.bench_time_distribution --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import json
+import random
+import time
+
+from collections import defaultdict
+
+from benchmarks.utils import setup_django
+
+setup_django()
+
+from connections_app.timing import guess_time_distribution  # noqa: E402
+
+def make_categories(num_categories=4, words_per_category=4):
+    return [[f'word-{i}-{j}' for j in range(words_per_category)] for i in range(num_categories)]
+
+def make_rows(count, categories, seed=0):
+    rng = random.Random(seed)
+    all_words = [word for words in categories for word in words]
+    rows = []
+    for _ in range(count):
+        guesses = []
+        for words in rng.sample(categories, len(categories)):
+            while rng.random() < 0.3:
+                guesses.append(rng.sample(all_words, len(words)))
+            guesses.append(rng.sample(words, len(words)))
+        rows.append((guesses, [round(rng.uniform(2, 60), 2) for _ in guesses]))
+    return rows
+
+def legacy_guess_time_distribution(rows, correct_categories):
+    # The implementation this engine replaced, kept here as the baseline
+    guess_distribution = defaultdict(lambda: {'total_time': 0, 'count': 0})
+    for guesses, time_taken in rows:
+        for guess_group in guesses:
+            sorted_group = sorted(guess_group)
+            if sorted_group in correct_categories:
+                index = guesses.index(guess_group)
+                guess_distribution[tuple(sorted_group)]['total_time'] += time_taken[index]
+                guess_distribution[tuple(sorted_group)]['count'] += 1
+    return {group: (round(values['total_time'] / values['count'], 2), values['count'])
+            for group, values in guess_distribution.items()}
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--skip-legacy', action='store_true', help='Only time the new engine')
+    args = parser.parse_args()
+
+    categories = make_categories()
+    correct_categories = [sorted(words) for words in categories]
+    answer_key = {frozenset(words): tuple(sorted(words)) for words in categories}
+
+    results = []
+    for size in args.sizes:
+        rows = make_rows(size, categories)
+        result = {'submissions': size, 'engine_seconds': round(timed(guess_time_distribution, rows, answer_key), 4)}
+        if not args.skip_legacy:
+            result['legacy_seconds'] = round(timed(legacy_guess_time_distribution, rows, correct_categories), 4)
+            result['speedup'] = round(result['legacy_seconds'] / result['engine_seconds'], 2)
+        results.append(result)
+        print(json.dumps(result), flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import os
+import time
+
+from contextlib import contextmanager
+
+import django
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'connections_proj.settings')
+    django.setup()
+
+@contextmanager
+def test_database():
+    """
+    Run the block against a freshly migrated throwaway database, like the test runner does.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+@contextmanager
+def measure():
+    """
+    Collect wall time and query count for the block into the yielded dict.
+    """
+    from django.db import connection
+
+    result = {'queries': 0}
+
+    def count_query(execute, sql, params, many, context):
+        result['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_query):
+        start = time.perf_counter()
+        yield result
+        result['seconds'] = time.perf_counter() - start
@@ -1,22 +1,32 @@
 import json
-import random
 
 from django.core.exceptions import ValidationError
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
 from rest_framework import status
+from rest_framework.exceptions import ValidationError as DRFValidationError
 from rest_framework import viewsets
 from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
-from .models import ConnectionsGame, Category, Word, Submission, Course
+from .aggregates import rebuild_guess_counts
+from .cache import invalidate_game_payloads
+from .codes import create_with_game_code
+from .compact import decode_submission, load_vocabularies
+from .export import CONTENT_TYPES, EXPORT_FORMATS, export_filename, stream_export
+from .ingest import ingest_game, validate_game_data
+from .metrics import render as render_metrics
+from .models import ConnectionsGame, Submission, Course
+from .pagination import KeysetPagination
 from .serializers import SubmissionSerializer, ConnectionsGameSerializer, UploadSerializer, CourseSerializer
+from .stats import filter_submissions
 from rest_framework.decorators import action
 
 class AdminGameViewSet(ModelViewSet):
     permission_classes = [IsAdminUser]
-    queryset = ConnectionsGame.objects.all()
+    queryset = ConnectionsGame.objects.with_related().order_by('id')
     serializer_class = ConnectionsGameSerializer
 
     def get_queryset(self):
@@ -32,15 +42,68 @@ class AdminGameViewSet(ModelViewSet):
             try:
                 game = ConnectionsGame.objects.get(game_code=game_code)
                 game.delete()
+                invalidate_game_payloads(game_code)
                 return Response(status=status.HTTP_204_NO_CONTENT)
             except ConnectionsGame.DoesNotExist:
                 return Response({'status': 'error', 'message': 'Game not found.'}, status=status.HTTP_404_NOT_FOUND)
         return super().destroy(request, *args, **kwargs)
 
+    def perform_update(self, serializer):
+        old_code = serializer.instance.game_code
+        game = serializer.save()
+        invalidate_game_payloads(old_code, game.game_code)
+
+    def perform_destroy(self, instance):
+        game_code = instance.game_code
+        instance.delete()
+        invalidate_game_payloads(game_code)
+
+class SubmissionCursorPagination(KeysetPagination):
+    # Served by the (submitted_at, id) index, or (game, submitted_at) when filtered by game
+    ordering = ('submitted_at', 'id')
+    page_size = 100
+
 class AdminSubmissionsViewSet(ModelViewSet):
+    """
+    Submissions, oldest first, a cursor page at a time. The list can be filtered with
+    game_code, course (id) and since / until on submitted_at.
+    """
     permission_classes = [IsAdminUser]
     queryset = Submission.objects.all()
     serializer_class = SubmissionSerializer
+    pagination_class = SubmissionCursorPagination
+
+    def get_queryset(self):
+        submissions = super().get_queryset()
+        if self.action != 'list':
+            return submissions
+        try:
+            return filter_submissions(submissions, self.request.query_params)
+        except ValueError as e:
+            raise DRFValidationError({'status': 'error', 'message': str(e)})
+
+    # Admin edits are rare, so rebuild the affected games' guess counts rather than patch them
+    def perform_create(self, serializer):
+        submission = serializer.save()
+        rebuild_guess_counts([submission.game_id])
+
+    def perform_update(self, serializer):
+        old_game_id = serializer.instance.game_id
+        # Edited rows are stored as JSON: compact guesses would decode against the wrong
+        # vocabulary if the submission moved to another game
+        instance = serializer.instance
+        vocabularies = load_vocabularies([old_game_id]) if instance.guess_masks is not None else {}
+        guesses, time_taken = decode_submission(instance.guesses, instance.time_taken, instance.guess_masks,
+                                                instance.time_ms, vocabularies.get(old_game_id))
+        stored = {field: value for field, value in (('guesses', guesses), ('time_taken', time_taken))
+                  if field not in serializer.validated_data}
+        submission = serializer.save(guess_masks=None, time_ms=None, **stored)
+        rebuild_guess_counts({old_game_id, submission.game_id})
+
+    def perform_destroy(self, instance):
+        game_id = instance.game_id
+        instance.delete()
+        rebuild_guess_counts([game_id])
 
 class UploadViewSet(viewsets.ViewSet):
     permission_classes = [IsAdminUser]
@@ -84,46 +147,11 @@ class UploadViewSet(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     def update_database(self, data) -> str:
-        unique_game_code = self.generate_game_code()
-        try:
-            course_name = data['course'].strip().lower()
-            course = Course.objects.get(name__iexact=course_name)
-            game = ConnectionsGame.objects.create(
-                title=data.get('title', 'untitled game'),
-                game_code=unique_game_code,
-                author=data.get('author', 'unknown author'),
-                syntax_highlighting=data['syntax_highlighting'],
-                num_categories=data['num_categories'],
-                words_per_category=data['words_per_category'],
-                course=course,
-                published=True,
-                relevant_info=data['relevant_info']
-            )
-
-            for category_data in data['game']:
-                category = Category.objects.create(
-                    related_game=game,
-                    category=category_data['category'],
-                    difficulty=category_data['difficulty'],
-                    explanation=category_data['explanation']
-                )
-
-                for word in category_data['words']:
-                    Word.objects.create(
-                        category=category,
-                        word=word
-                    )
-        except Exception as e:
-            raise e
-        return unique_game_code
-    
-    @staticmethod
-    def generate_game_code() -> str:
-        consonants = 'BCDFGHJKLMNPQRSTVWXYZ'  # All uppercase consonants
-        while True:
-            game_code = ''.join(random.choices(consonants, k=4))
-            if not ConnectionsGame.objects.filter(game_code=game_code).exists():
-                return game_code
+        validate_game_data(data, required=('course', 'syntax_highlighting', 'num_categories', 'words_per_category', 'relevant_info'))
+        game = create_with_game_code(lambda game_code: ingest_game(
+            data, game_code, course_name=data['course'], published=True,
+            defaults={'title': 'untitled game', 'author': 'unknown author'}))
+        return game.game_code
 
 class PublishGameViewSet(viewsets.ViewSet):
     permission_classes = [IsAdminUser]
@@ -134,6 +162,7 @@ class PublishGameViewSet(viewsets.ViewSet):
             game = ConnectionsGame.objects.get(game_code=game_code)
             game.published = not game.published
             game.save()
+            invalidate_game_payloads(game_code)
             return Response({'status': 'success', 'message': f'Game {game_code} publish status toggled to {game.published}'}, status=status.HTTP_200_OK)
         except ConnectionsGame.DoesNotExist:
             return Response({'status': 'error', 'message': 'Game not found.'}, status=status.HTTP_404_NOT_FOUND)
@@ -151,17 +180,21 @@ class AdminCourseViewSet(ModelViewSet):
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
+        # Every game in the course embeds the course, so their cached payloads are now stale
+        invalidate_game_payloads(*instance.games.values_list('game_code', flat=True))
         return Response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
+        game_codes = list(instance.games.values_list('game_code', flat=True))
         self.perform_destroy(instance)
+        invalidate_game_payloads(*game_codes)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def list_games(self, request, course_id=None):
         try:
             course = Course.objects.get(id=course_id)
-            games = ConnectionsGame.objects.filter(course=course)
+            games = ConnectionsGame.objects.with_related().filter(course=course).order_by('id')
             page = self.paginate_queryset(games)
             if page is not None:
                 serializer = ConnectionsGameSerializer(page, many=True)
@@ -191,11 +224,12 @@ class AssignGameToCourseViewSet(viewsets.ViewSet):
             if not course_name:
                 return Response({'status': 'error', 'message': 'course_name is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            game = ConnectionsGame.objects.get(game_code=game_code)
+            game = ConnectionsGame.objects.with_related().get(game_code=game_code)
             course = Course.objects.get(name__iexact=course_name)
 
             game.course = course
             game.save()
+            invalidate_game_payloads(game_code)
 
             serializer = ConnectionsGameSerializer(game)
             return Response({'status': 'success', 'message': f'Game {game_code} assigned to course {course_name}', 'game': serializer.data}, status=status.HTTP_200_OK)
@@ -205,3 +239,38 @@ class AssignGameToCourseViewSet(viewsets.ViewSet):
             return Response({'status': 'error', 'message': 'Course not found.'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class SubmissionExportViewSet(viewsets.ViewSet):
+    """
+    Stream submissions as NDJSON (default) or CSV with ?output=csv, gzip-compressed with ?gzip=true.
+    Takes the same game_code, course, since and until filters as the submission list.
+    """
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        params = request.query_params
+        export_format = params.get('output', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'status': 'error', 'message': f'output must be one of {", ".join(EXPORT_FORMATS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        compress = params.get('gzip', '').lower() in ('1', 'true', 'yes')
+        try:
+            submissions = filter_submissions(Submission.objects.all(), params)
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            stream_export(submissions, export_format, compress),
+            content_type='application/gzip' if compress else CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(export_format, compress)}"'
+        return response
+
+class MetricsViewSet(viewsets.ViewSet):
+    """
+    Request, submission and cache metrics of every worker, in the Prometheus text format.
+    """
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,132 @@
+import hashlib
+import json
+
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from .compact import load_vocabularies, mask_format, unpack
+from .models import GuessGroupCount, Submission
+
+def normalize_guess_group(guess_group):
+    """
+    Return the sorted guess group and its hash, or None if it is not a list of words.
+    """
+    if not isinstance(guess_group, list):
+        return None
+    try:
+        sorted_group = sorted(guess_group)
+    except TypeError:
+        return None
+    group_hash = hashlib.sha1(json.dumps(sorted_group).encode()).hexdigest()
+    return group_hash, sorted_group
+
+def count_guess_groups(guesses):
+    """
+    Count the normalized guess groups in one submission's guesses.
+    """
+    counts = Counter()
+    groups = {}
+    for guess_group in guesses or []:
+        normalized = normalize_guess_group(guess_group)
+        if normalized is None:
+            continue
+        group_hash, sorted_group = normalized
+        counts[group_hash] += 1
+        groups[group_hash] = sorted_group
+    return counts, groups
+
+def record_guesses(game_id, guesses) -> None:
+    """
+    Add one submission's guesses to the game's guess group counts.
+    """
+    record_guesses_batch([(game_id, guesses)])
+
+def record_guesses_batch(submissions) -> None:
+    """
+    Add the guesses of many (game_id, guesses) submissions to the guess group counts.
+
+    Missing rows are inserted with a zero count, then rows are incremented in place with one
+    UPDATE per distinct (game, increment) pair, so concurrent writers never lose updates and
+    the query count does not grow with the number of submissions.
+    """
+    counts = Counter()
+    groups = {}
+    for game_id, guesses in submissions:
+        submission_counts, submission_groups = count_guess_groups(guesses)
+        for group_hash, increment in submission_counts.items():
+            counts[game_id, group_hash] += increment
+        groups.update(submission_groups)
+    if not counts:
+        return
+
+    with transaction.atomic():
+        GuessGroupCount.objects.bulk_create(
+            [GuessGroupCount(game_id=game_id, group_hash=group_hash, guess_group=groups[group_hash], count=0)
+             for game_id, group_hash in counts],
+            ignore_conflicts=True
+        )
+        by_increment = defaultdict(list)
+        for (game_id, group_hash), increment in counts.items():
+            by_increment[game_id, increment].append(group_hash)
+        for (game_id, increment), group_hashes in by_increment.items():
+            GuessGroupCount.objects.filter(game_id=game_id, group_hash__in=group_hashes).update(
+                count=F('count') + increment
+            )
+
+def count_stored_guess_groups(rows, vocabularies=None):
+    """
+    Count guess groups over (game_id, guesses, guess_masks) rows as stored, JSON or compact.
+    Returns ({game_id: Counter of group hashes}, {group_hash: sorted group}, rows scanned).
+    """
+    totals = defaultdict(Counter)
+    groups = {}
+    mask_counts = defaultdict(Counter)
+    vocabularies = dict(vocabularies or {})
+    scanned = 0
+    for game_id, guesses, guess_masks in rows:
+        scanned += 1
+        if guesses is None and guess_masks is not None:
+            # Compact rows are counted by mask; each distinct mask is decoded once below
+            if game_id not in vocabularies:
+                vocabularies[game_id] = load_vocabularies([game_id]).get(game_id)
+            if vocabularies[game_id] is not None:
+                mask_counts[game_id].update(unpack(mask_format(len(vocabularies[game_id])), guess_masks))
+            continue
+        submission_counts, submission_groups = count_guess_groups(guesses)
+        totals[game_id].update(submission_counts)
+        groups.update(submission_groups)
+
+    for game_id, game_mask_counts in mask_counts.items():
+        vocabulary = vocabularies[game_id]
+        for mask, count in game_mask_counts.items():
+            group_hash, sorted_group = normalize_guess_group(
+                [word for bit, word in enumerate(vocabulary) if mask >> bit & 1])
+            totals[game_id][group_hash] += count
+            groups[group_hash] = sorted_group
+    return totals, groups, scanned
+
+def rebuild_guess_counts(game_ids=None, chunk_size=2000) -> int:
+    """
+    Recompute guess group counts from raw submissions, for the given games or all of them.
+    Returns the number of submissions scanned.
+    """
+    submissions = Submission.objects.order_by()
+    counts = GuessGroupCount.objects.all()
+    if game_ids is not None:
+        submissions = submissions.filter(game_id__in=game_ids)
+        counts = counts.filter(game_id__in=game_ids)
+
+    rows = submissions.values_list('game_id', 'guesses', 'guess_masks').iterator(chunk_size=chunk_size)
+    totals, groups, scanned = count_stored_guess_groups(rows)
+
+    with transaction.atomic():
+        counts.delete()
+        GuessGroupCount.objects.bulk_create(
+            [GuessGroupCount(game_id=game_id, group_hash=group_hash, guess_group=groups[group_hash], count=count)
+             for game_id, game_counts in totals.items()
+             for group_hash, count in game_counts.items()],
+            batch_size=chunk_size
+        )
+    return scanned
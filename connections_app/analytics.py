@@ -0,0 +1,100 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .aggregates import normalize_guess_group
+from .compact import decode_times
+from .models import ConnectionsGame, GuessGroupCount, Submission, Word
+from .rollups import solve_time
+
+def course_analytics(course) -> dict:
+    """
+    Submission counts, win rates, mean solve times and hardest categories for every game in a course.
+
+    Costs five queries however many games the course has: the game list, one grouped aggregate
+    for the counts, one pass over won submissions for solve times, one for the answer words and
+    one for the guess group counts of the correct categories.
+    """
+    games = list(ConnectionsGame.objects.filter(course=course).order_by('id').values_list('id', 'game_code', 'title'))
+    game_ids = [game_id for game_id, _, _ in games]
+    submissions = Submission.objects.filter(game__course=course).order_by()
+
+    counts = {row['game_id']: row for row in submissions.values('game_id').annotate(
+        submissions=Count('id'), wins=Count('id', filter=Q(is_won=True)))}
+
+    solve_totals = defaultdict(lambda: [0, 0])
+    chunk_size = getattr(settings, 'STATS_CHUNK_SIZE', 2000)
+    won = submissions.filter(is_won=True).values_list('game_id', 'time_taken', 'time_ms')
+    for game_id, time_taken, time_ms in won.iterator(chunk_size=chunk_size):
+        total = solve_totals[game_id]
+        total[0] += solve_time(time_taken if time_taken is not None or time_ms is None else decode_times(time_ms))
+        total[1] += 1
+
+    categories = category_solve_counts(game_ids)
+
+    results = []
+    for game_id, game_code, title in games:
+        game_counts = counts.get(game_id, {'submissions': 0, 'wins': 0})
+        total_time, solved = solve_totals[game_id]
+        played = game_counts['submissions']
+        results.append({
+            'game_code': game_code,
+            'title': title,
+            'submissions': played,
+            'wins': game_counts['wins'],
+            'win_rate': round(game_counts['wins'] / played, 4) if played else None,
+            'mean_solve_time': round(total_time / solved, 2) if solved else None,
+            'hardest_categories': [
+                {
+                    'category': name,
+                    'difficulty': difficulty,
+                    'solved': solved_count,
+                    'solve_rate': round(solved_count / played, 4) if played else None,
+                }
+                # Fewest solves first; among equals, the one the author rated harder
+                for name, difficulty, solved_count in sorted(categories[game_id], key=lambda c: (c[2], -c[1]))
+            ],
+        })
+
+    played = sum(game['submissions'] for game in results)
+    wins = sum(game['wins'] for game in results)
+    return {
+        'course': {'id': course.pk, 'name': course.name},
+        'submissions': played,
+        'wins': wins,
+        'win_rate': round(wins / played, 4) if played else None,
+        'games': results,
+    }
+
+def category_solve_counts(game_ids) -> dict:
+    """
+    {game_id: [(category, difficulty, times solved)]}, read from the running guess group counts.
+    """
+    words = defaultdict(list)
+    details = {}
+    for game_id, category_id, name, difficulty, word in Word.objects.filter(
+            category__related_game__in=game_ids).values_list(
+            'category__related_game_id', 'category_id', 'category__category', 'category__difficulty', 'word'):
+        words[category_id].append(word)
+        details[category_id] = (game_id, name, difficulty)
+
+    hashes = {}
+    for category_id, category_words in words.items():
+        game_id = details[category_id][0]
+        hashes[game_id, normalize_guess_group(category_words)[0]] = category_id
+
+    solved = defaultdict(int)
+    if hashes:
+        rows = GuessGroupCount.objects.filter(
+            game_id__in=game_ids, group_hash__in={group_hash for _, group_hash in hashes}
+        ).values_list('game_id', 'group_hash', 'count')
+        for game_id, group_hash, count in rows:
+            category_id = hashes.get((game_id, group_hash))
+            if category_id is not None:
+                solved[category_id] += count
+
+    categories = defaultdict(list)
+    for category_id, (game_id, name, difficulty) in details.items():
+        categories[game_id].append((name, difficulty, solved[category_id]))
+    return categories
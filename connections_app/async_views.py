@@ -0,0 +1,94 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Q
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .cache import aget_game_payload, aset_game_payload, make_game_entry
+from .conditional import aconditional_response
+from .models import ConnectionsGame, Submission
+from .routers import replica_reads
+from .serializers import ConnectionsGameSerializer, SubmissionPayloadSerializer
+from .stats import parse_window
+from .views import SubmissionViewSet
+
+# Native async versions of the hot public endpoints. Under an ASGI server (see asgi.py, and the
+# Procfile's web process with DJANGO_SERVER_INTERFACE=asgi) a slow database round-trip here no
+# longer ties up a whole worker.
+# Responses match their DRF counterparts in views.py and stats.py.
+
+async def aget_game_entry(game_code):
+    entry = await aget_game_payload(game_code)
+    if entry is None:
+        game = await ConnectionsGame.objects.with_related().filter(game_code=game_code).afirst()
+        if game is None:
+            return None
+        # Everything the serializer touches was loaded above, so this does no I/O
+        entry = make_game_entry(game, ConnectionsGameSerializer(game).data)
+        await aset_game_payload(game_code, entry)
+    return entry
+
+async def aget_game_version(game_code):
+    entry = await aget_game_payload(game_code)
+    if entry is not None:
+        return entry['version']
+    return await ConnectionsGame.objects.filter(game_code=game_code).values_list(
+        'pk', 'updated_at', 'course__updated_at').afirst()
+
+@require_GET
+async def game_by_code(request, game_code):
+    version = await aget_game_version(game_code)
+    if version is None:
+        return JsonResponse([], safe=False)
+
+    async def render():
+        entry = await aget_game_entry(game_code)
+        return JsonResponse([entry['data']] if entry else [], safe=False)
+
+    return await aconditional_response(request, ('list',) + tuple(version), max(filter(None, version[1:])), render)
+
+@csrf_exempt
+@require_POST
+async def submit(request):
+    try:
+        data = json.loads(request.body)
+        game_code = data.get('gameCode')
+        version = await aget_game_version(game_code) if game_code else None
+        if version is None:
+            return JsonResponse({'status': 'error', 'message': 'No ConnectionsGame matches the given query.'}, status=400)
+
+        serializer = SubmissionPayloadSerializer(data={
+            'guesses': data.get('submittedGuesses', []),
+            'time_taken': data.get('timeToGuess', []),
+            'is_won': data.get('isGameWon', False)
+        })
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+
+        # Writing the row and its guess counts needs a transaction, which the async ORM doesn't offer
+        await sync_to_async(SubmissionViewSet.save_submission)(version[0], serializer.validated_data)
+        return JsonResponse({'status': 'success', 'message': 'Submission successful!'}, status=201)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+@require_GET
+async def submission_count(request, game_code):
+    try:
+        window = parse_window(request.GET)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    with replica_reads() as alias:
+        version = await aget_game_version(game_code)
+    if version is None and alias is not None:
+        # The replica may not have the game yet; see routers.py
+        version = await aget_game_version(game_code)
+    if version is None:
+        return JsonResponse({'status': 'error', 'message': 'Game not found for this code'}, status=404)
+    with replica_reads():
+        counts = await Submission.objects.filter(game_id=version[0], **window).aaggregate(
+            submission_count=Count('id'),
+            wins=Count('id', filter=Q(is_won=True))
+        )
+    return JsonResponse(counts)
@@ -0,0 +1,249 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .aggregates import record_guesses_batch
+from .compact import prepare_for_storage
+from .models import ConnectionsGame, Submission
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_SUFFIX = 'log'
+READY_SUFFIX = 'ready'
+CLAIMED_SUFFIX = 'claimed'
+
+class SubmissionBuffer:
+    """
+    Write-behind buffer for submissions.
+
+    Each accepted submission is appended to this process's spool file before the request returns
+    (and fsynced unless disabled), so an acknowledged submission survives a worker crash. Spool files
+    are flushed into the database with bulk_create once max_batch submissions are pending, once
+    max_delay seconds have passed, and at interpreter exit. Every record carries a buffer_id, so
+    replaying a spool file after a crash never inserts a submission twice.
+    """
+    def __init__(self, directory, max_batch=200, max_delay=2.0, fsync=True):
+        self.directory = str(directory)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.fsync = fsync
+        self._reset()
+
+    def _reset(self):
+        # Called again after a fork, so each process gets its own spool file, lock and timer
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.file = None
+        self.path = None
+        self.pending = 0
+        self.timer = None
+
+    def _check_pid(self):
+        if self.pid != os.getpid():
+            self._reset()
+
+    def append(self, game_id, guesses, time_taken, is_won) -> str:
+        return self.extend([(game_id, {'guesses': guesses, 'time_taken': time_taken, 'is_won': is_won})])[0]
+
+    def extend(self, submissions) -> list:
+        """
+        Spool many (game_id, submission fields) pairs with a single write and fsync.
+        Returns their buffer ids.
+        """
+        self._check_pid()
+        submitted_at = timezone.now().isoformat()
+        records = [
+            {
+                'id': str(uuid.uuid4()),
+                'game': game_id,
+                'guesses': fields['guesses'],
+                'time_taken': fields['time_taken'],
+                'is_won': fields['is_won'],
+                'submitted_at': submitted_at,
+            }
+            for game_id, fields in submissions
+        ]
+        if not records:
+            return []
+        lines = ''.join(json.dumps(record) + '\n' for record in records)
+        with self.lock:
+            if self.file is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self.path = os.path.join(self.directory, f'submissions-{self.pid}-{uuid.uuid4().hex}.{ACTIVE_SUFFIX}')
+                self.file = open(self.path, 'a')
+            self.file.write(lines)
+            self.file.flush()
+            if self.fsync:
+                os.fsync(self.file.fileno())
+            self.pending += len(records)
+            full = self.pending >= self.max_batch
+            if not full and self.timer is None:
+                self.timer = threading.Timer(self.max_delay, self._flush_from_timer)
+                self.timer.daemon = True
+                self.timer.start()
+        if full:
+            try:
+                self.flush()
+            except Exception:
+                # The submissions are already safe on disk; a later flush will retry the write
+                logger.exception('Submission buffer flush failed')
+        return [record['id'] for record in records]
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Timed submission buffer flush failed')
+        finally:
+            # Timer threads get their own database connection; don't leak it
+            connection.close()
+
+    def rotate(self):
+        """
+        Close the current spool file and mark it ready to be written to the database.
+        """
+        self._check_pid()
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if self.file is None:
+                return
+            self.file.close()
+            os.rename(self.path, self.path[:-len(ACTIVE_SUFFIX)] + READY_SUFFIX)
+            self.file = None
+            self.path = None
+            self.pending = 0
+
+    def flush(self) -> int:
+        """
+        Write everything buffered so far to the database. Returns the number of submissions written.
+        """
+        self.rotate()
+        return drain_spool(self.directory)
+
+    def flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            # Whatever is left stays on disk for `manage.py flush_submissions`
+            logger.exception('Submission buffer flush at exit failed')
+
+def _owner_pid(path: str):
+    # submissions-<pid>-<hex>.log / .ready, or submissions-<pid>-<hex>.<claimer pid>.claimed
+    parts = os.path.basename(path).split('.')
+    try:
+        if parts[-1] == CLAIMED_SUFFIX:
+            return int(parts[-2])
+        return int(parts[0].split('-')[1])
+    except (IndexError, ValueError):
+        return None
+
+def _is_alive(pid) -> bool:
+    if pid is None:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def drain_spool(directory, include_orphans=False) -> int:
+    """
+    Write every ready spool file in directory to the database and delete it.
+
+    Files are claimed with an atomic rename, so concurrent workers never write the same file.
+    With include_orphans, spool files left behind by dead processes are recovered too.
+    """
+    directory = str(directory)
+    paths = glob.glob(os.path.join(directory, f'*.{READY_SUFFIX}'))
+    if include_orphans:
+        for suffix in (ACTIVE_SUFFIX, CLAIMED_SUFFIX):
+            paths += [path for path in glob.glob(os.path.join(directory, f'*.{suffix}'))
+                      if not _is_alive(_owner_pid(path))]
+
+    written = 0
+    for path in sorted(paths):
+        base = os.path.basename(path).split('.')[0]
+        claimed = os.path.join(directory, f'{base}.{os.getpid()}.{CLAIMED_SUFFIX}')
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue  # Another worker claimed it first
+        try:
+            written += write_spool_file(claimed)
+        except Exception:
+            # Put it back so a later flush retries it
+            os.rename(claimed, os.path.join(directory, f'{base}.{READY_SUFFIX}'))
+            raise
+        os.remove(claimed)
+    return written
+
+def read_spool_file(path: str) -> list:
+    records = []
+    with open(path, 'r') as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Only a crash mid-append leaves a torn line, and that request was never acknowledged
+                logger.warning('Skipping unreadable line in %s', path)
+    return records
+
+def write_spool_file(path: str, chunk_size=500) -> int:
+    """
+    Insert the submissions in one spool file, skipping any already written. Returns the number inserted.
+    """
+    records = read_spool_file(path)
+    written = 0
+    with transaction.atomic():
+        for offset in range(0, len(records), chunk_size):
+            chunk = records[offset:offset + chunk_size]
+            existing = {str(buffer_id) for buffer_id in Submission.objects.filter(
+                buffer_id__in=[record['id'] for record in chunk]).values_list('buffer_id', flat=True)}
+            game_ids = set(ConnectionsGame.objects.filter(
+                pk__in={record['game'] for record in chunk}).values_list('pk', flat=True))
+            chunk = [record for record in chunk if record['id'] not in existing and record['game'] in game_ids]
+            Submission.objects.bulk_create(prepare_for_storage([
+                Submission(
+                    game_id=record['game'],
+                    guesses=record['guesses'],
+                    time_taken=record['time_taken'],
+                    is_won=record['is_won'],
+                    submitted_at=parse_datetime(record['submitted_at']),
+                    buffer_id=record['id']
+                )
+                for record in chunk
+            ]))
+            record_guesses_batch([(record['game'], record['guesses']) for record in chunk])
+            written += len(chunk)
+    return written
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+def get_submission_buffer() -> SubmissionBuffer:
+    """
+    The process-wide buffer for the current settings, flushed automatically when the process exits.
+    """
+    key = (str(settings.SUBMISSION_BUFFER_DIR), settings.SUBMISSION_BUFFER_MAX_BATCH,
+           settings.SUBMISSION_BUFFER_MAX_DELAY, settings.SUBMISSION_BUFFER_FSYNC)
+    with _buffers_lock:
+        if key not in _buffers:
+            buffer = SubmissionBuffer(*key)
+            atexit.register(buffer.flush_at_exit)
+            _buffers[key] = buffer
+        return _buffers[key]
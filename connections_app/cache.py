@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import count_cache
+
+GAME_PAYLOAD_KEY = 'game-payload:{}'
+
+def game_payload_key(game_code: str) -> str:
+    return GAME_PAYLOAD_KEY.format(game_code)
+
+def make_game_entry(game, data) -> dict:
+    """
+    What is cached per game code: the rendered payload and the version its ETag is built from.
+    """
+    version = (game.pk, game.updated_at, game.course.updated_at if game.course else None)
+    return {'version': version, 'data': data}
+
+def get_game_payload(game_code: str):
+    """
+    Return the rendered payload cached for this game code, or None on a miss.
+    """
+    payload = cache.get(game_payload_key(game_code))
+    count_cache('game_payload', payload is not None, payload is None)
+    return payload
+
+def set_game_payload(game_code: str, payload) -> None:
+    timeout = getattr(settings, 'GAME_PAYLOAD_CACHE_TIMEOUT', 60 * 60)
+    cache.set(game_payload_key(game_code), payload, timeout)
+
+def invalidate_game_payloads(*game_codes: str) -> None:
+    """
+    Drop cached payloads for the given game codes. Must be called by every code path
+    that changes a game, its categories, words or the course it belongs to.
+    """
+    codes = [code for code in game_codes if code]
+    if codes:
+        cache.delete_many([game_payload_key(code) for code in codes])
+
+async def aget_game_payload(game_code: str):
+    payload = await cache.aget(game_payload_key(game_code))
+    count_cache('game_payload', payload is not None, payload is None)
+    return payload
+
+async def aset_game_payload(game_code: str, payload) -> None:
+    timeout = getattr(settings, 'GAME_PAYLOAD_CACHE_TIMEOUT', 60 * 60)
+    await cache.aset(game_payload_key(game_code), payload, timeout)
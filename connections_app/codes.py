@@ -0,0 +1,117 @@
+import math
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import ConnectionsGame, GameCodeCursor
+
+GAME_CODE_ALPHABET = 'BCDFGHJKLMNPQRSTVWXYZ'  # All uppercase consonants
+GAME_CODE_LENGTH = 4
+
+class CodeSpace:
+    """
+    A fixed permutation of every code of the given length over the alphabet.
+
+    Index i maps to code (multiplier * i + offset) mod size, which visits every code exactly
+    once per cycle while still looking random to the people typing them in.
+    """
+    def __init__(self, alphabet=GAME_CODE_ALPHABET, length=GAME_CODE_LENGTH):
+        self.alphabet = alphabet
+        self.length = length
+        self.size = len(alphabet) ** length
+        self.name = f'{alphabet}:{length}'
+        multiplier = int(self.size * 0.6180339887) | 1
+        while math.gcd(multiplier, self.size) != 1:
+            multiplier += 1
+        self.multiplier = multiplier
+        self.offset = self.size // 3
+
+    def code_at(self, position: int) -> str:
+        value = (self.multiplier * (position % self.size) + self.offset) % self.size
+        chars = []
+        for _ in range(self.length):
+            value, digit = divmod(value, len(self.alphabet))
+            chars.append(self.alphabet[digit])
+        return ''.join(reversed(chars))
+
+GAME_CODES = CodeSpace()
+
+def reserve_positions(space: CodeSpace, count: int) -> range:
+    """
+    Atomically advance the space's persisted cursor by count and return the reserved positions.
+
+    The UPDATE holds the cursor row's lock until commit, so concurrent workers always get
+    disjoint ranges.
+    """
+    with transaction.atomic():
+        cursor, _ = GameCodeCursor.objects.get_or_create(name=space.name)
+        GameCodeCursor.objects.filter(pk=cursor.pk).update(position=F('position') + count)
+        end = GameCodeCursor.objects.values_list('position', flat=True).get(pk=cursor.pk)
+    return range(end - count, end)
+
+def allocate_game_codes(count: int, space: CodeSpace = GAME_CODES) -> list:
+    """
+    Hand out count unused game codes.
+
+    Codes come from the permutation cursor, so the first pass over the space needs no retries;
+    one batched lookup only filters out codes that were assigned some other way (legacy random
+    codes or admin edits). Once something collides, every taken code is loaded once and the
+    remaining search happens in memory, with the reserved window doubling each round but never
+    reaching past one cycle, as positions a cycle apart are the same code.
+    Raises ValidationError when the space has no free codes left.
+
+    A code is only free as of the lookup: after the cursor wraps, a concurrent caller can be
+    handed the same code before either writes it. Writers go through create_with_game_code(s),
+    which retry when that happens.
+    """
+    codes = []
+    chosen = set()
+    taken = None
+    window = count
+    scanned = 0
+    while len(codes) < count:
+        if scanned >= space.size:
+            raise ValidationError('No free game codes left.')
+        positions = reserve_positions(space, window)
+        scanned += window
+        candidates = [space.code_at(position) for position in positions]
+        if taken is None:
+            collisions = set(ConnectionsGame.objects.filter(game_code__in=candidates).values_list('game_code', flat=True))
+        else:
+            collisions = taken
+        for code in candidates:
+            if code not in collisions and code not in chosen and len(codes) < count:
+                chosen.add(code)
+                codes.append(code)
+        if len(codes) < count:
+            if taken is None:
+                taken = set(ConnectionsGame.objects.values_list('game_code', flat=True))
+            window = min(window * 2, space.size - scanned)
+    return codes
+
+def allocate_game_code(space: CodeSpace = GAME_CODES) -> str:
+    return allocate_game_codes(1, space)[0]
+
+def create_with_game_codes(count: int, create, space: CodeSpace = GAME_CODES, attempts: int = 3):
+    """
+    Return create(codes) for count freshly allocated codes, in a transaction of its own. When a
+    concurrent writer stored one of the codes first and the unique constraint on game_code fails,
+    it is retried with new codes.
+    """
+    for attempt in range(attempts):
+        # Reserved outside the write transaction so the cursor lock is held only briefly
+        game_codes = allocate_game_codes(count, space)
+        try:
+            # A savepoint, so the lookup below still works inside an outer transaction
+            with transaction.atomic():
+                return create(game_codes)
+        except IntegrityError:
+            if attempt == attempts - 1 or not ConnectionsGame.objects.filter(game_code__in=game_codes).exists():
+                raise
+
+def create_with_game_code(create, space: CodeSpace = GAME_CODES, attempts: int = 3):
+    """
+    create_with_game_codes for a single game: returns create(code).
+    """
+    return create_with_game_codes(1, lambda game_codes: create(game_codes[0]), space, attempts)
@@ -0,0 +1,164 @@
+import math
+import struct
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import count_cache
+from .models import ConnectionsGame, Word
+
+# Compact submission storage (SUBMISSION_STORAGE = 'compact').
+#
+# Each game gets a frozen vocabulary: its distinct words, sorted, stored on
+# ConnectionsGame.guess_vocabulary the first time a submission is compacted. A guess is then a
+# bitmask over vocabulary positions (16 words fit in an unsigned 16-bit integer), and a
+# submission's guesses are those masks packed back to back in Submission.guess_masks. Times are
+# packed as unsigned 32-bit milliseconds in Submission.time_ms. A compact column's JSON
+# counterpart is NULL; rows that can't be encoded exactly keep their JSON.
+#
+# Masks are sets, so a decoded guess lists its words in sorted order and a guess that repeats a
+# word is never compacted. Times are kept to the millisecond.
+
+VOCABULARY_KEY = 'game-vocabulary:{}'
+MASK_FORMATS = ((16, 'H'), (32, 'I'), (64, 'Q'))
+TIME_FORMAT = 'I'
+MAX_TIME_MS = 2 ** 32 - 1
+
+def vocabulary_key(game_id) -> str:
+    return VOCABULARY_KEY.format(game_id)
+
+def mask_format(vocabulary_size: int):
+    """
+    The struct code for one guess mask over a vocabulary of this size, or None if it is too big.
+    """
+    for bits, code in MASK_FORMATS:
+        if vocabulary_size <= bits:
+            return code
+    return None
+
+def unpack(code: str, data) -> tuple:
+    return struct.unpack(f'<{len(data) // struct.calcsize(code)}{code}', data)
+
+def encode_guesses(word_bits: dict, guesses):
+    """
+    Pack guesses as masks over word_bits ({word: bit}), or return None if they can't be encoded exactly.
+    """
+    code = mask_format(len(word_bits))
+    if code is None or not isinstance(guesses, list):
+        return None
+    masks = []
+    for guess_group in guesses:
+        if not isinstance(guess_group, list) or not guess_group:
+            return None
+        mask = 0
+        for word in guess_group:
+            bit = word_bits.get(word) if isinstance(word, str) else None
+            if bit is None or mask >> bit & 1:
+                return None
+            mask |= 1 << bit
+        masks.append(mask)
+    return struct.pack(f'<{len(masks)}{code}', *masks)
+
+def decode_guesses(vocabulary, data) -> list:
+    return [[word for bit, word in enumerate(vocabulary) if mask >> bit & 1]
+            for mask in unpack(mask_format(len(vocabulary)), data)]
+
+def encode_times(time_taken):
+    """
+    Pack times as whole milliseconds, or return None if any of them isn't a usable number.
+    """
+    if not isinstance(time_taken, list):
+        return None
+    values = []
+    for time_value in time_taken:
+        if isinstance(time_value, bool) or not isinstance(time_value, (int, float)) or not math.isfinite(time_value):
+            return None
+        milliseconds = round(time_value * 1000)
+        if not 0 <= milliseconds <= MAX_TIME_MS:
+            return None
+        values.append(milliseconds)
+    return struct.pack(f'<{len(values)}{TIME_FORMAT}', *values)
+
+def decode_times(data) -> list:
+    return [milliseconds // 1000 if milliseconds % 1000 == 0 else milliseconds / 1000
+            for milliseconds in unpack(TIME_FORMAT, data)]
+
+def freeze_vocabularies(game_ids) -> dict:
+    """
+    Store the current word list of each game that has no vocabulary yet, and return the vocabularies.
+    """
+    words = defaultdict(set)
+    for game_id, word in Word.objects.filter(category__related_game__in=game_ids).values_list(
+            'category__related_game_id', 'word'):
+        words[game_id].add(word)
+    for game_id in game_ids:
+        # Only the first writer wins, so a vocabulary never changes once masks refer to it
+        ConnectionsGame.objects.filter(pk=game_id, guess_vocabulary__isnull=True).update(
+            guess_vocabulary=sorted(words[game_id]))
+    return dict(ConnectionsGame.objects.filter(pk__in=game_ids).values_list('pk', 'guess_vocabulary'))
+
+def load_vocabularies(game_ids, freeze=False) -> dict:
+    """
+    Return {game_id: vocabulary} for the given games, reading through the cache. Games without a
+    vocabulary are left out, unless freeze is set, in which case one is created for them.
+    """
+    game_ids = set(game_ids)
+    if not game_ids:
+        return {}
+    cached = cache.get_many([vocabulary_key(game_id) for game_id in game_ids])
+    vocabularies = {game_id: cached[vocabulary_key(game_id)] for game_id in game_ids if vocabulary_key(game_id) in cached}
+    missing = game_ids - vocabularies.keys()
+    count_cache('vocabulary', len(vocabularies), len(missing))
+    if missing:
+        loaded = dict(ConnectionsGame.objects.filter(pk__in=missing, guess_vocabulary__isnull=False).values_list(
+            'pk', 'guess_vocabulary'))
+        if freeze and missing - loaded.keys():
+            loaded.update(freeze_vocabularies(missing - loaded.keys()))
+        # Vocabularies never change, so they can stay cached until evicted
+        cache.set_many({vocabulary_key(game_id): vocabulary for game_id, vocabulary in loaded.items()}, None)
+        vocabularies.update(loaded)
+    return vocabularies
+
+def encode_submissions(submissions) -> list:
+    """
+    Switch the given Submission instances to compact columns where they can be encoded exactly.
+    Returns the instances that changed; nothing is saved.
+    """
+    vocabularies = load_vocabularies({submission.game_id for submission in submissions}, freeze=True)
+    word_bits = {game_id: {word: bit for bit, word in enumerate(vocabulary)} for game_id, vocabulary in vocabularies.items()}
+    changed = []
+    for submission in submissions:
+        encoded = False
+        if submission.guesses is not None and submission.game_id in word_bits:
+            masks = encode_guesses(word_bits[submission.game_id], submission.guesses)
+            if masks is not None:
+                submission.guesses, submission.guess_masks = None, masks
+                encoded = True
+        if submission.time_taken is not None:
+            times = encode_times(submission.time_taken)
+            if times is not None:
+                submission.time_taken, submission.time_ms = None, times
+                encoded = True
+        if encoded:
+            changed.append(submission)
+    return changed
+
+def prepare_for_storage(submissions):
+    """
+    Encode new Submission instances before they are saved when compact storage is enabled.
+    """
+    if getattr(settings, 'SUBMISSION_STORAGE', 'json') == 'compact':
+        encode_submissions(submissions)
+    return submissions
+
+def decode_submission(guesses, time_taken, guess_masks, time_ms, vocabulary):
+    """
+    Return (guesses, time_taken) as the API shows them, whichever way each was stored.
+    """
+    if guesses is None and guess_masks is not None and vocabulary is not None:
+        guesses = decode_guesses(vocabulary, guess_masks)
+    if time_taken is None and time_ms is not None:
+        time_taken = decode_times(time_ms)
+    return guesses, time_taken
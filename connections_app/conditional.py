@@ -0,0 +1,46 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+def make_etag(*version_parts) -> str:
+    """
+    Build a strong ETag from whatever identifies the current version of a resource.
+    """
+    digest = hashlib.sha1(repr(version_parts).encode()).hexdigest()
+    return quote_etag(digest)
+
+def check_conditional(request, version_parts, last_modified):
+    """
+    Return (etag, last-modified timestamp, 304 response or None) for the current version.
+    """
+    etag = make_etag(*version_parts)
+    last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+    return etag, last_modified_ts, get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+
+def add_validators(response, etag, last_modified_ts):
+    response.headers['ETag'] = etag
+    if last_modified_ts is not None:
+        response.headers['Last-Modified'] = http_date(last_modified_ts)
+    # Let browsers keep the body but revalidate it on every load
+    patch_cache_control(response, no_cache=True)
+    return response
+
+def conditional_response(request, version_parts, last_modified, render):
+    """
+    Answer If-None-Match / If-Modified-Since with a 304 when the client is up to date,
+    otherwise call render() to build the full response. Both carry the validators.
+    """
+    etag, last_modified_ts, response = check_conditional(request, version_parts, last_modified)
+    if response is None:
+        response = render()
+    return add_validators(response, etag, last_modified_ts)
+
+async def aconditional_response(request, version_parts, last_modified, render):
+    """
+    conditional_response for async views, where render is a coroutine function.
+    """
+    etag, last_modified_ts, response = check_conditional(request, version_parts, last_modified)
+    if response is None:
+        response = await render()
+    return add_validators(response, etag, last_modified_ts)
@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+import zlib
+
+from django.conf import settings
+
+from .compact import decode_submission, load_vocabularies
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+CSV_COLUMNS = ['id', 'game_code', 'course_id', 'submitted_at', 'is_won', 'guesses', 'time_taken']
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+FLUSH_BYTES = 64 * 1024
+
+def export_rows(submissions, chunk_size=None):
+    """
+    Yield one dict per submission, oldest first, fetched in chunks so memory stays flat for any
+    export size. Compact guesses and times are decoded like the API shows them.
+    """
+    chunk_size = chunk_size or getattr(settings, 'STATS_CHUNK_SIZE', 2000)
+    rows = submissions.order_by('submitted_at', 'id').values_list(
+        'id', 'game_id', 'game__game_code', 'game__course_id', 'submitted_at', 'is_won',
+        'guesses', 'time_taken', 'guess_masks', 'time_ms'
+    ).iterator(chunk_size=chunk_size)
+    vocabularies = {}
+    for (submission_id, game_id, game_code, course_id, submitted_at, is_won,
+         guesses, time_taken, guess_masks, time_ms) in rows:
+        if guess_masks is not None and game_id not in vocabularies:
+            vocabularies.update(load_vocabularies([game_id]))
+        guesses, time_taken = decode_submission(guesses, time_taken, guess_masks, time_ms, vocabularies.get(game_id))
+        yield {
+            'id': submission_id,
+            'game_code': game_code,
+            'course_id': course_id,
+            'submitted_at': submitted_at.isoformat(),
+            'is_won': is_won,
+            'guesses': guesses,
+            'time_taken': time_taken,
+        }
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield (json.dumps(row) + '\n').encode()
+
+def iter_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(dict(row, guesses=json.dumps(row['guesses']), time_taken=json.dumps(row['time_taken'])))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def batched(chunks, size=FLUSH_BYTES):
+    """
+    Join small chunks into pieces of about size bytes, so a response isn't one write per row.
+    """
+    pending = []
+    pending_bytes = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_bytes += len(chunk)
+        if pending_bytes >= size:
+            yield b''.join(pending)
+            pending, pending_bytes = [], 0
+    if pending:
+        yield b''.join(pending)
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def stream_export(submissions, export_format='ndjson', compress=False):
+    """
+    The bytes of a submissions export, produced lazily a batch at a time.
+    """
+    encode = iter_csv if export_format == 'csv' else iter_ndjson
+    chunks = batched(encode(export_rows(submissions)))
+    return gzipped(chunks) if compress else chunks
+
+def export_filename(export_format, compress=False) -> str:
+    return f'submissions.{export_format}' + ('.gz' if compress else '')
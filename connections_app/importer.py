@@ -0,0 +1,154 @@
+import glob
+import hashlib
+import json
+import os
+
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.db.models.functions import Lower
+
+from .cache import invalidate_game_payloads
+from .codes import create_with_game_codes
+from .ingest import validate_game_data
+from .models import ConnectionsGame, Category, Word, Course
+
+@dataclass
+class ParsedGame:
+    source: str
+    import_key: str = None
+    data: dict = None
+    error: str = None
+
+@dataclass
+class ImportStats:
+    imported: int = 0
+    skipped: int = 0
+    failed: int = 0
+
+def iter_units(paths, stdin=None):
+    """
+    Expand the given paths into units of work for parse_unit.
+
+    A path may be a directory (every *.json / *.jsonl in it), a glob pattern, a .json file
+    holding one game or a list of games, a .jsonl file with one game per line, or "-" to read
+    JSONL from stdin. Files are read by the workers; JSONL lines are read here.
+    """
+    for path in paths:
+        if path == '-':
+            yield from _jsonl_units('<stdin>', stdin)
+            continue
+        if os.path.isdir(path):
+            matches = sorted(glob.glob(os.path.join(path, '*.json')) + glob.glob(os.path.join(path, '*.jsonl')))
+        elif glob.has_magic(path):
+            matches = sorted(glob.glob(path))
+        else:
+            matches = [path]
+        for match in matches:
+            if match.endswith('.jsonl'):
+                with open(match, 'r') as file:
+                    yield from _jsonl_units(match, file)
+            else:
+                yield ('file', match, None)
+
+def _jsonl_units(name, lines):
+    for line_number, line in enumerate(lines, start=1):
+        if line.strip():
+            yield ('text', f'{name}:{line_number}', line)
+
+def parse_unit(unit):
+    """
+    Parse and validate one unit into ParsedGame results. Runs in a worker process and
+    never touches the database.
+    """
+    kind, source, text = unit
+    try:
+        if kind == 'file':
+            with open(source, 'r') as file:
+                text = file.read()
+        document = json.loads(text)
+    except (OSError, ValueError) as e:
+        return [ParsedGame(source, error=str(e))]
+
+    games = document if isinstance(document, list) else [document]
+    results = []
+    for index, data in enumerate(games):
+        label = source if len(games) == 1 else f'{source}[{index}]'
+        try:
+            validate_game_data(data, required=('syntax_highlighting', 'num_categories', 'words_per_category'))
+        except ValidationError as e:
+            results.append(ParsedGame(label, error='; '.join(e.messages)))
+            continue
+        import_key = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        results.append(ParsedGame(label, import_key, data))
+    return results
+
+def resolve_courses(names):
+    """
+    Map each lowercased course name to a Course, creating the missing ones in one query.
+    """
+    courses = {}
+    for course in Course.objects.annotate(lower_name=Lower('name')).filter(lower_name__in=names).order_by('id'):
+        courses.setdefault(course.lower_name, course)
+    missing = [name for name in names if name not in courses]
+    for course in Course.objects.bulk_create([Course(name=name, description='') for name in missing]):
+        courses[course.name] = course
+    return courses
+
+def write_batch(parsed_games, published=False, stats=None):
+    """
+    Write a batch of parsed games in one transaction with a fixed number of queries.
+
+    Games whose import key is already in the database are skipped, so re-running an import
+    only writes what is missing.
+    """
+    stats = stats or ImportStats()
+    batch = {}
+    for parsed in parsed_games:
+        batch.setdefault(parsed.import_key, parsed)
+    stats.skipped += len(parsed_games) - len(batch)
+
+    existing = set(ConnectionsGame.objects.filter(import_key__in=batch.keys()).values_list('import_key', flat=True))
+    stats.skipped += len(existing)
+    batch = [parsed for key, parsed in batch.items() if key not in existing]
+    if not batch:
+        return stats
+
+    def write(codes):
+        courses = resolve_courses({parsed.data.get('course', 'unassigned').strip().lower() for parsed in batch})
+        games = ConnectionsGame.objects.bulk_create([
+            ConnectionsGame(
+                title=parsed.data.get('title', 'untitled game'),
+                game_code=game_code,
+                author=parsed.data.get('author', 'unknown author'),
+                syntax_highlighting=parsed.data['syntax_highlighting'],
+                num_categories=parsed.data['num_categories'],
+                words_per_category=parsed.data['words_per_category'],
+                course=courses[parsed.data.get('course', 'unassigned').strip().lower()],
+                published=published,
+                relevant_info=parsed.data.get('relevant_info', ""),
+                import_key=parsed.import_key
+            )
+            for parsed, game_code in zip(batch, codes)
+        ])
+        category_data = [(game, data) for game, parsed in zip(games, batch) for data in parsed.data['game']]
+        categories = Category.objects.bulk_create([
+            Category(
+                related_game=game,
+                category=data['category'],
+                difficulty=data['difficulty'],
+                explanation=data['explanation']
+            )
+            for game, data in category_data
+        ])
+        Word.objects.bulk_create([
+            Word(category=category, word=word)
+            for category, (_, data) in zip(categories, category_data)
+            for word in data['words']
+        ])
+        return codes
+
+    codes = create_with_game_codes(len(batch), write)
+    invalidate_game_payloads(*codes)
+    stats.imported += len(batch)
+    return stats
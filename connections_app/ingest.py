@@ -0,0 +1,75 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .cache import invalidate_game_payloads
+from .models import ConnectionsGame, Category, Word, Course
+
+def validate_game_data(data, required=('title', 'author', 'syntax_highlighting', 'num_categories', 'words_per_category')) -> None:
+    """
+    Check an uploaded game before anything is written. Raises ValidationError.
+    """
+    if not isinstance(data, dict):
+        raise ValidationError('Game data must be a JSON object.')
+    missing = [key for key in required if key not in data]
+    if missing:
+        raise ValidationError(f'Missing fields: {", ".join(missing)}')
+
+    if not isinstance(data.get('course', ''), str):
+        raise ValidationError('"course" must be a course name.')
+
+    categories = data.get('game')
+    if not isinstance(categories, list) or not categories:
+        raise ValidationError('"game" must be a non-empty list of categories.')
+    for index, category_data in enumerate(categories):
+        if not isinstance(category_data, dict):
+            raise ValidationError(f'Category {index} must be an object.')
+        missing = [key for key in ('category', 'difficulty', 'explanation', 'words') if key not in category_data]
+        if missing:
+            raise ValidationError(f'Category {index} is missing fields: {", ".join(missing)}')
+        words = category_data['words']
+        if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+            raise ValidationError(f'Category {index} words must be a list of strings.')
+
+def ingest_game(data, game_code, *, course_name, create_course=False, published=False, defaults=None) -> ConnectionsGame:
+    """
+    Write a validated game with its categories and words in one transaction.
+
+    Costs the same handful of queries however many categories and words the game has.
+    The course is looked up by name, case-insensitively, and created when create_course
+    is set; otherwise Course.DoesNotExist is raised. Missing optional fields fall back to defaults.
+    """
+    defaults = defaults or {}
+    course_name = course_name.strip().lower()
+    with transaction.atomic():
+        if create_course:
+            course, _ = Course.objects.get_or_create(name__iexact=course_name,
+                                                     defaults={'name': course_name, 'description': ''})
+        else:
+            course = Course.objects.get(name__iexact=course_name)
+        game = ConnectionsGame.objects.create(
+            title=data.get('title', defaults.get('title')),
+            game_code=game_code,
+            author=data.get('author', defaults.get('author')),
+            syntax_highlighting=data['syntax_highlighting'],
+            num_categories=data['num_categories'],
+            words_per_category=data['words_per_category'],
+            course=course,
+            published=published,
+            relevant_info=data.get('relevant_info', defaults.get('relevant_info', ""))
+        )
+        categories = Category.objects.bulk_create([
+            Category(
+                related_game=game,
+                category=category_data['category'],
+                difficulty=category_data['difficulty'],
+                explanation=category_data['explanation']
+            )
+            for category_data in data['game']
+        ])
+        Word.objects.bulk_create([
+            Word(category=category, word=word)
+            for category, category_data in zip(categories, data['game'])
+            for word in category_data['words']
+        ])
+    invalidate_game_payloads(game_code)
+    return game
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from connections_app.compact import decode_submission, encode_submissions, load_vocabularies
+from connections_app.models import ConnectionsGame, Submission
+
+class Command(BaseCommand):
+    help = 'Convert stored submissions to the compact guess format, or back to JSON with --expand'
+
+    def add_arguments(self, parser):
+        parser.add_argument('game_codes', nargs='*', type=str, help='Game codes to convert (default: every game)')
+        parser.add_argument('--expand', action='store_true', help='Convert compact submissions back to JSON')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Submissions converted per transaction')
+
+    def handle(self, *args, **kwargs):
+        submissions = Submission.objects.all()
+        if kwargs['game_codes']:
+            game_ids = list(ConnectionsGame.objects.filter(game_code__in=kwargs['game_codes']).values_list('pk', flat=True))
+            if len(game_ids) != len(set(kwargs['game_codes'])):
+                self.stdout.write(self.style.WARNING('Some game codes do not exist and were skipped'))
+            submissions = submissions.filter(game_id__in=game_ids)
+        if kwargs['expand']:
+            submissions = submissions.filter(Q(guess_masks__isnull=False) | Q(time_ms__isnull=False))
+        else:
+            submissions = submissions.filter(Q(guesses__isnull=False) | Q(time_taken__isnull=False))
+
+        # Walk the table by primary key, one short transaction per chunk, so the command can be
+        # interrupted and rerun at any point while submissions keep coming in
+        converted = 0
+        last_pk = 0
+        while True:
+            chunk = list(submissions.filter(pk__gt=last_pk).order_by('pk')[:kwargs['chunk_size']])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            with transaction.atomic():
+                if kwargs['expand']:
+                    changed = self.expand(chunk)
+                else:
+                    changed = encode_submissions(chunk)
+                Submission.objects.bulk_update(changed, ['guesses', 'time_taken', 'guess_masks', 'time_ms'])
+            converted += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(f'Converted {converted} submissions'))
+
+    @staticmethod
+    def expand(chunk):
+        vocabularies = load_vocabularies({submission.game_id for submission in chunk})
+        for submission in chunk:
+            submission.guesses, submission.time_taken = decode_submission(
+                submission.guesses, submission.time_taken, submission.guess_masks, submission.time_ms,
+                vocabularies.get(submission.game_id))
+            if submission.guesses is not None:
+                submission.guess_masks = None
+            submission.time_ms = None
+        return chunk
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from connections_app.export import EXPORT_FORMATS, stream_export
+from connections_app.models import Submission
+from connections_app.stats import filter_submissions
+
+class Command(BaseCommand):
+    help = 'Stream submissions for a game, course or date range to a file as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', type=str, default=None, help='File to write (default: stdout)')
+        parser.add_argument('--format', dest='export_format', choices=EXPORT_FORMATS, default='ndjson')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--game-code', type=str, default=None)
+        parser.add_argument('--course', type=str, default=None, help='Course id')
+        parser.add_argument('--since', type=str, default=None, help='ISO 8601 date or datetime, inclusive')
+        parser.add_argument('--until', type=str, default=None, help='ISO 8601 date or datetime, exclusive')
+
+    def handle(self, *args, **kwargs):
+        params = {key: kwargs[option] for key, option in
+                  (('game_code', 'game_code'), ('course', 'course'), ('since', 'since'), ('until', 'until'))
+                  if kwargs[option]}
+        try:
+            submissions = filter_submissions(Submission.objects.all(), params)
+        except ValueError as e:
+            raise CommandError(str(e))
+        chunks = stream_export(submissions, kwargs['export_format'], kwargs['gzip'])
+
+        if kwargs['output'] is None:
+            if kwargs['gzip']:
+                raise CommandError('--gzip needs --output')
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending='')
+            return
+
+        written = 0
+        with open(kwargs['output'], 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk)
+                written += len(chunk)
+        self.stderr.write(self.style.SUCCESS(f'Wrote {written} bytes to {kwargs["output"]}'))
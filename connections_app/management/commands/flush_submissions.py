@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from connections_app.buffer import drain_spool
+
+class Command(BaseCommand):
+    help = 'Write buffered submissions to the database, including spool files left by dead workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', type=str, default=None, help='Spool directory (default: SUBMISSION_BUFFER_DIR)')
+
+    def handle(self, *args, **kwargs):
+        directory = kwargs['directory'] or settings.SUBMISSION_BUFFER_DIR
+        written = drain_spool(directory, include_orphans=True)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} buffered submissions'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from connections_app.synthetic import generate
+
+class Command(BaseCommand):
+    help = 'Create synthetic courses, games and played submissions for benchmarks and load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=1)
+        parser.add_argument('--games', type=int, default=10, help='Games per course')
+        parser.add_argument('--categories', type=int, default=4, help='Categories per game')
+        parser.add_argument('--words', type=int, default=4, help='Words per category')
+        parser.add_argument('--submissions', type=int, default=100, help='Submissions per game')
+        parser.add_argument('--days', type=int, default=30, help='Spread submissions over this many past days')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows written per INSERT')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['categories'] < 2 or kwargs['words'] < 2:
+            raise CommandError('Games need at least 2 categories of at least 2 words')
+        if min(kwargs['courses'], kwargs['games'], kwargs['days'], kwargs['batch_size']) < 1 or kwargs['submissions'] < 0:
+            raise CommandError('Counts must be positive')
+        created = generate(
+            courses=kwargs['courses'],
+            games_per_course=kwargs['games'],
+            num_categories=kwargs['categories'],
+            words_per_category=kwargs['words'],
+            submissions_per_game=kwargs['submissions'],
+            days=kwargs['days'],
+            seed=kwargs['seed'],
+            batch_size=kwargs['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Created ' + ', '.join(f'{count} {name}' for name, count in created.items())))
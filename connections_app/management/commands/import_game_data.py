@@ -1,42 +1,65 @@
-import json
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
 from django.core.management.base import BaseCommand
-from connections_app.models import ConnectionsGame, Category, Word
+from connections_app.importer import ImportStats, iter_units, parse_unit, write_batch
 
 class Command(BaseCommand):
-    help = 'Load game data from a JSON file into the database'
+    help = 'Bulk import games from JSON files, directories, glob patterns or JSONL streams ("-" for stdin)'
 
     def add_arguments(self, parser):
-        parser.add_argument('json_file', type=str, help='Path to the JSON file')
+        parser.add_argument('paths', nargs='+', type=str, help='Files, directories, glob patterns or "-"')
+        parser.add_argument('--batch-size', type=int, default=500, help='Games written per transaction')
+        parser.add_argument('--workers', type=int, default=4, help='Parser processes (0 parses in this process)')
+        parser.add_argument('--publish', action='store_true', help='Publish the imported games')
 
     def handle(self, *args, **kwargs):
-        json_file = kwargs['json_file']
-        with open(json_file, 'r') as file:
-            data = json.load(file)
-
-        # Create ConnectionsGame
-        game = ConnectionsGame.objects.create(
-            title=data['title'],
-            author=data['author'],
-            created_at=data['created_at'],
-            num_categories=data['num_categories'],
-            words_per_category=data['words_per_category']
-        )
-
-        for category_data in data['game']:
-            # Create Category
-            category = Category.objects.create(
-                related_game=game,
-                category=category_data['category'],
-                difficulty=category_data['difficulty'],
-                explanation=category_data['explanation'],
-                is_py_code=category_data['is_py_code']
-            )
-
-            # Create Words
-            for word in category_data['words']:
-                Word.objects.create(
-                    category=category,
-                    word=word
-                )
-
-        self.stdout.write(self.style.SUCCESS('Successfully imported game data'))
\ No newline at end of file
+        batch_size = kwargs['batch_size']
+        workers = kwargs['workers']
+        stats = ImportStats()
+        processed = 0
+        start = time.perf_counter()
+
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup) if workers > 0 else None
+        try:
+            units = iter_units(kwargs['paths'], sys.stdin)
+            while True:
+                window = list(islice(units, batch_size))
+                if not window:
+                    break
+                if pool is not None:
+                    results = pool.map(parse_unit, window, chunksize=max(1, len(window) // (workers * 4)))
+                else:
+                    results = map(parse_unit, window)
+
+                parsed_games = []
+                for parsed in (parsed for unit_results in results for parsed in unit_results):
+                    if parsed.error:
+                        stats.failed += 1
+                        self.stderr.write(f'{parsed.source}: {parsed.error}')
+                    else:
+                        parsed_games.append(parsed)
+                processed += len(parsed_games)
+
+                for offset in range(0, len(parsed_games), batch_size):
+                    write_batch(parsed_games[offset:offset + batch_size],
+                                published=kwargs['publish'], stats=stats)
+                self.report(stats, processed, start)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {stats.imported} games ({stats.skipped} already present, {stats.failed} failed) '
+            f'in {time.perf_counter() - start:.2f}s'
+        ))
+
+    def report(self, stats: ImportStats, processed: int, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(f'{processed} games processed: {stats.imported} imported, {stats.skipped} skipped, '
+                          f'{stats.failed} failed ({rate:.0f} games/s)')
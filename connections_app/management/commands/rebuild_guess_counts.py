@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from connections_app.aggregates import rebuild_guess_counts
+from connections_app.models import ConnectionsGame
+
+class Command(BaseCommand):
+    help = 'Rebuild the guess distribution counts from raw submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('game_codes', nargs='*', type=str, help='Game codes to rebuild (default: every game)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Submissions fetched per database round-trip')
+
+    def handle(self, *args, **kwargs):
+        game_codes = kwargs['game_codes']
+        game_ids = None
+        if game_codes:
+            game_ids = list(ConnectionsGame.objects.filter(game_code__in=game_codes).values_list('pk', flat=True))
+            if len(game_ids) != len(set(game_codes)):
+                self.stdout.write(self.style.WARNING('Some game codes do not exist and were skipped'))
+
+        scanned = rebuild_guess_counts(game_ids, chunk_size=kwargs['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt guess counts from {scanned} submissions'))
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from connections_app.rollups import rebuild_rollups, refresh_rollups
+
+class Command(BaseCommand):
+    help = 'Add new submissions to the hourly and daily rollups (safe to run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=int, default=None,
+                            help='Only roll up submissions at least this many seconds old (default: ROLLUP_LAG_SECONDS)')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recount every rollup from scratch, e.g. after admin edits or recovering buffered submissions')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Submissions fetched per database round-trip')
+
+    def handle(self, *args, **kwargs):
+        lag = timedelta(seconds=kwargs['lag'] if kwargs['lag'] is not None else settings.ROLLUP_LAG_SECONDS)
+        refresh = rebuild_rollups if kwargs['rebuild'] else refresh_rollups
+        rolled_up = refresh(lag=lag, chunk_size=kwargs['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {rolled_up} submissions'))
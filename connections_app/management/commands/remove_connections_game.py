@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from connections_app.cache import invalidate_game_payloads
 from connections_app.models import ConnectionsGame, Category, Word 
 
 class Command(BaseCommand):
@@ -24,6 +25,7 @@ class Command(BaseCommand):
             
             # Finally, delete the ConnectionsGame
             game.delete()
+            invalidate_game_payloads(game.game_code)
             
             self.stdout.write(self.style.SUCCESS(f'Successfully deleted ConnectionsGame with ID {game_id} and its related categories and words'))
         except ConnectionsGame.DoesNotExist:
@@ -0,0 +1,305 @@
+import fcntl
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# In-process metrics, exported in the Prometheus text format by the admin metrics endpoint.
+#
+# Every worker process adds to its own samples file, metrics-<pid>.db in METRICS_DIR, through a
+# shared memory map, so an update is a dict lookup and an in-place float add with no syscall.
+# A scrape reads every file in the directory and adds them up, so the totals cover all gunicorn
+# or mod_wsgi workers, including ones that have exited since. With no METRICS_DIR the samples
+# stay in this process's memory, which is only right for a single-process server.
+#
+# Workers recycled by gunicorn --max-requests or mod_wsgi would each leave a file behind, so
+# whenever a process starts its file, the files of processes that have exited are added into
+# metrics-archive.db and deleted. That runs under an exclusive lock on metrics.lock, and
+# scrapes read under a shared one, so a scrape never counts a file both in the archive and on
+# its own.
+#
+# A samples file is a 4-byte used length, padded to 8, then one entry per sample: a 4-byte key
+# length, the key (JSON [name, [[label, value], ...]]), padding so the value is 8-byte aligned,
+# and the value as a float64. Entries are only ever appended, and the used length is written
+# after the entry, so a reader never sees half an entry.
+
+HEADER = struct.Struct('<I')
+KEY_LENGTH = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+FIRST_ENTRY = 8
+INITIAL_SIZE = 64 * 1024
+FILE_PATTERN = 'metrics-{}.db'
+ARCHIVE_FILE = FILE_PATTERN.format('archive')
+LOCK_FILE = 'metrics.lock'
+
+# Request latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+def align(offset: int) -> int:
+    return offset + (-offset % VALUE.size)
+
+def read_entries(data, used):
+    """
+    Yield (key, value offset, value) for every entry in the first used bytes of a samples file.
+    """
+    position = FIRST_ENTRY
+    while position < used:
+        length, = KEY_LENGTH.unpack_from(data, position)
+        key = bytes(data[position + KEY_LENGTH.size:position + KEY_LENGTH.size + length])
+        value_offset = align(position + KEY_LENGTH.size + length)
+        yield key, value_offset, VALUE.unpack_from(data, value_offset)[0]
+        position = value_offset + VALUE.size
+
+def encode_key(key) -> bytes:
+    name, labels = key
+    return json.dumps([name, [list(label) for label in labels]]).encode()
+
+def decode_key(encoded: bytes):
+    name, labels = json.loads(encoded)
+    return name, tuple(tuple(label) for label in labels)
+
+class MetricsFile:
+    """
+    The samples of one process, kept in a memory-mapped file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b')
+        if os.fstat(self.file.fileno()).st_size < FIRST_ENTRY:
+            self.file.truncate(INITIAL_SIZE)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        # A file left by an earlier process with the same pid is carried on
+        self.used = HEADER.unpack_from(self.map, 0)[0] or FIRST_ENTRY
+        self.offsets = {decode_key(key): offset for key, offset, _ in read_entries(self.map, self.used)}
+
+    def add(self, key, amount) -> None:
+        with self.lock:
+            offset = self.offsets.get(key)
+            if offset is None:
+                offset = self.offsets[key] = self.append(key)
+            VALUE.pack_into(self.map, offset, VALUE.unpack_from(self.map, offset)[0] + amount)
+
+    def append(self, key) -> int:
+        encoded = encode_key(key)
+        value_offset = align(self.used + KEY_LENGTH.size + len(encoded))
+        end = value_offset + VALUE.size
+        if end > len(self.map):
+            size = max(len(self.map) * 2, end)
+            self.map.close()
+            self.file.truncate(size)
+            self.map = mmap.mmap(self.file.fileno(), 0)
+        KEY_LENGTH.pack_into(self.map, self.used, len(encoded))
+        self.map[self.used + KEY_LENGTH.size:self.used + KEY_LENGTH.size + len(encoded)] = encoded
+        VALUE.pack_into(self.map, value_offset, 0.0)
+        self.used = end
+        HEADER.pack_into(self.map, 0, self.used)
+        return value_offset
+
+    def values(self) -> dict:
+        with self.lock:
+            return {key: VALUE.unpack_from(self.map, offset)[0] for key, offset in self.offsets.items()}
+
+    def close(self) -> None:
+        self.map.close()
+        self.file.close()
+
+def read_samples(path) -> dict:
+    """
+    The samples in a file, or nothing if it is gone or not written yet.
+    """
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        return {}
+    if len(data) < FIRST_ENTRY:
+        return {}
+    return {decode_key(key): value for key, _, value in read_entries(data, HEADER.unpack_from(data, 0)[0])}
+
+@contextmanager
+def directory_lock(directory, operation):
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+        fcntl.flock(lock, operation)
+        yield
+
+def process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Alive, just not ours to signal
+        return True
+    return True
+
+def archive_exited_processes(directory) -> None:
+    """
+    Add the samples files of processes that have exited into the archive file and delete them.
+    """
+    prefix, suffix = FILE_PATTERN.split('{}')
+    with directory_lock(directory, fcntl.LOCK_EX):
+        archive = None
+        for path in glob.glob(os.path.join(directory, FILE_PATTERN.format('*'))):
+            pid = os.path.basename(path)[len(prefix):-len(suffix)]
+            if not pid.isdigit() or process_exists(int(pid)):
+                continue
+            archive = archive or MetricsFile(os.path.join(directory, ARCHIVE_FILE))
+            for key, value in read_samples(path).items():
+                archive.add(key, value)
+            os.remove(path)
+        if archive is not None:
+            archive.close()
+
+class MemoryMetrics:
+    """
+    The samples of this process only, for when no METRICS_DIR is configured.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(float)
+
+    def add(self, key, amount) -> None:
+        with self.lock:
+            self.samples[key] += amount
+
+    def values(self) -> dict:
+        with self.lock:
+            return dict(self.samples)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store():
+    """
+    This process's samples for the current METRICS_DIR. Keyed by pid, so a forked worker never
+    writes to its parent's file.
+    """
+    directory = getattr(settings, 'METRICS_DIR', '')
+    key = (str(directory), os.getpid())
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                    archive_exited_processes(directory)
+                    store = MetricsFile(os.path.join(directory, FILE_PATTERN.format(os.getpid())))
+                else:
+                    store = MemoryMetrics()
+                _stores[key] = store
+    return store
+
+def collect() -> dict:
+    """
+    Every sample summed over all processes writing to METRICS_DIR.
+    """
+    directory = getattr(settings, 'METRICS_DIR', '')
+    if not directory:
+        return get_store().values()
+    totals = defaultdict(float)
+    os.makedirs(directory, exist_ok=True)
+    with directory_lock(directory, fcntl.LOCK_SH):
+        for path in glob.glob(os.path.join(directory, FILE_PATTERN.format('*'))):
+            for key, value in read_samples(path).items():
+                totals[key] += value
+    return totals
+
+def sample_key(name, labels):
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels) -> None:
+        get_store().add(sample_key(self.name, labels), amount)
+
+    def samples(self, values):
+        return sorted((key, value) for key, value in values.items() if key[0] == self.name)
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets) + (math.inf,)
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels) -> None:
+        # Buckets are stored one by one and only made cumulative when rendered, so an
+        # observation is three additions however many buckets there are
+        store = get_store()
+        bucket = next(bound for bound in self.buckets if value <= bound)
+        store.add(sample_key(f'{self.name}_bucket', dict(labels, le=format_value(bucket))), 1)
+        store.add(sample_key(f'{self.name}_sum', labels), value)
+        store.add(sample_key(f'{self.name}_count', labels), 1)
+
+    def samples(self, values):
+        series = defaultdict(lambda: defaultdict(float))
+        for (name, labels), value in values.items():
+            if name == f'{self.name}_bucket':
+                series[tuple(label for label in labels if label[0] != 'le')][dict(labels)['le']] += value
+        for labels, buckets in sorted(series.items()):
+            cumulative = 0
+            for bound in self.buckets:
+                cumulative += buckets.get(format_value(bound), 0)
+                yield (f'{self.name}_bucket', labels + (('le', format_value(bound)),)), cumulative
+            yield (f'{self.name}_sum', labels), values.get((f'{self.name}_sum', labels), 0)
+            yield (f'{self.name}_count', labels), values.get((f'{self.name}_count', labels), 0)
+
+def format_value(value) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+def escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def render() -> str:
+    """
+    All metrics in the Prometheus text exposition format (version 0.0.4).
+    """
+    values = collect()
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for (name, labels), value in metric.samples(values):
+            label_text = ','.join(f'{label}="{escape(label_value)}"' for label, label_value in labels)
+            lines.append(f'{name}{{{label_text}}} {format_value(value)}' if label_text else f'{name} {format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+REGISTRY = []
+
+REQUESTS = Counter('connections_http_requests_total', 'HTTP requests by route name, method and status code.')
+REQUEST_LATENCY = Histogram('connections_http_request_duration_seconds',
+                            'Time to respond to HTTP requests, by route name, method and status code.')
+SUBMISSIONS_INGESTED = Counter('connections_submissions_ingested_total',
+                               'Submissions accepted, by write mode (sync or buffered).')
+CACHE_REQUESTS = Counter('connections_cache_requests_total', 'Cache lookups by cache and result (hit or miss).')
+
+def observe_request(route, method, status, seconds) -> None:
+    labels = {'route': route, 'method': method, 'status': status}
+    REQUESTS.inc(**labels)
+    REQUEST_LATENCY.observe(seconds, **labels)
+
+def count_cache(cache_name, hits, misses) -> None:
+    if hits:
+        CACHE_REQUESTS.inc(hits, cache=cache_name, result='hit')
+    if misses:
+        CACHE_REQUESTS.inc(misses, cache=cache_name, result='miss')
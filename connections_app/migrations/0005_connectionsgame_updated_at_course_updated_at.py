@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-17 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections_app', '0004_connectionsgame_relevant_info'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connectionsgame',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.1 on 2026-10-17 11:31
+
+import hashlib
+import json
+
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_guess_group_counts(apps, schema_editor):
+    Submission = apps.get_model('connections_app', 'Submission')
+    GuessGroupCount = apps.get_model('connections_app', 'GuessGroupCount')
+
+    totals = defaultdict(Counter)
+    groups = {}
+    for game_id, guesses in Submission.objects.values_list('game_id', 'guesses').iterator(chunk_size=2000):
+        for guess_group in guesses or []:
+            if not isinstance(guess_group, list):
+                continue
+            try:
+                sorted_group = sorted(guess_group)
+            except TypeError:
+                continue
+            group_hash = hashlib.sha1(json.dumps(sorted_group).encode()).hexdigest()
+            totals[game_id][group_hash] += 1
+            groups[group_hash] = sorted_group
+
+    GuessGroupCount.objects.bulk_create(
+        [GuessGroupCount(game_id=game_id, group_hash=group_hash, guess_group=groups[group_hash], count=count)
+         for game_id, game_counts in totals.items()
+         for group_hash, count in game_counts.items()],
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections_app', '0005_connectionsgame_updated_at_course_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuessGroupCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group_hash', models.CharField(max_length=40)),
+                ('guess_group', models.JSONField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='guess_group_counts', to='connections_app.connectionsgame')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('game', 'group_hash'), name='unique_guess_group_per_game')],
+            },
+        ),
+        migrations.RunPython(backfill_guess_group_counts, migrations.RunPython.noop),
+    ]
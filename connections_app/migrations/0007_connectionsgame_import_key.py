@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-17 11:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections_app', '0006_guessgroupcount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connectionsgame',
+            name='import_key',
+            field=models.CharField(blank=True, default=None, max_length=64, null=True, unique=True),
+        ),
+    ]
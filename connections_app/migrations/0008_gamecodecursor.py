@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-17 11:37
+
+from django.db import migrations, models
+
+
+def create_default_cursor(apps, schema_editor):
+    GameCodeCursor = apps.get_model('connections_app', 'GameCodeCursor')
+    GameCodeCursor.objects.get_or_create(name='BCDFGHJKLMNPQRSTVWXYZ:4')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections_app', '0007_connectionsgame_import_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameCodeCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32, unique=True)),
+                ('position', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_default_cursor, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-17 11:39
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections_app', '0008_gamecodecursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='buffer_id',
+            field=models.UUIDField(blank=True, default=None, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='submitted_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
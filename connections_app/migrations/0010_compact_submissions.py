@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-17 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections_app', '0009_submission_buffer_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connectionsgame',
+            name='guess_vocabulary',
+            field=models.JSONField(blank=True, default=None, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='guess_masks',
+            field=models.BinaryField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='time_ms',
+            field=models.BinaryField(blank=True, default=None, null=True),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='guesses',
+            field=models.JSONField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='time_taken',
+            field=models.JSONField(null=True),
+        ),
+    ]
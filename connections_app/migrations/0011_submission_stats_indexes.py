@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-17 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections_app', '0010_compact_submissions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['game', 'submitted_at'], name='submission_game_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['game', 'is_won'], name='submission_game_won_idx'),
+        ),
+    ]
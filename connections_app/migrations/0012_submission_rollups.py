@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-17 11:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections_app', '0011_submission_stats_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32, unique=True)),
+                ('position', models.DateTimeField(blank=True, default=None, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SubmissionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('submissions', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('solve_time_total', models.FloatField(default=0)),
+                ('solve_time_count', models.PositiveIntegerField(default=0)),
+                ('solve_time_min', models.FloatField(blank=True, default=None, null=True)),
+                ('solve_time_max', models.FloatField(blank=True, default=None, null=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='connections_app.connectionsgame')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'bucket'], name='rollup_period_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('game', 'period', 'bucket'), name='unique_rollup_bucket_per_game')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-17 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections_app', '0012_submission_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['submitted_at', 'id'], name='submission_time_id_idx'),
+        ),
+    ]
@@ -1,9 +1,17 @@
 from django.db import models
+from django.utils import timezone
+
+class ConnectionsGameQuerySet(models.QuerySet):
+    def with_related(self):
+        # Load course, categories and words up front so serializing a page of games
+        # costs a fixed number of queries instead of one per category.
+        return self.select_related('course').prefetch_related('categories__words')
 
 class ConnectionsGame(models.Model):
     title = models.CharField(max_length=255)
     game_code = models.CharField(max_length=4, unique=True)  # Ensure this field is unique
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Drives ETag / Last-Modified on game endpoints
     relevant_info = models.TextField(default="")
     syntax_highlighting = models.CharField(max_length=20, choices=[
         ('python', 'Python'),
@@ -16,6 +24,10 @@ class ConnectionsGame(models.Model):
     words_per_category = models.IntegerField()
     published = models.BooleanField(default=False)
     course = models.ForeignKey('Course', related_name='games', on_delete=models.SET_NULL, null=True, blank=True, default=None)
+    import_key = models.CharField(max_length=64, unique=True, null=True, blank=True, default=None)  # Content hash set by the bulk importer
+    guess_vocabulary = models.JSONField(null=True, blank=True, default=None, editable=False)  # Frozen word list compact guesses index into; see compact.py
+
+    objects = ConnectionsGameQuerySet.as_manager()
 
     def save(self, *args, **kwargs):
         if not self.course:
@@ -25,6 +37,7 @@ class ConnectionsGame(models.Model):
 class Course(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
 
 class Category(models.Model):
     related_game = models.ForeignKey(ConnectionsGame, on_delete=models.CASCADE, related_name='categories')
@@ -38,7 +51,66 @@ class Word(models.Model):
 
 class Submission(models.Model):
     game = models.ForeignKey(ConnectionsGame, on_delete=models.CASCADE)
-    guesses = models.JSONField()  # Store as JSON for easy storage of arrays
-    time_taken = models.JSONField()  # Store array of time taken for each guess
+    guesses = models.JSONField(null=True)  # Store as JSON for easy storage of arrays; NULL when stored in guess_masks
+    time_taken = models.JSONField(null=True)  # Store array of time taken for each guess; NULL when stored in time_ms
     is_won = models.BooleanField(default=False)
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(default=timezone.now)  # Not auto_now_add, so buffered writes keep their accept time
+    buffer_id = models.UUIDField(unique=True, null=True, blank=True, default=None)  # Set by the write-behind buffer so replays are idempotent
+    guess_masks = models.BinaryField(null=True, blank=True, default=None)  # Compact guesses: packed word bitmasks, see compact.py
+    time_ms = models.BinaryField(null=True, blank=True, default=None)  # Compact time_taken: packed milliseconds
+
+    class Meta:
+        indexes = [
+            # Stats filter one game by a submitted_at window, or count its wins
+            models.Index(fields=['game', 'submitted_at'], name='submission_game_time_idx'),
+            models.Index(fields=['game', 'is_won'], name='submission_game_won_idx'),
+            # Keyset pagination of the admin submission list
+            models.Index(fields=['submitted_at', 'id'], name='submission_time_id_idx'),
+        ]
+
+class GuessGroupCount(models.Model):
+    # Running count of how often each (sorted) guess group was submitted for a game,
+    # maintained by aggregates.record_guesses so stats never rescan Submission.
+    game = models.ForeignKey(ConnectionsGame, on_delete=models.CASCADE, related_name='guess_group_counts')
+    group_hash = models.CharField(max_length=40)
+    guess_group = models.JSONField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'group_hash'], name='unique_guess_group_per_game'),
+        ]
+
+class GameCodeCursor(models.Model):
+    # Persisted position in the game code permutation; see codes.allocate_game_codes
+    name = models.CharField(max_length=32, unique=True)
+    position = models.BigIntegerField(default=0)
+
+class SubmissionRollup(models.Model):
+    # Per game submission summary for one hour (UTC) or day (TIME_ZONE) bucket,
+    # maintained incrementally by rollups.refresh_rollups for dashboards
+    HOUR = 'hour'
+    DAY = 'day'
+
+    game = models.ForeignKey(ConnectionsGame, on_delete=models.CASCADE, related_name='rollups')
+    period = models.CharField(max_length=4, choices=[(HOUR, 'Hour'), (DAY, 'Day')])
+    bucket = models.DateTimeField()  # Start of the hour or day
+    submissions = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    solve_time_total = models.FloatField(default=0)  # Summed time_taken of won submissions
+    solve_time_count = models.PositiveIntegerField(default=0)
+    solve_time_min = models.FloatField(null=True, blank=True, default=None)
+    solve_time_max = models.FloatField(null=True, blank=True, default=None)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'period', 'bucket'], name='unique_rollup_bucket_per_game'),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'bucket'], name='rollup_period_bucket_idx'),
+        ]
+
+class RollupWatermark(models.Model):
+    # Submissions before position are already in SubmissionRollup
+    name = models.CharField(max_length=32, unique=True)
+    position = models.DateTimeField(null=True, blank=True, default=None)
@@ -0,0 +1,157 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a compound ordering that ends in a unique field, e.g. ('submitted_at', 'id').
+
+    The cursor carries the key of the last row served, and the next page is the rows after that
+    key, so every page is a single range scan of an index on the ordering and a deep page costs
+    the same as the first. Unlike DRF's CursorPagination, ties on the leading field are broken by
+    the later fields rather than by an offset.
+    """
+    ordering = ('id',)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def encode_cursor(self, key, reverse):
+        payload = json.dumps({'k': [value.isoformat() if hasattr(value, 'isoformat') else value for value in key],
+                              'r': reverse})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            key = [model._meta.get_field(name.lstrip('-')).to_python(value)
+                   for name, value in zip(self.ordering, payload['k'], strict=True)]
+            return key, bool(payload['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def after(self, key, reverse) -> Q:
+        """
+        Rows strictly after key in the ordering (before it, when reverse), as one predicate.
+        """
+        condition = Q()
+        equal = Q()
+        for name, value in zip(self.ordering, key):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') != reverse else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def get_key(self, row):
+        return [getattr(row, name.lstrip('-')) for name in self.ordering]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        key, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = [name[1:] if name.startswith('-') else '-' + name for name in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if key is not None:
+            queryset = queryset.filter(self.after(key, reverse))
+        rows = list(queryset[:self.page_size + 1])
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Walking forward there is a previous page whenever we started from a cursor; walking back
+        # there is always a next page
+        self.has_next = more if not reverse else key is not None
+        self.has_previous = key is not None if not reverse else more
+        self.first_key = self.get_key(rows[0]) if rows else key
+        self.last_key = self.get_key(rows[-1]) if rows else key
+        return rows
+
+    def get_link(self, key, reverse):
+        url = self.request.build_absolute_uri()
+        if key is None:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(key, reverse))
+
+    def get_next_link(self):
+        return self.get_link(self.last_key, False) if self.has_next else None
+
+    def get_previous_link(self):
+        return self.get_link(self.first_key, True) if self.has_previous else None
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+class PageOrCursorPagination(PageNumberPagination):
+    """
+    Page numbers by default, or keyset cursors (see KeysetPagination) on request.
+
+    A request gets cursor pages when it passes ?pagination=cursor or a cursor, and page numbers
+    when it passes ?pagination=page or a page; otherwise PUBLIC_PAGINATION_MODE decides. Cursor
+    pages skip the COUNT(*) and the OFFSET scan, so deep pages cost the same as the first.
+    """
+    ordering = ('id',)
+    mode_query_param = 'pagination'
+
+    def use_cursor(self, request) -> bool:
+        mode = request.query_params.get(self.mode_query_param)
+        if mode in ('cursor', 'page'):
+            return mode == 'cursor'
+        if KeysetPagination.cursor_query_param in request.query_params:
+            return True
+        if self.page_query_param in request.query_params:
+            return False
+        return getattr(settings, 'PUBLIC_PAGINATION_MODE', 'page') == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if not self.use_cursor(request):
+            return super().paginate_queryset(queryset, request, view)
+        self.keyset = KeysetPagination()
+        self.keyset.ordering = self.ordering
+        self.keyset.page_size = self.page_size
+        self.keyset.page_size_query_param = self.page_size_query_param
+        self.keyset.max_page_size = self.max_page_size
+        return self.keyset.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,140 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from numbers import Number
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+
+from .compact import decode_times
+from .models import RollupWatermark, Submission, SubmissionRollup
+
+WATERMARK_NAME = 'submissions'
+PERIODS = (SubmissionRollup.HOUR, SubmissionRollup.DAY)
+COUNTER_FIELDS = ('submissions', 'wins', 'solve_time_total', 'solve_time_count')
+
+def bucket_start(moment, period):
+    """
+    Start of the bucket moment falls in: the UTC hour, or the calendar day in TIME_ZONE.
+    """
+    if period == SubmissionRollup.HOUR:
+        return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return timezone.make_aware(datetime.combine(timezone.localtime(moment).date(), time.min))
+
+def solve_time(time_taken):
+    """
+    Time to solve a won game: the sum of its per-guess times, ignoring anything non-numeric.
+    """
+    return sum(value for value in time_taken or [] if isinstance(value, Number) and not isinstance(value, bool))
+
+def summarize(rows) -> dict:
+    """
+    Fold (game_id, submitted_at, is_won, time_taken, time_ms) rows into
+    {(game_id, period, bucket): SubmissionRollup} with unsaved, freshly counted rollups.
+    """
+    rollups = {}
+    for game_id, submitted_at, is_won, time_taken, time_ms in rows:
+        if is_won:
+            solved_in = solve_time(time_taken if time_taken is not None or time_ms is None else decode_times(time_ms))
+        for period in PERIODS:
+            key = (game_id, period, bucket_start(submitted_at, period))
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = SubmissionRollup(game_id=game_id, period=period, bucket=key[2])
+            rollup.submissions += 1
+            if is_won:
+                rollup.wins += 1
+                rollup.solve_time_total += solved_in
+                rollup.solve_time_count += 1
+                rollup.solve_time_min = solved_in if rollup.solve_time_min is None else min(rollup.solve_time_min, solved_in)
+                rollup.solve_time_max = solved_in if rollup.solve_time_max is None else max(rollup.solve_time_max, solved_in)
+    return rollups
+
+def merge_rollups(rollups, batch_size=1000) -> None:
+    """
+    Add freshly counted rollups to the stored ones, creating buckets that don't exist yet.
+    """
+    if not rollups:
+        return
+    buckets = [bucket for _, _, bucket in rollups]
+    existing = SubmissionRollup.objects.filter(
+        game_id__in={game_id for game_id, _, _ in rollups},
+        bucket__gte=min(buckets), bucket__lte=max(buckets)
+    )
+    changed = []
+    for stored in existing.iterator(chunk_size=batch_size):
+        fresh = rollups.pop((stored.game_id, stored.period, stored.bucket), None)
+        if fresh is None:
+            continue
+        for field in COUNTER_FIELDS:
+            setattr(stored, field, getattr(stored, field) + getattr(fresh, field))
+        for field, pick in (('solve_time_min', min), ('solve_time_max', max)):
+            values = [value for value in (getattr(stored, field), getattr(fresh, field)) if value is not None]
+            setattr(stored, field, pick(values) if values else None)
+        changed.append(stored)
+    SubmissionRollup.objects.bulk_update(changed, COUNTER_FIELDS + ('solve_time_min', 'solve_time_max'), batch_size=batch_size)
+    SubmissionRollup.objects.bulk_create(rollups.values(), batch_size=batch_size)
+
+def refresh_rollups(now=None, lag=None, chunk_size=2000) -> int:
+    """
+    Roll up submissions between the stored high-water mark and now - lag, then advance the mark.
+    Returns the number of submissions rolled up.
+
+    Submissions are only rolled up once they are lag old, so rows that reach the table late
+    (buffered writes keep their accept time in submitted_at) are still picked up. The mark row
+    stays locked for the whole run, so overlapping runs never count a submission twice.
+    """
+    if lag is None:
+        lag = timedelta(seconds=getattr(settings, 'ROLLUP_LAG_SECONDS', 300))
+    cutoff = (now or timezone.now()) - lag
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK_NAME)
+        if watermark.position is not None and watermark.position >= cutoff:
+            return 0
+        submissions = Submission.objects.filter(submitted_at__lt=cutoff).order_by()
+        if watermark.position is not None:
+            submissions = submissions.filter(submitted_at__gte=watermark.position)
+        rows = submissions.values_list('game_id', 'submitted_at', 'is_won', 'time_taken', 'time_ms')
+        rollups = summarize(rows.iterator(chunk_size=chunk_size))
+        rolled_up = sum(rollup.submissions for rollup in rollups.values() if rollup.period == SubmissionRollup.HOUR)
+        merge_rollups(rollups)
+        watermark.position = cutoff
+        watermark.save(update_fields=['position'])
+    return rolled_up
+
+def rebuild_rollups(now=None, lag=None, chunk_size=2000) -> int:
+    """
+    Drop every rollup and count again from scratch, picking up admin edits and deletions.
+    """
+    with transaction.atomic():
+        RollupWatermark.objects.filter(name=WATERMARK_NAME).update(position=None)
+        SubmissionRollup.objects.all().delete()
+        return refresh_rollups(now, lag, chunk_size)
+
+def rollup_series(rollups):
+    """
+    One entry per bucket, with game rollups in the same bucket added together.
+    """
+    series = rollups.order_by().values('bucket').annotate(
+        submissions_total=Sum('submissions'),
+        wins_total=Sum('wins'),
+        solve_time_sum=Sum('solve_time_total'),
+        solved=Sum('solve_time_count'),
+        fastest=Min('solve_time_min'),
+        slowest=Max('solve_time_max'),
+    ).order_by('bucket')
+    return [
+        {
+            'bucket': row['bucket'],
+            'submissions': row['submissions_total'],
+            'wins': row['wins_total'],
+            'win_rate': round(row['wins_total'] / row['submissions_total'], 4) if row['submissions_total'] else None,
+            'average_solve_time': round(row['solve_time_sum'] / row['solved'], 2) if row['solved'] else None,
+            'fastest_solve_time': row['fastest'],
+            'slowest_solve_time': row['slowest'],
+        }
+        for row in series
+    ]
+
+def rollup_watermark():
+    return RollupWatermark.objects.filter(name=WATERMARK_NAME).values_list('position', flat=True).first()
@@ -0,0 +1,69 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+# Read replica routing.
+#
+# When DATABASES has a 'replica' alias, the read-only catalog and stats views read from it and
+# everything else (writes, admin views, and the reads submissions make before writing) stays
+# on the primary. Reads only move inside replica_reads(), so code never reads from the replica
+# by accident, e.g. inside a write transaction.
+#
+# Read-your-writes holds however far the replica lags, without tracking who wrote what:
+# - Rendered games are only read from the database on a payload cache miss, and every change to
+#   a game invalidates its payload, so those reads stay on the primary (the by-code views don't
+#   use the replica). A render from a replica that is behind can never land in the cache.
+# - A 404 from the replica, e.g. stats for a game uploaded a moment ago, is retried once on the
+#   primary.
+# Lists and stats of rows that already existed can trail the primary by the replication lag.
+
+REPLICA = 'replica'
+
+_read_alias = ContextVar('read_alias', default=None)
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema by replication
+        return db != REPLICA
+
+def replica_configured() -> bool:
+    return REPLICA in connections
+
+@contextmanager
+def replica_reads():
+    """
+    Send the ORM reads made inside the block to the replica, if there is one. Yields the alias
+    reads go to (None for the primary).
+    """
+    alias = REPLICA if replica_configured() else None
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+class ReplicaReadsMixin:
+    """
+    For DRF views: serve GET, HEAD and OPTIONS requests from the replica, retrying a 404 on the
+    primary in case the replica has not caught up yet.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads() as alias:
+            response = super().dispatch(request, *args, **kwargs)
+        if alias is not None and response.status_code == 404:
+            response = super().dispatch(request, *args, **kwargs)
+        return response
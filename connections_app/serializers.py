@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .compact import decode_submission, load_vocabularies
 from .models import ConnectionsGame, Category, Word, Submission
 from .models import Course
 
@@ -42,12 +43,70 @@ class ConnectionsGameSerializer(serializers.ModelSerializer):
                   'relevant_info',
                   'game']
 
+class ConnectionsGameSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ConnectionsGame
+        fields = ['id',
+                  'game_code',
+                  'title',
+                  'published',
+                  'syntax_highlighting',
+                  'created_at',
+                  'author',
+                  'num_categories',
+                  'words_per_category']
+
+class CourseCatalogSerializer(CourseSerializer):
+    games = ConnectionsGameSerializer(many=True)
+
+    class Meta(CourseSerializer.Meta):
+        fields = CourseSerializer.Meta.fields + ['games']
+
+class CourseCatalogSummarySerializer(CourseSerializer):
+    games = ConnectionsGameSummarySerializer(many=True)
+
+    class Meta(CourseSerializer.Meta):
+        fields = CourseSerializer.Meta.fields + ['games']
+
+class SubmissionListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Load the vocabularies of every compact submission on the page in one go
+        submissions = list(data.all() if hasattr(data, 'all') else data)
+        self.context['vocabularies'] = load_vocabularies(
+            {submission.game_id for submission in submissions if submission.guess_masks is not None})
+        return super().to_representation(submissions)
+
 class SubmissionSerializer(serializers.ModelSerializer):
     game = serializers.PrimaryKeyRelatedField(queryset=ConnectionsGame.objects.all())
+    guesses = serializers.JSONField()
+    time_taken = serializers.JSONField()
 
     class Meta:
         model = Submission
         fields = ['id', 'game', 'guesses', 'time_taken', 'is_won', 'submitted_at']
+        read_only_fields = ['submitted_at']
+        list_serializer_class = SubmissionListSerializer
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.guesses is None or instance.time_taken is None:
+            # Stored compactly; see compact.py
+            vocabularies = self.context.get('vocabularies')
+            if vocabularies is None or instance.game_id not in vocabularies:
+                vocabularies = load_vocabularies([instance.game_id])
+            data['guesses'], data['time_taken'] = decode_submission(
+                instance.guesses, instance.time_taken, instance.guess_masks, instance.time_ms,
+                vocabularies.get(instance.game_id))
+        return data
+
+class SubmissionPayloadSerializer(serializers.ModelSerializer):
+    # For submissions whose game is already resolved, so the game is not looked up a second time
+    guesses = serializers.JSONField()
+    time_taken = serializers.JSONField()
+
+    class Meta:
+        model = Submission
+        fields = ['guesses', 'time_taken', 'is_won']
 
 class UploadSerializer(serializers.Serializer):
     file_uploaded = serializers.FileField()
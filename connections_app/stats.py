@@ -1,26 +1,99 @@
 import json
 
-from collections import defaultdict
+from datetime import datetime, time
 
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import ConnectionsGame, Category, Word, Submission
-
-class GuessDistributionView(APIView):
+from .aggregates import count_stored_guess_groups
+from .analytics import course_analytics
+from .models import ConnectionsGame, Course, Submission, GuessGroupCount, SubmissionRollup
+from .rollups import rollup_series, rollup_watermark
+from .routers import ReplicaReadsMixin
+from .timing import build_answer_key, stored_time_distribution
+
+def stream_submissions(submissions, *fields):
+    """
+    Yield the given fields of each submission, fetched in chunks so memory stays flat
+    no matter how many submissions a game has.
+    """
+    chunk_size = getattr(settings, 'STATS_CHUNK_SIZE', 2000)
+    return submissions.order_by().values_list(*fields).iterator(chunk_size=chunk_size)
+
+def parse_moment(value: str):
+    """
+    Parse an ISO 8601 datetime, or a date meaning its midnight, in the current time zone.
+    """
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.combine(day, time.min) if day is not None else None
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+def parse_window(params, field='submitted_at') -> dict:
+    """
+    Turn the optional since (inclusive) and until (exclusive) query parameters into
+    filters on field. Raises ValueError if either can't be parsed.
+    """
+    filters = {}
+    for param, lookup in (('since', f'{field}__gte'), ('until', f'{field}__lt')):
+        value = params.get(param)
+        if not value:
+            continue
+        moment = parse_moment(value)
+        if moment is None:
+            raise ValueError(f'{param} must be an ISO 8601 date or datetime')
+        filters[lookup] = moment
+    return filters
+
+def filter_submissions(submissions, params):
+    """
+    Narrow submissions by the game_code, course (id), since and until parameters.
+    Raises ValueError if any of them can't be parsed.
+    """
+    submissions = submissions.filter(**parse_window(params))
+    if params.get('game_code'):
+        submissions = submissions.filter(game__game_code=params['game_code'])
+    if params.get('course'):
+        if not str(params['course']).isdigit():
+            raise ValueError('course must be a course id')
+        submissions = submissions.filter(game__course_id=int(params['course']))
+    return submissions
+
+def count_submissions(submissions) -> dict:
+    # One pass answers both counts; without a window it is an index-only scan of (game, is_won)
+    return submissions.aggregate(submission_count=Count('id'), wins=Count('id', filter=Q(is_won=True)))
+
+class GuessDistributionView(ReplicaReadsMixin, APIView):
     def get(self, request, game_code: str, *args, **kwargs):
+        try:
+            window = parse_window(request.query_params)
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             game = ConnectionsGame.objects.get(game_code=game_code)
         except ConnectionsGame.DoesNotExist:
             return Response({'status': 'error', 'message': 'Game not found for this code'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Fetch submissions for the specified game
-        submissions = Submission.objects.filter(game=game)
-        if not submissions:
+        submissions = Submission.objects.filter(game=game, **window)
+        if not submissions.exists():
             return Response({'status': 'error', 'message': 'Submissions not found for this game'}, status=status.HTTP_400_BAD_REQUEST)
 
-        guess_distribution = self.get_guess_distribution(submissions)
+        if window:
+            guess_distribution = self.get_windowed_guess_distribution(game, submissions)
+        else:
+            guess_distribution = self.get_guess_distribution(game)
 
         def convert_dict(d):
             return {str(k): v for k, v in d.items()}
@@ -30,17 +103,25 @@ class GuessDistributionView(APIView):
         return Response(json_data)
     
     @staticmethod
-    def get_guess_distribution(submissions):
-        guess_distribution = defaultdict(int)
-        
-        for submission in submissions:
-            guesses = submission.guesses
-            for guess_group in guesses:
-                guess_distribution[tuple(sorted(guess_group))] += 1
-        return guess_distribution
+    def get_guess_distribution(game):
+        # Read the counts maintained by aggregates.record_guesses instead of scanning submissions
+        counts = GuessGroupCount.objects.filter(game=game).order_by('id').values_list('guess_group', 'count')
+        return {tuple(guess_group): count for guess_group, count in counts}
+
+    @staticmethod
+    def get_windowed_guess_distribution(game, submissions):
+        # The running counts cover all time, so a window is counted from its submissions
+        rows = stream_submissions(submissions, 'game_id', 'guesses', 'guess_masks')
+        totals, groups, _ = count_stored_guess_groups(rows, {game.pk: game.guess_vocabulary})
+        return {tuple(groups[group_hash]): count for group_hash, count in totals[game.pk].items()}
     
-class AverageTimePerCategoryView(APIView):
+class AverageTimePerCategoryView(ReplicaReadsMixin, APIView):
     def get(self, request, game_code: str, *args, **kwargs):
+        try:
+            window = parse_window(request.query_params)
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             # Fetch the game using the game code
             game = ConnectionsGame.objects.get(game_code=game_code)
@@ -48,19 +129,13 @@ class AverageTimePerCategoryView(APIView):
             return Response({'status': 'error', 'message': 'Game not found for this code'}, status=status.HTTP_404_NOT_FOUND)
 
         # Fetch submissions for the specified game
-        submissions = Submission.objects.filter(game=game)
-        if not submissions:
+        submissions = Submission.objects.filter(game=game, **window)
+        if not submissions.exists():
             return Response({'status': 'error', 'message': 'Submissions not found for this game'}, status=status.HTTP_400_BAD_REQUEST)
 
-        res = []
-        categories_by_id = list(Category.objects.filter(related_game=game).values_list('pk', flat=True))
-        for category in categories_by_id:
-            # Fetch all words related to this category
-            res.append(sorted(list(
-                Word.objects.filter(category=category).values_list('word', flat=True)
-            )))
-        
-        guess_distribution = self.get_guess_time_distribution(submissions, res)
+        answer_key = build_answer_key(game)
+        rows = stream_submissions(submissions, 'guesses', 'time_taken', 'guess_masks', 'time_ms')
+        guess_distribution = self.get_guess_time_distribution(rows, answer_key, game.guess_vocabulary)
 
         def convert_dict(d):
             return {str(k): v for k, v in d.items()}
@@ -74,44 +149,83 @@ class AverageTimePerCategoryView(APIView):
         return Response(json_data)
 
     @staticmethod
-    def get_guess_time_distribution(submissions, correct_categories):
-        # Dictionary to store total time and count of samples for each guess group
-        guess_distribution = defaultdict(lambda: {'total_time': 0, 'count': 0})
-        
-        for submission in submissions:
-            guesses = submission.guesses
-            for guess_group in guesses:
-                # Convert guess_group to a tuple and sort it for consistency
-                sorted_group = sorted(guess_group)
-                if sorted_group in correct_categories:
-                    # Get the index of the guess group in the list
-                    index = guesses.index(guess_group)
-                    # Get the time taken for the current guess group
-                    time_value = submission.time_taken[index]
-                    # Update total time and count in the distribution
-                    guess_distribution[tuple(sorted_group)]['total_time'] += time_value
-                    guess_distribution[tuple(sorted_group)]['count'] += 1
-
-        # Calculate average time for each guess group
-        average_distribution = {}
-        for group, values in guess_distribution.items():
-            if values['count'] > 0:
-                average_time = round(values['total_time'] / values['count'], 2)
-            else:
-                average_time = 0
-            average_distribution[group] = (average_time, values['count'])
-        return average_distribution
-
-class SubmissionCountView(APIView):
+    def get_guess_time_distribution(rows, answer_key, vocabulary=None):
+        # rows are stored submission columns; see timing.stored_time_distribution
+        return stored_time_distribution(rows, answer_key, vocabulary)
+
+class SubmissionCountView(ReplicaReadsMixin, APIView):
     def get(self, request, game_code: str, *args, **kwargs):
+        try:
+            window = parse_window(request.query_params)
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             # Fetch the game using the game code
             game = ConnectionsGame.objects.get(game_code=game_code)
         except ConnectionsGame.DoesNotExist:
             return Response({'status': 'error', 'message': 'Game not found for this code'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Count submissions for the specified game
-        submissions_count = Submission.objects.filter(game=game).count()
-        wins_count = Submission.objects.filter(game=game, is_won=True).count()
+        # Count submissions and wins for the specified game
+        counts = count_submissions(Submission.objects.filter(game=game, **window))
+        return Response(counts, status=status.HTTP_200_OK)
+
+class RollupView(ReplicaReadsMixin, APIView):
+    """
+    Submission counts, wins and solve times per hour or day, read from the rollup tables so
+    the cost grows with the number of buckets rather than submissions.
+
+    Accepts period (hour or day, default day) and since / until on the bucket start. Buckets
+    cover submissions up to up_to; see rollups.refresh_rollups.
+
+    Subclasses define get_rollups(**url kwargs), returning the SubmissionRollup queryset to read,
+    or None to answer 404 with not_found_message.
+    """
+    not_found_message = 'Not found'
+
+    def get(self, request, *args, **kwargs):
+        period = request.query_params.get('period', SubmissionRollup.DAY)
+        if period not in (SubmissionRollup.HOUR, SubmissionRollup.DAY):
+            return Response({'status': 'error', 'message': 'period must be hour or day'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            window = parse_window(request.query_params, field='bucket')
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rollups = self.get_rollups(**kwargs)
+        if rollups is None:
+            return Response({'status': 'error', 'message': self.not_found_message}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'period': period,
+            'up_to': rollup_watermark(),
+            'buckets': rollup_series(rollups.filter(period=period, **window)),
+        }, status=status.HTTP_200_OK)
+
+class GameRollupView(RollupView):
+    not_found_message = 'Game not found for this code'
+
+    def get_rollups(self, game_code: str):
+        game_id = ConnectionsGame.objects.filter(game_code=game_code).values_list('pk', flat=True).first()
+        return SubmissionRollup.objects.filter(game_id=game_id) if game_id is not None else None
+
+class CourseRollupView(RollupView):
+    not_found_message = 'Course not found'
+
+    def get_rollups(self, course_id: int):
+        if not Course.objects.filter(pk=course_id).exists():
+            return None
+        return SubmissionRollup.objects.filter(game__course_id=course_id)
+
+class CourseAnalyticsView(ReplicaReadsMixin, APIView):
+    """
+    Counts, win rates, mean solve times and hardest categories for every game in a course, in
+    one response and a fixed number of queries; see analytics.course_analytics.
+    """
+    def get(self, request, course_id: int, *args, **kwargs):
+        try:
+            course = Course.objects.get(pk=course_id)
+        except Course.DoesNotExist:
+            return Response({'status': 'error', 'message': 'Course not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        return Response({'submission_count': submissions_count, 'wins': wins_count}, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(course_analytics(course), status=status.HTTP_200_OK)
@@ -0,0 +1,120 @@
+import math
+import random
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .aggregates import rebuild_guess_counts
+from .codes import create_with_game_codes
+from .compact import prepare_for_storage
+from .models import ConnectionsGame, Category, Course, Submission, Word
+
+# Synthetic courses, games and submissions for benchmarks and load tests.
+#
+# Each simulated player has a skill between 0 and 1 and plays like people do: they go for the
+# easiest category left most of the time, get harder categories wrong more often, and lose after
+# MAX_MISTAKES wrong guesses. A wrong guess is usually "one away": three words of the category
+# they were after and one from another. Guess times are log-normal, slower for harder categories
+# and after a mistake, and submissions are spread over the last `days` days with an evening peak.
+
+MAX_MISTAKES = 4
+MEDIAN_GUESS_SECONDS = 12
+BUSY_HOURS = (10, 11, 14, 15, 19, 20, 21, 22)
+
+def play(rng, categories, skill):
+    """
+    Simulate one player. categories is [(difficulty, words)]; returns (guesses, time_taken, is_won).
+    """
+    remaining = sorted(categories, key=lambda category: category[0])
+    hardest = max(difficulty for difficulty, _ in categories)
+    guesses, time_taken = [], []
+    mistakes = 0
+    while remaining and mistakes < MAX_MISTAKES:
+        # Mostly the easiest category left, sometimes a harder one
+        target = remaining[0] if rng.random() < 0.7 or len(remaining) == 1 else rng.choice(remaining[1:])
+        difficulty, words = target
+        relative = (difficulty - 1) / max(hardest - 1, 1)
+        slowdown = 1 + relative + 0.3 * mistakes
+        time_taken.append(round(rng.lognormvariate(math.log(MEDIAN_GUESS_SECONDS * slowdown), 0.6), 2))
+        if len(remaining) == 1 or rng.random() < skill * (1 - 0.5 * relative) + 0.15:
+            guess = rng.sample(words, len(words))
+            remaining.remove(target)
+        else:
+            decoy = rng.choice([words for _, words in remaining if words is not target[1]])
+            guess = rng.sample(words, len(words) - 1) + [rng.choice(decoy)]
+            rng.shuffle(guess)
+            mistakes += 1
+        guesses.append(guess)
+    return guesses, time_taken, not remaining
+
+def submitted_at(rng, now, days):
+    moment = now - timedelta(days=rng.randrange(days))
+    hour = rng.choice(BUSY_HOURS) if rng.random() < 0.7 else rng.randrange(24)
+    moment = timezone.localtime(moment).replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+    return min(moment, now)
+
+def generate(courses=1, games_per_course=10, num_categories=4, words_per_category=4,
+             submissions_per_game=100, days=30, seed=0, batch_size=2000) -> dict:
+    """
+    Create courses with published games and played submissions, then rebuild the guess group
+    counts of the new games. The same seed on an empty database gives the same data.
+    Returns how many of each were created.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    with transaction.atomic():
+        start = Course.objects.count()
+        new_courses = Course.objects.bulk_create([
+            Course(name=f'synthetic course {start + i}', description='Synthetic data') for i in range(courses)
+        ])
+
+        def create_games(codes):
+            codes = iter(codes)
+            return ConnectionsGame.objects.bulk_create([
+                ConnectionsGame(title=f'Synthetic game {index}', game_code=next(codes), author='generate_synthetic_data',
+                                num_categories=num_categories, words_per_category=words_per_category,
+                                course=course, published=True)
+                for course in new_courses for index in range(games_per_course)
+            ])
+
+        games = create_with_game_codes(courses * games_per_course, create_games)
+        categories = Category.objects.bulk_create([
+            Category(related_game=game, category=f'Category {i}', difficulty=i + 1, explanation=f'Explanation {i}')
+            for game in games for i in range(num_categories)
+        ], batch_size=batch_size)
+        words = Word.objects.bulk_create([
+            Word(category=category, word=f'{category.related_game.game_code.lower()}-{category.difficulty}-{j}')
+            for category in categories for j in range(words_per_category)
+        ], batch_size=batch_size)
+
+    category_words = defaultdict(list)
+    for word in words:
+        category_words[word.category.pk].append(word.word)
+    answers = defaultdict(list)
+    for category in categories:
+        answers[category.related_game_id].append((category.difficulty, category_words[category.pk]))
+
+    created = 0
+    pending = []
+    for game in games:
+        for _ in range(submissions_per_game):
+            guesses, time_taken, is_won = play(rng, answers[game.pk], rng.betavariate(4, 3))
+            pending.append(Submission(game=game, guesses=guesses, time_taken=time_taken, is_won=is_won,
+                                      submitted_at=submitted_at(rng, now, days)))
+            if len(pending) >= batch_size:
+                created += len(Submission.objects.bulk_create(prepare_for_storage(pending)))
+                pending = []
+    if pending:
+        created += len(Submission.objects.bulk_create(prepare_for_storage(pending)))
+    rebuild_guess_counts([game.pk for game in games], chunk_size=batch_size)
+
+    return {
+        'courses': len(new_courses),
+        'games': len(games),
+        'categories': len(categories),
+        'words': len(words),
+        'submissions': created,
+    }
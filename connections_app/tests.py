@@ -1,3 +1,1469 @@
-from django.test import TestCase
+import csv
+import glob
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import uuid
 
-# Create your tests here.
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, connections
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from connections_proj import settings as project_settings
+
+from . import metrics
+from .admin import SubmissionCursorPagination
+from .buffer import get_submission_buffer
+from .cache import get_game_payload, invalidate_game_payloads
+from .codes import GAME_CODE_ALPHABET, GAME_CODES, CodeSpace, allocate_game_code, allocate_game_codes, create_with_game_code
+from .importer import parse_unit, write_batch
+from .models import ConnectionsGame, Category, Word, Course, GameCodeCursor, GuessGroupCount, Submission
+from .rollups import refresh_rollups
+from .routers import REPLICA
+from .views import SubmissionViewSet
+
+
+def make_game(game_code, course=None, num_categories=4, words_per_category=4, **kwargs):
+    game = ConnectionsGame.objects.create(
+        title=kwargs.pop('title', f'Game {game_code}'),
+        game_code=game_code,
+        num_categories=num_categories,
+        words_per_category=words_per_category,
+        course=course,
+        **kwargs
+    )
+    add_categories(game, num_categories, words_per_category)
+    return game
+
+
+def add_categories(game, num_categories, words_per_category=4):
+    start = game.categories.count()
+    for i in range(start, start + num_categories):
+        category = Category.objects.create(
+            related_game=game,
+            category=f'Category {i}',
+            difficulty=i + 1,
+            explanation=f'Explanation {i}'
+        )
+        for j in range(words_per_category):
+            Word.objects.create(category=category, word=f'{game.game_code}-{i}-{j}')
+
+
+def submit(client, game_code, guesses, times=None, won=False):
+    return client.post('/api/submit-stats/', {
+        'gameCode': game_code,
+        'submittedGuesses': guesses,
+        'timeToGuess': times if times is not None else [1] * len(guesses),
+        'isGameWon': won,
+    }, format='json')
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be scanned sequentially
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def make_games(count, course=None, prefix='G'):
+    return [make_game(f'{prefix}{i:03d}'[:4], course=course) for i in range(count)]
+
+
+class QueryCountTests(TestCase):
+    """
+    Every endpoint that serializes games must cost the same number of queries
+    no matter how many games, categories or words end up in the response.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.course = Course.objects.create(name='csc108', description='Intro')
+
+    def count_queries(self, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 300, response.content)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, method, url, grow, **kwargs):
+        small = self.count_queries(method, url, **kwargs)
+        grow()
+        large = self.count_queries(method, url, **kwargs)
+        self.assertEqual(small, large)
+
+    def test_connectionsgames_list(self):
+        make_games(1, self.course, prefix='A')
+        self.assertConstantQueries(
+            'get', '/api/connectionsgames/?page_size=10',
+            lambda: make_games(9, self.course, prefix='B'))
+
+    def test_game_by_code(self):
+        game = make_game('CODE', self.course, num_categories=1, words_per_category=1)
+        self.assertConstantQueries(
+            'get', '/api/games/code/CODE/',
+            lambda: add_categories(game, 3) or invalidate_game_payloads('CODE'))
+
+    def test_categories_list(self):
+        make_games(1, self.course, prefix='A')
+        self.assertConstantQueries(
+            'get', '/api/categories/?page_size=40',
+            lambda: make_games(4, self.course, prefix='B'))
+
+    def test_admin_games_list(self):
+        self.client.force_authenticate(self.admin)
+        make_games(1, self.course, prefix='A')
+        self.assertConstantQueries(
+            'get', '/admin-tools/games/',
+            lambda: make_games(9, self.course, prefix='B'))
+
+    def test_assign_game_to_course(self):
+        self.client.force_authenticate(self.admin)
+        game = make_game('ASGN', self.course, num_categories=1, words_per_category=1)
+        self.assertConstantQueries(
+            'put', '/admin-tools/assign/ASGN/',
+            lambda: add_categories(game, 3),
+            data={'course': 'csc108'}, format='json')
+
+    def test_course_catalog(self):
+        make_games(1, self.course, prefix='A')
+        def grow():
+            other = Course.objects.create(name='csc148', description='Intro 2')
+            make_games(3, self.course, prefix='B')
+            make_games(3, other, prefix='C')
+        self.assertConstantQueries('get', '/api/courses/', grow)
+
+    def test_course_catalog_summary(self):
+        make_games(1, self.course, prefix='A')
+        self.assertConstantQueries(
+            'get', '/api/courses/?summary=true&page_size=5',
+            lambda: make_games(5, self.course, prefix='B'))
+
+
+class CourseCatalogTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.course = Course.objects.create(name='csc108', description='Intro')
+        make_game('ABCD', self.course)
+
+    def test_full_catalog_is_unpaginated_list(self):
+        response = self.client.get('/api/courses/')
+        self.assertEqual(response.status_code, 200)
+        course = next(c for c in response.data if c['name'] == 'csc108')
+        self.assertEqual(course['games'][0]['game_code'], 'ABCD')
+        self.assertEqual(len(course['games'][0]['game'][0]['words']), 4)
+
+    def test_summary_omits_words(self):
+        response = self.client.get('/api/courses/?summary=true')
+        course = next(c for c in response.data if c['name'] == 'csc108')
+        self.assertEqual(course['games'][0]['game_code'], 'ABCD')
+        self.assertNotIn('game', course['games'][0])
+
+    def test_paginated_catalog(self):
+        for i in range(3):
+            Course.objects.create(name=f'extra{i}', description='')
+        response = self.client.get('/api/courses/?page_size=2')
+        self.assertEqual(response.data['count'], Course.objects.count())
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+
+class GamePayloadCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.course = Course.objects.create(name='csc108', description='Intro')
+        self.game = make_game('CACH', self.course)
+
+    def fetch(self):
+        response = self.client.get('/api/games/code/CACH/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_repeat_fetch_is_served_from_cache(self):
+        first = self.fetch()
+        with self.assertNumQueries(0):
+            second = self.fetch()
+        self.assertEqual(first, second)
+
+    def test_unknown_code_is_not_cached(self):
+        self.assertEqual(self.client.get('/api/games/code/NONE/').data, [])
+        self.assertIsNone(get_game_payload('NONE'))
+
+    def test_publish_invalidates(self):
+        self.assertFalse(self.fetch()[0]['published'])
+        self.client.force_authenticate(self.admin)
+        self.client.put('/admin-tools/publish/CACH/')
+        self.assertTrue(self.fetch()[0]['published'])
+
+    def test_assign_invalidates(self):
+        self.fetch()
+        Course.objects.create(name='csc148', description='')
+        self.client.force_authenticate(self.admin)
+        self.client.put('/admin-tools/assign/CACH/', {'course': 'csc148'}, format='json')
+        self.assertEqual(self.fetch()[0]['course']['name'], 'csc148')
+
+    def test_admin_update_invalidates(self):
+        self.fetch()
+        self.client.force_authenticate(self.admin)
+        self.client.patch(f'/admin-tools/games/{self.game.pk}/', {'title': 'Renamed'}, format='json')
+        self.assertEqual(self.fetch()[0]['title'], 'Renamed')
+
+    def test_course_update_invalidates(self):
+        self.fetch()
+        self.client.force_authenticate(self.admin)
+        self.client.patch(f'/admin-tools/courses/{self.course.pk}/', {'description': 'Changed'}, format='json')
+        self.assertEqual(self.fetch()[0]['course']['description'], 'Changed')
+
+    def test_admin_destroy_invalidates(self):
+        self.fetch()
+        self.client.force_authenticate(self.admin)
+        self.client.delete(f'/admin-tools/games/{self.game.pk}/')
+        self.assertEqual(self.client.get('/api/games/code/CACH/').data, [])
+
+    def test_remove_command_invalidates(self):
+        self.fetch()
+        call_command('remove_connections_game', self.game.pk, stdout=StringIO())
+        self.assertIsNone(get_game_payload('CACH'))
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.course = Course.objects.create(name='csc108', description='Intro')
+        self.game = make_game('ETAG', self.course)
+
+    def test_game_not_modified(self):
+        response = self.client.get('/api/games/code/ETAG/')
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        cache.clear()
+        # Only the version lookup runs; the payload is never serialized
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/games/code/ETAG/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_game_etag_changes_on_publish(self):
+        etag = self.client.get('/api/games/code/ETAG/')['ETag']
+        self.client.force_authenticate(self.admin)
+        self.client.put('/admin-tools/publish/ETAG/')
+        response = self.client.get('/api/games/code/ETAG/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_game_etag_changes_on_course_update(self):
+        etag = self.client.get('/api/games/code/ETAG/')['ETag']
+        self.client.force_authenticate(self.admin)
+        self.client.patch(f'/admin-tools/courses/{self.course.pk}/', {'name': 'csc110'}, format='json')
+        response = self.client.get('/api/games/code/ETAG/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_catalog_not_modified(self):
+        etag = self.client.get('/api/courses/')['ETag']
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        summary_etag = self.client.get('/api/courses/?summary=true')['ETag']
+        self.assertNotEqual(summary_etag, etag)
+
+        make_game('NEWG', self.course)
+        response = self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class GuessDistributionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.game = make_game('DIST')
+        self.submissions = [
+            [['b', 'a', 'c', 'd'], ['e', 'f', 'g', 'h']],
+            [['a', 'b', 'c', 'd'], ['a', 'b', 'c', 'd']],
+            [['h', 'g', 'f', 'e']],
+        ]
+        for guesses in self.submissions:
+            self.assertEqual(submit(self.client, 'DIST', guesses).status_code, 201)
+
+    def get_distribution(self):
+        response = self.client.get('/stats/guessdist/DIST/')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+
+    def test_distribution_counts_sorted_groups(self):
+        self.assertEqual(self.get_distribution(), {
+            str(('a', 'b', 'c', 'd')): 3,
+            str(('e', 'f', 'g', 'h')): 2,
+        })
+
+    def test_distribution_cost_does_not_depend_on_submissions(self):
+        with CaptureQueriesContext(connection) as before:
+            self.get_distribution()
+        for _ in range(20):
+            submit(self.client, 'DIST', [['a', 'b', 'c', 'd']])
+        with CaptureQueriesContext(connection) as after:
+            self.get_distribution()
+        self.assertEqual(len(before.captured_queries), len(after.captured_queries))
+
+    def test_no_submissions(self):
+        make_game('NOSB')
+        self.assertEqual(self.client.get('/stats/guessdist/NOSB/').status_code, 400)
+
+    def test_rebuild_command_matches_incremental_counts(self):
+        expected = self.get_distribution()
+        Submission.objects.create(game=self.game, guesses=[['d', 'c', 'b', 'a']], time_taken=[1])
+        GuessGroupCount.objects.filter(game=self.game).update(count=0)
+        call_command('rebuild_guess_counts', 'DIST', stdout=StringIO())
+        expected[str(('a', 'b', 'c', 'd'))] += 1
+        self.assertEqual(self.get_distribution(), expected)
+
+
+class TimeDistributionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.game = make_game('TIME', num_categories=2, words_per_category=2)
+        self.first = ['TIME-0-0', 'TIME-0-1']
+        self.second = ['TIME-1-0', 'TIME-1-1']
+
+    def get_distribution(self):
+        response = self.client.get('/stats/timedist/TIME/')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)['guess distribution']
+
+    def test_times_are_taken_from_the_matching_guess(self):
+        wrong = ['TIME-0-0', 'TIME-1-0']
+        submit(self.client, 'TIME', [wrong, list(reversed(self.first)), wrong, self.second], [5, 10, 3, 20])
+        submit(self.client, 'TIME', [self.second, self.first], [30, 40])
+        self.assertEqual(self.get_distribution(), {
+            str(tuple(sorted(self.first))): [25.0, 2],
+            str(tuple(sorted(self.second))): [25.0, 2],
+        })
+
+    def test_short_time_arrays_are_ignored(self):
+        submit(self.client, 'TIME', [self.first, self.second], [7])
+        self.assertEqual(self.get_distribution(), {str(tuple(sorted(self.first))): [7.0, 1]})
+
+    @override_settings(STATS_CHUNK_SIZE=2)
+    def test_streams_across_chunks(self):
+        for time_value in range(1, 6):
+            submit(self.client, 'TIME', [self.first], [time_value])
+        self.assertEqual(self.get_distribution(), {str(tuple(sorted(self.first))): [3.0, 5]})
+
+    def test_query_count_does_not_depend_on_categories(self):
+        submit(self.client, 'TIME', [self.first], [1])
+        with CaptureQueriesContext(connection) as before:
+            self.get_distribution()
+        add_categories(self.game, 6)
+        with CaptureQueriesContext(connection) as after:
+            self.get_distribution()
+        self.assertEqual(len(before.captured_queries), len(after.captured_queries))
+
+
+def game_data(num_categories=4, words_per_category=4, **overrides):
+    data = {
+        'title': 'Uploaded',
+        'author': 'Someone',
+        'course': 'CSC108',
+        'syntax_highlighting': 'python',
+        'num_categories': num_categories,
+        'words_per_category': words_per_category,
+        'relevant_info': '',
+        'game': [
+            {
+                'category': f'Category {i}',
+                'difficulty': i + 1,
+                'explanation': f'Explanation {i}',
+                'words': [f'word-{i}-{j}' for j in range(words_per_category)],
+            }
+            for i in range(num_categories)
+        ],
+    }
+    data.update(overrides)
+    return data
+
+
+class UploadTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def upload(self, data):
+        return self.client.post('/api/upload/', data, format='json')
+
+    def test_public_upload_creates_game(self):
+        response = self.upload(game_data())
+        self.assertEqual(response.status_code, 200)
+        game = ConnectionsGame.objects.get()
+        self.assertFalse(game.published)
+        self.assertEqual(game.course.name, 'csc108')
+        self.assertIn(game.game_code, response.data['message'])
+        self.assertEqual(Word.objects.filter(category__related_game=game).count(), 16)
+
+    def test_public_upload_query_count_does_not_depend_on_size(self):
+        Course.objects.create(name='csc108', description='')
+        with CaptureQueriesContext(connection) as small:
+            self.upload(game_data(2, 2))
+        with CaptureQueriesContext(connection) as large:
+            self.upload(game_data(8, 8))
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_invalid_upload_writes_nothing(self):
+        data = game_data()
+        del data['game'][2]['words']
+        response = self.upload(data)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ConnectionsGame.objects.exists())
+        self.assertFalse(Course.objects.filter(name='csc108').exists())
+
+    def test_admin_upload_requires_existing_course(self):
+        self.client.force_authenticate(self.admin)
+        upload = SimpleUploadedFile('game.json', json.dumps(game_data()).encode(), content_type='application/json')
+        response = self.client.post('/admin-tools/create/', {'file_uploaded': upload}, format='multipart')
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(ConnectionsGame.objects.exists())
+
+        Course.objects.create(name='csc108', description='')
+        upload.seek(0)
+        response = self.client.post('/admin-tools/create/', {'file_uploaded': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(ConnectionsGame.objects.get().published)
+
+
+class ImportGameDataTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        directory = os.path.join(self.tmp.name, 'games')
+        os.mkdir(directory)
+        for i in range(2):
+            with open(os.path.join(directory, f'game{i}.json'), 'w') as file:
+                json.dump(game_data(title=f'File {i}'), file)
+        with open(os.path.join(directory, 'more.jsonl'), 'w') as file:
+            for i in range(3):
+                file.write(json.dumps(game_data(title=f'Line {i}', course='csc148')) + '\n')
+            file.write('{"title": "broken"}\n')
+        self.directory = directory
+
+    def run_import(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_game_data', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_imports_directory_and_reports_failures(self):
+        out, err = self.run_import(self.directory, '--workers', '0', '--batch-size', '2')
+        self.assertEqual(ConnectionsGame.objects.count(), 5)
+        self.assertEqual(Word.objects.count(), 5 * 16)
+        self.assertEqual(Course.objects.get(name='csc148').games.count(), 3)
+        self.assertIn('Imported 5 games', out)
+        self.assertIn('more.jsonl:4', err)
+        codes = ConnectionsGame.objects.values_list('game_code', flat=True)
+        self.assertEqual(len(set(codes)), 5)
+
+    def test_rerun_is_idempotent(self):
+        self.run_import(self.directory, '--workers', '0')
+        out, _ = self.run_import(os.path.join(self.directory, '*.json*'), '--workers', '2')
+        self.assertEqual(ConnectionsGame.objects.count(), 5)
+        self.assertIn('Imported 0 games (5 already present', out)
+
+
+class GameCodeAllocatorTests(TestCase):
+    def test_permutation_covers_the_space(self):
+        space = CodeSpace()
+        codes = {space.code_at(position) for position in range(space.size)}
+        self.assertEqual(len(codes), space.size)
+        self.assertTrue(all(len(code) == 4 and set(code) <= set(GAME_CODE_ALPHABET) for code in codes))
+
+    def test_allocation_cost_does_not_grow_with_table(self):
+        with CaptureQueriesContext(connection) as empty:
+            allocate_game_code()
+        make_games(20)
+        with CaptureQueriesContext(connection) as filled:
+            allocate_game_code()
+        self.assertEqual(len(empty.captured_queries), len(filled.captured_queries))
+
+    def test_skips_codes_assigned_elsewhere(self):
+        space = CodeSpace('BCD', 2)
+        legacy = [space.code_at(position) for position in range(3)]
+        for code in legacy:
+            make_game(code, num_categories=0)
+        codes = allocate_game_codes(4, space)
+        self.assertEqual(len(set(codes)), 4)
+        self.assertFalse(set(codes) & set(legacy))
+
+    def test_saturation(self):
+        space = CodeSpace('BCD', 2)
+        make_game(space.code_at(5), num_categories=0)
+        codes = allocate_game_codes(space.size - 2, space)
+        for code in codes:
+            make_game(code, num_categories=0)
+        # Exactly one code is left, wherever the cursor happens to be
+        last = allocate_game_code(space)
+        self.assertNotIn(last, codes)
+        make_game(last, num_categories=0)
+        with self.assertRaises(ValidationError):
+            allocate_game_code(space)
+
+    def test_deleted_codes_are_reused_after_wrapping(self):
+        space = CodeSpace('BC', 2)
+        codes = allocate_game_codes(space.size, space)
+        for code in codes:
+            make_game(code, num_categories=0)
+        ConnectionsGame.objects.get(game_code=codes[1]).delete()
+        self.assertEqual(allocate_game_code(space), codes[1])
+
+
+class GameCodeRaceTests(TransactionTestCase):
+    """
+    Two writers on their own connections, so the other one's game is really committed.
+    """
+    def setUp(self):
+        self.space = CodeSpace('BC', 2)
+        self.codes = allocate_game_codes(self.space.size, self.space)
+
+    def in_other_connection(self, work):
+        def run():
+            try:
+                work()
+            finally:
+                connection.close()
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+
+    def test_callers_after_wrapping_can_get_the_same_code(self):
+        for code in self.codes[:3]:
+            make_game(code, num_categories=0)
+        codes = []
+        self.in_other_connection(lambda: codes.append(allocate_game_code(self.space)))
+        codes.append(allocate_game_code(self.space))
+        self.assertEqual(codes, [self.codes[3], self.codes[3]])
+
+    def test_create_retries_when_another_writer_takes_the_code(self):
+        for code in self.codes[:2]:
+            make_game(code, num_categories=0)
+        attempted = []
+
+        def create(game_code):
+            attempted.append(game_code)
+            if len(attempted) == 1:
+                # Another upload, handed the same code, commits it first
+                self.in_other_connection(lambda: make_game(game_code, num_categories=0))
+            return make_game(game_code, num_categories=0)
+
+        game = create_with_game_code(create, self.space)
+        self.assertEqual(len(attempted), 2)
+        self.assertEqual(game.game_code, attempted[1])
+        self.assertEqual(set(ConnectionsGame.objects.values_list('game_code', flat=True)), set(self.codes))
+
+    def test_import_batch_retries_with_new_codes(self):
+        allocated = []
+
+        def allocate(count, space=GAME_CODES):
+            allocated.append(allocate_game_codes(count, space))
+            if len(allocated) == 1:
+                # An upload commits one of the batch's codes first
+                self.in_other_connection(lambda: make_game(allocated[0][1], num_categories=0))
+            return allocated[-1]
+
+        parsed = [game for i in range(3)
+                  for game in parse_unit(('text', f'line {i}', json.dumps(game_data(title=f'Import {i}'))))]
+        with mock.patch('connections_app.codes.allocate_game_codes', allocate):
+            stats = write_batch(parsed)
+        self.assertEqual((stats.imported, len(allocated)), (3, 2))
+        self.assertEqual(set(ConnectionsGame.objects.filter(title__startswith='Import').values_list('game_code', flat=True)),
+                         set(allocated[1]))
+
+
+class BufferedSubmissionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.game = make_game('BUFF')
+        overrides = override_settings(SUBMISSION_WRITE_MODE='buffered', SUBMISSION_BUFFER_DIR=self.tmp.name,
+                                      SUBMISSION_BUFFER_MAX_BATCH=3, SUBMISSION_BUFFER_MAX_DELAY=3600,
+                                      SUBMISSION_BUFFER_FSYNC=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_flushes_in_batches(self):
+        for _ in range(2):
+            self.assertEqual(submit(self.client, 'BUFF', [['a', 'b']]).status_code, 201)
+        self.assertFalse(Submission.objects.exists())
+        submit(self.client, 'BUFF', [['b', 'a']])
+        self.assertEqual(Submission.objects.filter(game=self.game).count(), 3)
+        self.assertEqual(GuessGroupCount.objects.get(game=self.game).count, 3)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_unknown_game_is_rejected_before_buffering(self):
+        self.assertEqual(submit(self.client, 'NONE', [['a']]).status_code, 400)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_recovers_orphaned_spool_files_once(self):
+        submit(self.client, 'BUFF', [['a', 'b']])
+        get_submission_buffer().rotate()
+        buffered = os.listdir(self.tmp.name)[0]
+        # Pretend the worker that owned the spool file died, after one of its records was written
+        orphan = os.path.join(self.tmp.name, 'submissions-999999999-0.log')
+        os.rename(os.path.join(self.tmp.name, buffered), orphan)
+        with open(orphan) as file:
+            record = json.loads(file.readline())
+        Submission.objects.create(game=self.game, guesses=record['guesses'], time_taken=record['time_taken'],
+                                  buffer_id=record['id'])
+        with open(orphan, 'a') as file:
+            file.write(json.dumps(dict(record, id=str(uuid.uuid4()))) + '\n')
+            file.write('{"torn": ')
+
+        out = StringIO()
+        call_command('flush_submissions', stdout=out)
+        self.assertIn('Wrote 1 buffered submissions', out.getvalue())
+        self.assertEqual(Submission.objects.filter(game=self.game).count(), 2)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+
+class BatchSubmissionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.first = make_game('BAT1')
+        self.second = make_game('BAT2')
+
+    def item(self, game_code, guesses, **overrides):
+        return dict({'gameCode': game_code, 'submittedGuesses': guesses,
+                     'timeToGuess': [1] * len(guesses), 'isGameWon': False}, **overrides)
+
+    def post_batch(self, items):
+        return self.client.post('/api/submit-stats/batch/', items, format='json')
+
+    def test_reports_each_item(self):
+        response = self.post_batch([
+            self.item('BAT1', [['a', 'b']]),
+            self.item('NONE', [['a', 'b']]),
+            self.item('BAT2', [['b', 'a']], isGameWon='maybe'),
+            'not a submission',
+            self.item('BAT2', [['b', 'a']], isGameWon=True),
+        ])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['success', 'error', 'error', 'error', 'success'])
+        self.assertIn('is_won', response.data['results'][2]['errors'])
+        self.assertEqual(Submission.objects.filter(game=self.first).count(), 1)
+        self.assertTrue(Submission.objects.get(game=self.second).is_won)
+        self.assertEqual(GuessGroupCount.objects.get(game=self.second).guess_group, ['a', 'b'])
+
+    def test_non_string_game_codes_are_item_errors(self):
+        response = self.post_batch([self.item(['BAT1'], [['a']]), self.item({}, [['a']]), self.item('BAT1', [['a']])])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([result['status'] for result in response.data['results']], ['error', 'error', 'success'])
+
+    def test_storage_failure_is_an_error_response(self):
+        with mock.patch.object(SubmissionViewSet, 'save_submissions', side_effect=DatabaseError('disk full')):
+            response = self.post_batch([self.item('BAT1', [['a']])])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'status': 'error', 'message': 'disk full'})
+
+    def test_wrapped_list_and_all_success(self):
+        response = self.client.post('/api/submit-stats/batch/', {'submissions': [self.item('BAT1', [['a']])]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Submission.objects.count(), 1)
+
+    def test_rejects_malformed_and_oversized_batches(self):
+        self.assertEqual(self.post_batch({'gameCode': 'BAT1'}).status_code, 400)
+        with override_settings(SUBMISSION_BATCH_MAX_SIZE=2):
+            self.assertEqual(self.post_batch([self.item('BAT1', [])] * 3).status_code, 400)
+        self.assertFalse(Submission.objects.exists())
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        def count(size):
+            items = [self.item(('BAT1', 'BAT2')[i % 2], [['a', 'b'], ['c', 'd']]) for i in range(size)]
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.post_batch(items).status_code, 201)
+            return len(ctx.captured_queries)
+        self.assertEqual(count(2), count(50))
+        self.assertEqual(Submission.objects.count(), 52)
+
+    def test_buffered_mode_spools_the_batch(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+                SUBMISSION_WRITE_MODE='buffered', SUBMISSION_BUFFER_DIR=directory, SUBMISSION_BUFFER_MAX_BATCH=100,
+                SUBMISSION_BUFFER_MAX_DELAY=3600, SUBMISSION_BUFFER_FSYNC=False):
+            self.assertEqual(self.post_batch([self.item('BAT1', [['a']]), self.item('BAT2', [['a']])]).status_code, 201)
+            self.assertFalse(Submission.objects.exists())
+            self.assertEqual(get_submission_buffer().flush(), 2)
+        self.assertEqual(Submission.objects.count(), 2)
+
+
+class CompactStorageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.game = make_game('PACK')
+        self.categories = [[f'PACK-{i}-{j}' for j in range(4)] for i in range(4)]
+        self.guesses = [['PACK-0-0', 'PACK-1-1', 'PACK-2-2', 'PACK-3-3'], list(reversed(self.categories[1])),
+                        self.categories[0], self.categories[2]]
+        self.times = [4, 12.5, 30.25, 41]
+
+    def stats(self):
+        return (self.client.get('/stats/guessdist/PACK/').data, self.client.get('/stats/timedist/PACK/').data)
+
+    def listed(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/admin-tools/listsubmissions/')
+        self.client.force_authenticate(None)
+        return [(row['guesses'], row['time_taken']) for row in response.data['results']]
+
+    def test_compact_rows_decode_transparently(self):
+        submit(self.client, 'PACK', self.guesses, self.times)
+        json_stats = self.stats()
+        with override_settings(SUBMISSION_STORAGE='compact'):
+            submit(self.client, 'PACK', self.guesses, self.times)
+        json_row, compact_row = Submission.objects.order_by('id')
+        self.assertIsNone(compact_row.guesses)
+        self.assertIsNone(compact_row.time_taken)
+        self.assertEqual(len(compact_row.guess_masks) + len(compact_row.time_ms), 2 * 4 + 4 * 4)
+
+        sorted_guesses = [sorted(guess_group) for guess_group in self.guesses]
+        self.assertEqual(self.listed(), [(self.guesses, self.times), (sorted_guesses, self.times)])
+        # Every count and time doubles, so averages are unchanged
+        guess_counts, time_distribution = self.stats()
+        self.assertEqual(json.loads(guess_counts), {key: 2 * count for key, count in json.loads(json_stats[0]).items()})
+        self.assertEqual({key: value[0] for key, value in json.loads(time_distribution)['guess distribution'].items()},
+                         {key: value[0] for key, value in json.loads(json_stats[1])['guess distribution'].items()})
+
+        call_command('rebuild_guess_counts', stdout=StringIO())
+        self.assertEqual(self.stats()[0], guess_counts)
+
+    def test_unencodable_rows_keep_json(self):
+        with override_settings(SUBMISSION_STORAGE='compact'):
+            submit(self.client, 'PACK', [['PACK-0-0', 'not a word']], ['slow'])
+        submission = Submission.objects.get()
+        self.assertEqual((submission.guesses, submission.time_taken), ([['PACK-0-0', 'not a word']], ['slow']))
+        self.assertIsNone(submission.guess_masks)
+
+    def test_vocabulary_is_frozen(self):
+        with override_settings(SUBMISSION_STORAGE='compact'):
+            submit(self.client, 'PACK', self.guesses, self.times)
+        add_categories(self.game, 1)
+        cache.clear()
+        self.assertEqual(self.listed()[0][0], [sorted(guess_group) for guess_group in self.guesses])
+
+    def test_command_converts_existing_rows_both_ways(self):
+        submit(self.client, 'PACK', self.guesses, self.times)
+        before = self.stats()
+        out = StringIO()
+        call_command('compact_submissions', stdout=out)
+        self.assertIn('Converted 1 submissions', out.getvalue())
+        self.assertIsNotNone(Submission.objects.get().guess_masks)
+        self.assertEqual(self.stats(), before)
+
+        call_command('compact_submissions', '--expand', stdout=StringIO())
+        submission = Submission.objects.get()
+        self.assertIsNone(submission.guess_masks)
+        self.assertEqual(submission.guesses, [sorted(guess_group) for guess_group in self.guesses])
+        self.assertEqual(submission.time_taken, self.times)
+
+    def test_admin_edit_moving_game_stores_json(self):
+        other = make_game('MOVE')
+        with override_settings(SUBMISSION_STORAGE='compact'):
+            submit(self.client, 'PACK', self.guesses, self.times)
+        submission = Submission.objects.get()
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(f'/admin-tools/listsubmissions/{submission.pk}/', {'game': other.pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        submission.refresh_from_db()
+        self.assertEqual(submission.guesses, [sorted(guess_group) for guess_group in self.guesses])
+        self.assertIsNone(submission.guess_masks)
+
+
+class StatsWindowTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.game = make_game('WIND', num_categories=2, words_per_category=2)
+        self.first = ['WIND-0-0', 'WIND-0-1']
+        lecture = datetime(2026, 10, 17, 10, 0, tzinfo=dt_timezone.utc)
+        for hours, won, time_value in ((-24, True, 50), (0, True, 10), (0.5, False, 20), (2, True, 90)):
+            submit(self.client, 'WIND', [self.first], [time_value], won=won)
+            Submission.objects.filter(pk=Submission.objects.latest('id').pk).update(
+                submitted_at=lecture + timedelta(hours=hours))
+        self.window = {'since': '2026-10-17T10:00:00Z', 'until': '2026-10-17T11:00:00Z'}
+
+    def test_count_window_uses_one_aggregate(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/stats/count/WIND/', self.window)
+        self.assertEqual(response.data, {'submission_count': 2, 'wins': 1})
+        self.assertEqual(len([query for query in ctx.captured_queries if 'connections_app_submission' in query['sql']]), 1)
+        self.assertEqual(self.client.get('/stats/count/WIND/').data, {'submission_count': 4, 'wins': 3})
+        self.assertEqual(self.client.get('/stats/count/WIND/', {'since': '2026-10-17'}).data,
+                         {'submission_count': 3, 'wins': 2})
+
+    def test_distributions_respect_window(self):
+        key = str(tuple(sorted(self.first)))
+        timedist = json.loads(self.client.get('/stats/timedist/WIND/', self.window).data)
+        self.assertEqual(timedist['guess distribution'], {key: [15.0, 2]})
+        guessdist = json.loads(self.client.get('/stats/guessdist/WIND/', self.window).data)
+        self.assertEqual(guessdist, {key: 2})
+        self.assertEqual(json.loads(self.client.get('/stats/guessdist/WIND/').data), {key: 4})
+        self.assertEqual(self.client.get('/stats/guessdist/WIND/', {'since': '2027-01-01'}).status_code, 400)
+
+    def test_invalid_window_is_rejected(self):
+        for params in ({'since': 'yesterday'}, {'until': '2026-13-40'}):
+            response = self.client.get('/stats/count/WIND/', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['status'], 'error')
+
+    async def test_async_count_window(self):
+        response = await AsyncClient().get('/async/stats/count/WIND/', self.window)
+        self.assertEqual(response.json(), {'submission_count': 2, 'wins': 1})
+
+    def assertUsesIndex(self, url, params, index_name):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url, params)
+        queries = [query['sql'] for query in ctx.captured_queries
+                   if 'FROM "connections_app_submission"' in query['sql'] and 'EXISTS' not in query['sql']]
+        self.assertTrue(queries)
+        for sql in queries:
+            plan = explain(sql)
+            self.assertIn(index_name, plan)
+            self.assertNotRegex(plan, r'SCAN "?connections_app_submission"?\b(?! USING)|Seq Scan')
+
+    def test_stats_queries_use_composite_indexes(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('EXPLAIN output is only checked on SQLite and PostgreSQL')
+        self.assertUsesIndex('/stats/count/WIND/', self.window, 'submission_game_time_idx')
+        self.assertUsesIndex('/stats/timedist/WIND/', self.window, 'submission_game_time_idx')
+        self.assertUsesIndex('/stats/count/WIND/', {}, 'submission_game_won_idx')
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.course = Course.objects.create(name='csc108', description='Intro')
+        self.first = make_game('ROL1', course=self.course)
+        self.second = make_game('ROL2', course=self.course)
+        self.start = datetime(2026, 9, 17, 14, 0, tzinfo=dt_timezone.utc)  # 10:00 in Toronto
+
+    def add(self, game, minutes, won=False, times=(10, 20)):
+        return Submission.objects.create(game=game, guesses=[], time_taken=list(times), is_won=won,
+                                         submitted_at=self.start + timedelta(minutes=minutes))
+
+    def refresh(self, minutes, **kwargs):
+        return refresh_rollups(now=self.start + timedelta(minutes=minutes), lag=timedelta(minutes=5), **kwargs)
+
+    def series(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [{key: bucket[key] for key in ('submissions', 'wins', 'average_solve_time')} for bucket in response.data['buckets']]
+
+    def test_incremental_refresh(self):
+        self.add(self.first, 0, won=True)
+        self.add(self.first, 30, won=True, times=(40,))
+        self.add(self.second, 65)
+        self.assertEqual(self.refresh(68), 2)
+        # The submission at 65 minutes is still inside the lag
+        self.assertEqual(self.series('/stats/rollups/ROL1/', period='hour'),
+                         [{'submissions': 2, 'wins': 2, 'average_solve_time': 35.0}])
+        self.assertEqual(self.series('/stats/rollups/ROL2/', period='hour'), [])
+
+        self.add(self.first, 66, won=True, times=(5,))
+        self.assertEqual(self.refresh(90), 2)
+        self.assertEqual(self.refresh(90), 0)
+        self.assertEqual(self.series('/stats/rollups/ROL1/', period='hour'), [
+            {'submissions': 2, 'wins': 2, 'average_solve_time': 35.0},
+            {'submissions': 1, 'wins': 1, 'average_solve_time': 5.0},
+        ])
+        self.assertEqual(self.series(f'/stats/rollups/course/{self.course.pk}/'),
+                         [{'submissions': 4, 'wins': 3, 'average_solve_time': 25.0}])
+        self.assertEqual(self.series('/stats/rollups/ROL1/', period='hour', since='2026-09-17T15:00:00Z'),
+                         [{'submissions': 1, 'wins': 1, 'average_solve_time': 5.0}])
+
+    def test_day_buckets_use_local_time(self):
+        self.add(self.first, -60 * 12)  # 22:00 on the 16th in Toronto, already the 17th in UTC
+        self.add(self.first, 0)
+        self.refresh(60)
+        buckets = self.client.get('/stats/rollups/ROL1/').data['buckets']
+        self.assertEqual([bucket['bucket'].date().isoformat() for bucket in buckets], ['2026-09-16', '2026-09-17'])
+
+    def test_rebuild_picks_up_deletions(self):
+        doomed = self.add(self.first, 0)
+        self.add(self.first, 1)
+        self.refresh(60)
+        doomed.delete()
+        out = StringIO()
+        with override_settings(ROLLUP_LAG_SECONDS=0):
+            call_command('refresh_rollups', '--rebuild', stdout=out)
+        self.assertIn('Rolled up 1 submissions', out.getvalue())
+        self.assertEqual(self.series('/stats/rollups/ROL1/'), [{'submissions': 1, 'wins': 0, 'average_solve_time': None}])
+
+    def test_read_cost_does_not_depend_on_submissions(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(f'/stats/rollups/course/{self.course.pk}/', {'period': 'hour'})
+            return len(ctx.captured_queries)
+        self.add(self.first, 0)
+        self.refresh(60)
+        before = count_queries()
+        for minutes in range(61, 200, 7):
+            self.add(self.first if minutes % 2 else self.second, minutes, won=True)
+        self.refresh(300)
+        self.assertEqual(count_queries(), before)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/stats/rollups/ROL1/', {'period': 'week'}).status_code, 400)
+        self.assertEqual(self.client.get('/stats/rollups/NONE/').status_code, 404)
+        self.assertEqual(self.client.get('/stats/rollups/course/999/').status_code, 404)
+
+
+class AdminSubmissionListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.course = Course.objects.create(name='csc108', description='Intro')
+        self.first = make_game('ADM1', course=self.course)
+        self.second = make_game('ADM2')
+        start = datetime(2026, 9, 1, tzinfo=dt_timezone.utc)
+        # Pairs of submissions share a timestamp, like a buffered batch does
+        Submission.objects.bulk_create([
+            Submission(game=self.first if i % 3 else self.second, guesses=[], time_taken=[], submitted_at=start + timedelta(hours=i // 2))
+            for i in range(30)
+        ])
+        self.ordered = list(Submission.objects.order_by('submitted_at', 'id').values_list('id', flat=True))
+
+    def walk(self, url, params, direction='next'):
+        ids, pages, queries = [], 0, []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, params if pages == 0 else None)
+            self.assertEqual(response.status_code, 200)
+            page = [row['id'] for row in response.data['results']]
+            ids = ids + page if direction == 'next' else page + ids
+            queries.append([query['sql'] for query in ctx.captured_queries if 'connections_app_submission' in query['sql']])
+            url = response.data[direction]
+            pages += 1
+        return ids, pages, queries
+
+    def test_walks_forward_and_back_without_gaps(self):
+        ids, pages, queries = self.walk('/admin-tools/listsubmissions/', {'page_size': 4})
+        self.assertEqual(ids, self.ordered)
+        self.assertEqual(pages, 8)
+        self.assertEqual({len(page_queries) for page_queries in queries}, {1})
+        self.assertNotIn('OFFSET', queries[-1][0])
+
+        last_page = self.client.get('/admin-tools/listsubmissions/', {'page_size': 4, 'cursor': self.cursor_after(self.ordered[-3])})
+        back, _, _ = self.walk(last_page.data['previous'], None, direction='previous')
+        self.assertEqual(back + [row['id'] for row in last_page.data['results']], self.ordered)
+
+    def cursor_after(self, submission_id):
+        submission = Submission.objects.get(pk=submission_id)
+        return SubmissionCursorPagination().encode_cursor([submission.submitted_at, submission.pk], False)
+
+    def test_filters(self):
+        ids, _, _ = self.walk('/admin-tools/listsubmissions/', {'game_code': 'ADM2', 'page_size': 3})
+        self.assertEqual(ids, [pk for pk in self.ordered if Submission.objects.get(pk=pk).game_id == self.second.pk])
+        ids, _, _ = self.walk('/admin-tools/listsubmissions/', {'course': self.course.pk, 'since': '2026-09-01T03:00:00Z',
+                                                                 'until': '2026-09-01T06:00:00Z'})
+        expected = Submission.objects.filter(game__course=self.course,
+                                             submitted_at__gte=datetime(2026, 9, 1, 3, tzinfo=dt_timezone.utc),
+                                             submitted_at__lt=datetime(2026, 9, 1, 6, tzinfo=dt_timezone.utc))
+        self.assertEqual(ids, list(expected.order_by('submitted_at', 'id').values_list('id', flat=True)))
+        self.assertEqual(self.client.get('/admin-tools/listsubmissions/', {'since': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get('/admin-tools/listsubmissions/', {'cursor': 'garbage'}).status_code, 404)
+
+    def test_deep_pages_use_the_index(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('EXPLAIN output is only checked on SQLite and PostgreSQL')
+        for params, index_name in (({}, 'submission_time_id_idx'), ({'game_code': 'ADM1'}, 'submission_game_time_idx')):
+            params = dict(params, page_size=2, cursor=self.cursor_after(self.ordered[20]))
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get('/admin-tools/listsubmissions/', params)
+            sql = next(query['sql'] for query in ctx.captured_queries if 'FROM "connections_app_submission"' in query['sql'])
+            plan = explain(sql)
+            self.assertIn(index_name, plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+class PublicCursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.course = Course.objects.create(name='csc108', description='Intro')
+        make_games(5, self.course)
+
+    def walk(self, url, params):
+        results, queries = [], []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, params if not results else None)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            results += response.data['results']
+            queries.append([query['sql'] for query in ctx.captured_queries])
+            url = response.data['next']
+        return results, queries
+
+    def test_words_in_cursor_mode(self):
+        results, queries = self.walk('/api/words/', {'pagination': 'cursor', 'page_size': 7})
+        self.assertEqual([row['word'] for row in results], list(Word.objects.order_by('id').values_list('word', flat=True)))
+        for page_queries in queries:
+            self.assertEqual(len(page_queries), 1)
+            self.assertNotIn('COUNT(', page_queries[0])
+            self.assertNotIn('OFFSET', page_queries[0])
+
+    def test_deep_game_page_costs_the_same(self):
+        results, queries = self.walk('/api/connectionsgames/', {'cursor': '', 'page_size': 2})
+        self.assertEqual([game['game_code'] for game in results],
+                         list(ConnectionsGame.objects.order_by('id').values_list('game_code', flat=True)))
+        self.assertEqual(len({len(page_queries) for page_queries in queries}), 1)
+
+    def test_setting_selects_default_mode(self):
+        self.assertIn('count', self.client.get('/api/categories/').data)
+        with override_settings(PUBLIC_PAGINATION_MODE='cursor'):
+            self.assertNotIn('count', self.client.get('/api/categories/').data)
+            self.assertIn('count', self.client.get('/api/categories/', {'page': 2}).data)
+
+    def test_course_catalog_cursor(self):
+        Course.objects.create(name='csc148', description='Intro 2')
+        response = self.client.get('/api/courses/', {'pagination': 'cursor', 'page_size': 1, 'summary': 'true'})
+        self.assertEqual([course['name'] for course in response.data['results']], ['csc108'])
+        self.assertEqual(len(response.data['results'][0]['games']), 5)
+        self.assertEqual(self.client.get(response.data['next']).data['results'][0]['name'], 'csc148')
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.course = Course.objects.create(name='csc108', description='Intro')
+        self.game = make_game('EXP1', course=self.course)
+        make_game('EXP2')
+        submit(self.client, 'EXP1', [['EXP1-0-1', 'EXP1-0-0']], [2.5], won=True)
+        with override_settings(SUBMISSION_STORAGE='compact'):
+            submit(self.client, 'EXP1', [['EXP1-1-0', 'EXP1-1-1', 'EXP1-1-2', 'EXP1-1-3']], [7])
+        submit(self.client, 'EXP2', [['x']], [1])
+
+    def export(self, **params):
+        response = self.client.get('/admin-tools/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_ndjson_for_one_game(self):
+        response, body = self.export(game_code='EXP1')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([(row['game_code'], row['guesses'], row['time_taken'], row['is_won']) for row in rows], [
+            ('EXP1', [['EXP1-0-1', 'EXP1-0-0']], [2.5], True),
+            ('EXP1', [['EXP1-1-0', 'EXP1-1-1', 'EXP1-1-2', 'EXP1-1-3']], [7], False),
+        ])
+        self.assertEqual(rows[0]['course_id'], self.course.pk)
+
+    def test_gzipped_csv(self):
+        response, body = self.export(output='csv', gzip='true')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('submissions.csv.gz', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(body).decode())))
+        self.assertEqual([row['game_code'] for row in rows], ['EXP1', 'EXP1', 'EXP2'])
+        self.assertEqual(json.loads(rows[2]['guesses']), [['x']])
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.client.get('/admin-tools/export/', {'output': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get('/admin-tools/export/', {'since': 'later'}).status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/admin-tools/export/').status_code, 403)
+
+    def test_command_matches_endpoint(self):
+        _, body = self.export(course=self.course.pk)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.ndjson.gz')
+            call_command('export_submissions', '--course', str(self.course.pk), '--gzip', '--output', path, stderr=StringIO())
+            with gzip.open(path) as file:
+                self.assertEqual(file.read(), body)
+        out = StringIO()
+        call_command('export_submissions', '--format', 'csv', '--game-code', 'EXP2', stdout=out)
+        self.assertEqual(out.getvalue().splitlines()[0], 'id,game_code,course_id,submitted_at,is_won,guesses,time_taken')
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+
+class CourseAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.course = Course.objects.create(name='csc108', description='Intro')
+        self.game = make_game('ANA1', course=self.course)
+        make_game('ANA2', course=self.course)
+        make_game('ANA3')
+        solved = lambda i: [f'ANA1-{i}-{j}' for j in range(4)]
+        submit(self.client, 'ANA1', [solved(0), solved(1), solved(2), solved(3)], [1, 2, 3, 4], won=True)
+        with override_settings(SUBMISSION_STORAGE='compact'):
+            submit(self.client, 'ANA1', [solved(0), solved(1), solved(3), solved(2)], [2, 2, 2, 2.5], won=True)
+        submit(self.client, 'ANA1', [solved(0), ['ANA1-1-0', 'ANA1-2-0', 'ANA1-3-0', 'ANA1-1-1']], [5, 5])
+        submit(self.client, 'ANA3', [['ANA3-0-0']], [1], won=True)
+
+    def analytics(self, course_id):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/stats/course/{course_id}/')
+        return response, len(ctx.captured_queries)
+
+    def test_per_game_analytics(self):
+        response, _ = self.analytics(self.course.pk)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['submissions'], data['wins'], data['win_rate']), (3, 2, 0.6667))
+        first, second = data['games']
+        self.assertEqual((first['game_code'], first['submissions'], first['wins']), ('ANA1', 3, 2))
+        self.assertEqual(first['mean_solve_time'], 9.25)
+        self.assertEqual([(c['category'], c['solved']) for c in first['hardest_categories']], [
+            ('Category 3', 2), ('Category 2', 2), ('Category 1', 2), ('Category 0', 3),
+        ])
+        self.assertEqual(first['hardest_categories'][-1]['solve_rate'], 1.0)
+        self.assertEqual((second['game_code'], second['submissions'], second['win_rate'], second['mean_solve_time']),
+                         ('ANA2', 0, None, None))
+
+    def test_query_count_is_fixed(self):
+        _, queries = self.analytics(self.course.pk)
+        for game in make_games(5, course=self.course, prefix='M'):
+            submit(self.client, game.game_code, [[f'{game.game_code}-0-{j}' for j in range(4)]], [1], won=True)
+        response, more_games = self.analytics(self.course.pk)
+        self.assertEqual(len(response.json()['games']), 7)
+        # The course lookup plus course_analytics' five
+        self.assertEqual(queries, 6)
+        self.assertEqual(queries, more_games)
+
+    def test_unknown_course(self):
+        response, _ = self.analytics(self.course.pk + 100)
+        self.assertEqual(response.status_code, 404)
+
+
+class SyntheticDataTests(TestCase):
+    def test_generates_played_games(self):
+        out = StringIO()
+        call_command('generate_synthetic_data', '--courses', '2', '--games', '3', '--submissions', '40', '--seed', '7', stdout=out)
+        self.assertIn('2 courses, 6 games, 24 categories, 96 words, 240 submissions', out.getvalue())
+        self.assertEqual(Course.objects.get(name='synthetic course 0').games.filter(published=True).count(), 3)
+
+        for submission in Submission.objects.all():
+            self.assertEqual(len(submission.guesses), len(submission.time_taken))
+            self.assertTrue(all(len(guess) == 4 and len(set(guess)) == 4 for guess in submission.guesses))
+            self.assertLessEqual(submission.submitted_at, timezone.now())
+        wins = Submission.objects.filter(is_won=True).count()
+        self.assertTrue(0 < wins < 240)
+        self.assertEqual(sum(GuessGroupCount.objects.values_list('count', flat=True)),
+                         sum(len(submission.guesses) for submission in Submission.objects.all()))
+
+    def test_same_seed_same_data(self):
+        rows = []
+        for _ in range(2):
+            Course.objects.all().delete()
+            ConnectionsGame.objects.all().delete()
+            GameCodeCursor.objects.all().delete()
+            call_command('generate_synthetic_data', '--games', '2', '--submissions', '5', stdout=StringIO())
+            rows.append(list(Submission.objects.order_by('id').values_list('game__game_code', 'guesses', 'time_taken', 'is_won')))
+        self.assertEqual(rows[0], rows[1])
+
+    def test_rejects_bad_sizes(self):
+        with self.assertRaises(CommandError):
+            call_command('generate_synthetic_data', '--categories', '1', stdout=StringIO())
+
+
+class RequestTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.game = make_game('TIME')
+        submit(APIClient(), 'TIME', [['TIME-0-0', 'TIME-0-1']], [2])
+
+    @staticmethod
+    def server_timing(response):
+        metrics = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_header_counts_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = APIClient().get('/stats/timedist/TIME/')
+        metrics = self.server_timing(response)
+        self.assertEqual(metrics['db']['desc'], f'"{len(ctx.captured_queries)} queries"')
+        self.assertGreaterEqual(float(metrics['total']['dur']), float(metrics['db']['dur']))
+
+    def test_logs_slow_requests(self):
+        with override_settings(SLOW_REQUEST_MS=0.001, SLOW_REQUEST_TOP_QUERIES=2):
+            with self.assertLogs('connections_proj.middleware', 'WARNING') as logs:
+                APIClient().get('/stats/count/TIME/')
+        message, = logs.output
+        self.assertIn('GET /stats/count/TIME/ -> 200', message)
+        self.assertEqual(message.count(' ms in 1 x SELECT'), 2)
+
+        with override_settings(SLOW_REQUEST_MS=0, REQUEST_TIMING_HEADER=False), self.assertNoLogs('connections_proj.middleware'):
+            self.assertNotIn('Server-Timing', APIClient().get('/stats/count/TIME/'))
+
+    async def test_async_views_are_counted(self):
+        response = await AsyncClient().get('/async/stats/count/TIME/')
+        self.assertEqual(response.json(), {'submission_count': 1, 'wins': 0})
+        # The game lookup and the count, both run in sync_to_async threads
+        self.assertEqual(self.server_timing(response)['db']['desc'], '"2 queries"')
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings_override = override_settings(METRICS_DIR=self.directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        make_game('MTRC')
+
+    def scrape(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/admin-tools/metrics/')
+        self.client.force_authenticate(None)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        samples = {}
+        for line in response.content.decode().splitlines():
+            if not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+        return samples
+
+    def test_counts_requests_submissions_and_cache(self):
+        self.client.get('/api/games/code/MTRC/')
+        self.client.get('/api/games/code/MTRC/')
+        submit(self.client, 'MTRC', [['MTRC-0-0']])
+        self.client.post('/api/submit-stats/batch/', [{'gameCode': 'MTRC', 'submittedGuesses': [['x']],
+                                                       'timeToGuess': [1], 'isGameWon': False}] * 2, format='json')
+        samples = self.scrape()
+
+        route = 'method="GET",route="game-code-detail-list",status="200"'
+        self.assertEqual(samples[f'connections_http_requests_total{{{route}}}'], 2)
+        self.assertEqual(samples[f'connections_http_request_duration_seconds_count{{{route}}}'], 2)
+        self.assertEqual(samples[f'connections_http_request_duration_seconds_bucket{{{route},le="+Inf"}}'], 2)
+        self.assertEqual(samples['connections_http_requests_total{method="POST",route="app_submit-batch",status="201"}'], 1)
+        self.assertEqual(samples['connections_submissions_ingested_total{mode="sync"}'], 3)
+        # The first view misses; the second view and the single submission hit
+        self.assertEqual(samples['connections_cache_requests_total{cache="game_payload",result="miss"}'], 1)
+        self.assertEqual(samples['connections_cache_requests_total{cache="game_payload",result="hit"}'], 2)
+
+    def test_worker_processes_add_up(self):
+        metrics.REQUESTS.inc(route='r', method='GET', status=200)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                metrics.REQUESTS.inc(2, route='r', method='GET', status=200)
+                metrics.REQUEST_LATENCY.observe(0.02, route='r', method='GET', status=200)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        metrics.REQUEST_LATENCY.observe(7, route='r', method='GET', status=200)
+        self.assertEqual(len(glob.glob(os.path.join(self.directory.name, 'metrics-*.db'))), 2)
+
+        samples = self.scrape()
+        labels = 'method="GET",route="r",status="200"'
+        self.assertEqual(samples[f'connections_http_requests_total{{{labels}}}'], 3)
+        self.assertEqual(samples[f'connections_http_request_duration_seconds_bucket{{{labels},le="0.01"}}'], 0)
+        self.assertEqual(samples[f'connections_http_request_duration_seconds_bucket{{{labels},le="0.025"}}'], 1)
+        self.assertEqual(samples[f'connections_http_request_duration_seconds_bucket{{{labels},le="10"}}'], 2)
+        self.assertEqual(samples[f'connections_http_request_duration_seconds_sum{{{labels}}}'], 7.02)
+
+    def test_files_of_exited_processes_are_archived(self):
+        labels = {'route': 'r', 'method': 'GET', 'status': 200}
+
+        def samples_files():
+            return {os.path.basename(path) for path in glob.glob(os.path.join(self.directory.name, 'metrics-*.db'))}
+
+        pids = []
+        for _ in range(2):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    metrics.REQUESTS.inc(2, **labels)
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+            pids.append(pid)
+        # The second worker archived the first one's file when it started its own
+        self.assertEqual(samples_files(), {metrics.ARCHIVE_FILE, f'metrics-{pids[1]}.db'})
+
+        metrics.REQUESTS.inc(**labels)
+        self.assertEqual(samples_files(), {metrics.ARCHIVE_FILE, f'metrics-{os.getpid()}.db'})
+        self.assertEqual(metrics.collect()[metrics.sample_key('connections_http_requests_total', labels)], 5)
+
+    def test_samples_file_grows_and_reopens(self):
+        for index in range(1000):
+            metrics.CACHE_REQUESTS.inc(index, cache=f'cache-{index}', result='hit')
+        path = os.path.join(self.directory.name, f'metrics-{os.getpid()}.db')
+        self.assertGreater(os.path.getsize(path), metrics.INITIAL_SIZE)
+        reopened = metrics.MetricsFile(path)
+        reopened.add(metrics.sample_key('connections_cache_requests_total', {'cache': 'cache-999', 'result': 'hit'}), 1)
+        self.assertEqual(metrics.collect()[metrics.sample_key(
+            'connections_cache_requests_total', {'cache': 'cache-999', 'result': 'hit'})], 1000)
+
+    def test_admin_only(self):
+        self.assertEqual(self.client.get('/admin-tools/metrics/').status_code, 403)
+
+
+class DatabaseConnectionSettingsTests(TestCase):
+    database = {'ENGINE': 'django.db.backends.postgresql', 'NAME': 'connections', 'OPTIONS': {'sslmode': 'require'}}
+
+    def test_modes(self):
+        closed = project_settings.with_connection_settings(self.database, 'close')
+        self.assertEqual((closed['CONN_MAX_AGE'], closed['CONN_HEALTH_CHECKS']), (0, False))
+        persistent = project_settings.with_connection_settings(self.database, 'persistent')
+        self.assertEqual((persistent['CONN_MAX_AGE'], persistent['CONN_HEALTH_CHECKS']),
+                         (project_settings.DB_CONN_MAX_AGE, project_settings.DB_CONN_HEALTH_CHECKS))
+        self.assertEqual(persistent['OPTIONS'], {'sslmode': 'require'})
+        with self.assertRaises(ImproperlyConfigured):
+            project_settings.with_connection_settings(self.database, 'sometimes')
+
+    def test_asgi_refuses_persistent_connections(self):
+        with mock.patch.object(project_settings, 'SERVER_INTERFACE', 'asgi'):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'ASGI'):
+                project_settings.with_connection_settings(self.database, 'persistent')
+            self.assertEqual(project_settings.with_connection_settings(self.database, 'close')['CONN_MAX_AGE'], 0)
+
+    def test_pool_mode(self):
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            with self.assertRaisesMessage(ImproperlyConfigured, 'psycopg[binary,pool]'):
+                project_settings.with_connection_settings(self.database, 'pool')
+            return
+        pooled = project_settings.with_connection_settings(self.database, 'pool')
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertEqual(pooled['OPTIONS']['pool']['max_size'], project_settings.DB_POOL_MAX_SIZE)
+        self.assertEqual(pooled['OPTIONS']['sslmode'], 'require')
+        self.assertNotIn('pool', self.database['OPTIONS'])
+
+
+class ReplicaRoutingTests(TestCase):
+    """
+    A second SQLite database stands in for the replica. It never gets the primary's rows, which
+    shows where each read went.
+    """
+    @classmethod
+    def setUpClass(cls):
+        # Only listed here, not on the class, as the test runner checks the class's databases exist
+        # before this runs
+        cls.databases = {'default', REPLICA}
+        handle, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.settings[REPLICA] = connections.configure_settings({
+            'default': connections.settings['default'],
+            REPLICA: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': cls.replica_path},
+        })[REPLICA]
+        # The router keeps migrations off the replica, which in production gets its schema by replication
+        with override_settings(DATABASE_ROUTERS=[]):
+            call_command('migrate', database=REPLICA, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        os.remove(cls.replica_path)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        course = Course.objects.using(REPLICA).create(name='Replica', description='')
+        for game_code, title in (('REPL', 'Replica'), ('LAGS', 'Stale')):
+            ConnectionsGame.objects.using(REPLICA).create(game_code=game_code, title=title, num_categories=4,
+                                                          words_per_category=4, course=course)
+        make_game('PRIM')
+        make_game('LAGS')
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.client.get('/stats/count/REPL/').data, {'submission_count': 0, 'wins': 0})
+        titles = {game['title'] for game in self.client.get('/api/connectionsgames/').data['results']}
+        self.assertEqual(titles, {'Replica', 'Stale'})
+
+    def test_not_found_on_replica_is_retried_on_primary(self):
+        # E.g. stats for a game uploaded before the replica caught up
+        self.assertEqual(self.client.get('/stats/count/PRIM/').status_code, 200)
+        self.assertEqual(self.client.get('/stats/count/NONE/').status_code, 404)
+
+    def test_games_by_code_render_from_primary(self):
+        self.assertEqual(self.client.get('/api/games/code/LAGS/').data[0]['title'], 'Game LAGS')
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.put('/admin-tools/publish/LAGS/').status_code, 200)
+        self.client.force_authenticate(None)
+        self.assertTrue(self.client.get('/api/games/code/LAGS/').data[0]['published'])
+        self.assertEqual(get_game_payload('LAGS')['data']['title'], 'Game LAGS')
+        self.assertEqual(self.client.get('/api/games/code/REPL/').data, [])
+
+    async def test_async_reads(self):
+        client = AsyncClient()
+        self.assertEqual((await client.get('/async/stats/count/REPL/')).status_code, 200)
+        self.assertEqual((await client.get('/async/stats/count/PRIM/')).status_code, 200)
+        self.assertEqual((await client.get('/async/stats/count/NONE/')).status_code, 404)
+        self.assertEqual((await client.get('/async/games/code/LAGS/')).json()[0]['title'], 'Game LAGS')
+
+    def test_writes_go_to_primary(self):
+        response = self.client.post('/api/submit-stats/', {
+            'gameCode': 'PRIM', 'submittedGuesses': [['a', 'b']], 'timeToGuess': [3], 'isGameWon': True,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Submission.objects.using('default').count(), 1)
+        self.assertEqual(Submission.objects.using(REPLICA).count(), 0)
+
+
+class AsyncEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.game = make_game('ASYN')
+
+    async def test_game_by_code_matches_sync_endpoint(self):
+        client = AsyncClient()
+        response = await client.get('/async/games/code/ASYN/')
+        self.assertEqual(response.status_code, 200)
+        sync_response = await sync_to_async(APIClient().get)('/api/games/code/ASYN/')
+        self.assertEqual(response.json(), json.loads(json.dumps(sync_response.data)))
+        self.assertEqual(response['ETag'], sync_response['ETag'])
+
+        response = await client.get('/async/games/code/ASYN/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual((await client.get('/async/games/code/NONE/')).json(), [])
+
+    async def test_submit_and_count(self):
+        client = AsyncClient()
+        response = await client.post('/async/submit-stats/', {
+            'gameCode': 'ASYN', 'submittedGuesses': [['a', 'b']], 'timeToGuess': [3], 'isGameWon': True,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(await GuessGroupCount.objects.filter(game=self.game).acount(), 1)
+
+        response = await client.get('/async/stats/count/ASYN/')
+        self.assertEqual(response.json(), {'submission_count': 1, 'wins': 1})
+
+        response = await client.post('/async/submit-stats/', {'gameCode': 'NONE'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((await client.get('/async/stats/count/NONE/')).status_code, 404)
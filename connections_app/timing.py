@@ -0,0 +1,91 @@
+from numbers import Number
+
+from collections import defaultdict
+
+from .compact import TIME_FORMAT, decode_submission, mask_format, unpack
+from .models import Word
+
+def build_answer_key(game) -> dict:
+    """
+    Map each correct category's word set to its sorted word tuple, in a single query.
+    """
+    words_by_category = defaultdict(list)
+    for category_id, word in Word.objects.filter(category__related_game=game).values_list('category_id', 'word'):
+        words_by_category[category_id].append(word)
+    return {frozenset(words): tuple(sorted(words)) for words in words_by_category.values()}
+
+def guess_time_distribution(rows, answer_key) -> dict:
+    """
+    Average solve time and solve count per correct category, in one pass over rows.
+
+    rows yields (guesses, time_taken) pairs, where time_taken[i] is the time of guesses[i].
+    Each guess is matched against the answer key by hash, so the cost is linear in the
+    total number of guesses.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for guesses, time_taken in rows:
+        add_guess_times(totals, guesses, time_taken, answer_key)
+    return average_times(totals)
+
+def stored_time_distribution(rows, answer_key, vocabulary=None) -> dict:
+    """
+    guess_time_distribution over (guesses, time_taken, guess_masks, time_ms) rows as stored.
+
+    Fully compact rows (see compact.py) are matched as integers: each guess mask is looked up
+    among the category masks and times are summed in milliseconds, with nothing decoded.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    mask_totals = defaultdict(lambda: [0, 0])
+    mask_key = mask_answer_key(answer_key, vocabulary) if vocabulary is not None else {}
+    code = mask_format(len(vocabulary)) if vocabulary is not None else None
+    for guesses, time_taken, guess_masks, time_ms in rows:
+        if guesses is None and time_taken is None and code is not None:
+            for mask, milliseconds in zip(unpack(code, guess_masks), unpack(TIME_FORMAT, time_ms)):
+                category = mask_key.get(mask)
+                if category is not None:
+                    total = mask_totals[category]
+                    total[0] += milliseconds
+                    total[1] += 1
+        else:
+            guesses, time_taken = decode_submission(guesses, time_taken, guess_masks, time_ms, vocabulary)
+            add_guess_times(totals, guesses, time_taken, answer_key)
+
+    for category, (total_milliseconds, count) in mask_totals.items():
+        total = totals[category]
+        total[0] += total_milliseconds / 1000
+        total[1] += count
+    return average_times(totals)
+
+def mask_answer_key(answer_key, vocabulary) -> dict:
+    """
+    Map each correct category's mask over the vocabulary to its sorted word tuple.
+    """
+    word_bits = {word: bit for bit, word in enumerate(vocabulary)}
+    mask_key = {}
+    for words, category in answer_key.items():
+        if all(word in word_bits for word in words):
+            mask_key[sum(1 << word_bits[word] for word in words)] = category
+    return mask_key
+
+def add_guess_times(totals, guesses, time_taken, answer_key) -> None:
+    if not guesses or not time_taken:
+        return
+    num_times = len(time_taken)
+    for index, guess_group in enumerate(guesses):
+        if index >= num_times:
+            break
+        try:
+            category = answer_key.get(frozenset(guess_group))
+        except TypeError:
+            continue
+        if category is None or len(guess_group) != len(category):
+            continue
+        time_value = time_taken[index]
+        if not isinstance(time_value, Number):
+            continue
+        total = totals[category]
+        total[0] += time_value
+        total[1] += 1
+
+def average_times(totals) -> dict:
+    return {category: (round(total_time / count, 2), count) for category, (total_time, count) in totals.items()}
@@ -17,13 +17,20 @@ from .admin import (
     AdminSubmissionsViewSet,
     PublishGameViewSet,
     AdminCourseViewSet,
-    AssignGameToCourseViewSet
+    AssignGameToCourseViewSet,
+    SubmissionExportViewSet,
+    MetricsViewSet
 )
 
+from . import async_views
+
 from .stats import (
     GuessDistributionView,
     AverageTimePerCategoryView,
-    SubmissionCountView
+    SubmissionCountView,
+    GameRollupView,
+    CourseRollupView,
+    CourseAnalyticsView
 )
 
 api_router = DefaultRouter()
@@ -42,6 +49,8 @@ admin_router.register(r'listsubmissions', AdminSubmissionsViewSet, basename='adm
 admin_router.register(r'publish', PublishGameViewSet, basename='admin_publish')
 admin_router.register(r'courses', AdminCourseViewSet, basename='admin_courses')
 admin_router.register(r'assign', AssignGameToCourseViewSet, basename='admin_assign')
+admin_router.register(r'export', SubmissionExportViewSet, basename='admin_export')
+admin_router.register(r'metrics', MetricsViewSet, basename='admin_metrics')
 
 urlpatterns = [
     path('api/', include(api_router.urls)),
@@ -49,4 +58,10 @@ urlpatterns = [
     path('stats/guessdist/<str:game_code>/', GuessDistributionView.as_view(), name='guess_distribution'),
     path('stats/timedist/<str:game_code>/', AverageTimePerCategoryView.as_view(), name='average_time_per_category'),
     path('stats/count/<str:game_code>/', SubmissionCountView.as_view(), name='submission_count'),
+    path('stats/course/<int:course_id>/', CourseAnalyticsView.as_view(), name='course_analytics'),
+    path('stats/rollups/course/<int:course_id>/', CourseRollupView.as_view(), name='course_rollups'),
+    path('stats/rollups/<str:game_code>/', GameRollupView.as_view(), name='game_rollups'),
+    path('async/games/code/<str:game_code>/', async_views.game_by_code, name='async_game_code_detail'),
+    path('async/submit-stats/', async_views.submit, name='async_submit'),
+    path('async/stats/count/<str:game_code>/', async_views.submission_count, name='async_submission_count'),
 ]
\ No newline at end of file
@@ -1,27 +1,40 @@
-import random
-
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch
 from django.shortcuts import get_object_or_404
 from django.http import Http404
 from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from .models import ConnectionsGame, Category, Word, Course
+from .aggregates import record_guesses, record_guesses_batch
+from .buffer import get_submission_buffer
+from .cache import get_game_payload, make_game_entry, set_game_payload
+from .codes import create_with_game_code
+from .compact import prepare_for_storage
+from .conditional import conditional_response
+from .ingest import ingest_game, validate_game_data
+from .metrics import SUBMISSIONS_INGESTED
+from .models import ConnectionsGame, Category, Word, Course, Submission
 from .serializers import (
     CategorySerializer,
     ConnectionsGameSerializer,
+    CourseCatalogSerializer,
+    CourseCatalogSummarySerializer,
     CourseSerializer,
-    SubmissionSerializer,
+    SubmissionPayloadSerializer,
     WordSerializer
 )
-from rest_framework.pagination import PageNumberPagination
+from .pagination import PageOrCursorPagination
+from .routers import ReplicaReadsMixin
 
-class ConnectionsGamePagination(PageNumberPagination):
+class ConnectionsGamePagination(PageOrCursorPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class ConnectionsGameViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = ConnectionsGame.objects.all()
+class ConnectionsGameViewSet(ReplicaReadsMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = ConnectionsGame.objects.with_related().order_by('id')
     serializer_class = ConnectionsGameSerializer
     pagination_class = ConnectionsGamePagination
 
@@ -31,39 +44,72 @@ class ConnectionsGameByCodeViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         game_code = self.kwargs.get('game_code')
         if game_code:
-            return ConnectionsGame.objects.filter(game_code=game_code)
+            return ConnectionsGame.objects.with_related().filter(game_code=game_code)
         else:
             return ConnectionsGame.objects.none()
 
+    def get_cached_game(self):
+        # Rendered games are cached by code along with their version, so a warm cache answers
+        # both full and conditional requests without a query. See cache.invalidate_game_payloads.
+        if not hasattr(self, '_cached_game'):
+            self._cached_game = get_game_payload(self.kwargs.get('game_code'))
+        return self._cached_game
+
+    def get_game_version(self):
+        cached = self.get_cached_game()
+        if cached is not None:
+            return cached['version']
+        return ConnectionsGame.objects.filter(game_code=self.kwargs.get('game_code')).values_list(
+            'pk', 'updated_at', 'course__updated_at').first()
+
+    def get_game_payload(self):
+        cached = self.get_cached_game()
+        if cached is None:
+            game = get_object_or_404(self.get_queryset())
+            cached = make_game_entry(game, self.get_serializer(game).data)
+            set_game_payload(self.kwargs.get('game_code'), cached)
+        return cached['data']
+
+    def list(self, request, *args, **kwargs):
+        version = self.get_game_version()
+        if version is None:
+            return Response([])
+        return conditional_response(request, ('list',) + version, max(filter(None, version[1:])),
+                                    lambda: Response([self.get_game_payload()]))
+
     def retrieve(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        game = get_object_or_404(queryset)
-        serializer = self.get_serializer(game)
-        return Response(serializer.data)
+        version = self.get_game_version()
+        if version is None:
+            raise Http404
+        return conditional_response(request, ('retrieve',) + version, max(filter(None, version[1:])),
+                                    lambda: Response(self.get_game_payload()))
 
-class CategoryPagination(PageNumberPagination):
+class CategoryPagination(PageOrCursorPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Category.objects.all()
+class CategoryViewSet(ReplicaReadsMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Category.objects.prefetch_related('words').order_by('id')
     serializer_class = CategorySerializer
     pagination_class = CategoryPagination
 
-class WordPagination(PageNumberPagination):
+class WordPagination(PageOrCursorPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class WordViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Word.objects.all()
+class WordViewSet(ReplicaReadsMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Word.objects.order_by('id')
     serializer_class = WordSerializer
     pagination_class = WordPagination
 
 class SubmissionViewSet(viewsets.ViewSet):
     """
     A simple ViewSet for handling game submissions.
+
+    With SUBMISSION_WRITE_MODE = 'buffered' submissions are spooled to disk and bulk-inserted
+    in batches instead of being written during the request; see buffer.SubmissionBuffer.
     """
     def create(self, request):
         try:
@@ -74,31 +120,119 @@ class SubmissionViewSet(viewsets.ViewSet):
 
             # Use game code to retrieve the game
             game_code = data.get('gameCode')  # Change from 'gameId' to 'gameCode'
-            game = get_object_or_404(ConnectionsGame, game_code=game_code)  # Fetch game by game code
+            game_id = self.get_game_id(game_code)
 
-            # Save submission to the database using a serializer
-            serializer = SubmissionSerializer(data={
-                'game': game.id,
+            # The game is already resolved, so validate only the submission itself
+            serializer = SubmissionPayloadSerializer(data={
                 'guesses': submitted_guesses,
                 'time_taken': time_to_guess,
                 'is_won': is_game_won
             })
 
             if serializer.is_valid():
-                serializer.save()
+                self.save_submission(game_id, serializer.validated_data)
                 return Response({'status': 'success', 'message': 'Submission successful!'}, status=status.HTTP_201_CREATED)
             else:
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         except Exception as e:
             return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Store many queued submissions, possibly for different games, in one request.
+
+        Accepts a list of submissions shaped like the body of create (or {"submissions": [...]}).
+        Every item is validated on its own; the valid ones are stored together and each gets a
+        result in the response, in request order.
+        """
+        items = request.data.get('submissions') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list):
+            return Response({'status': 'error', 'message': 'Expected a list of submissions.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.SUBMISSION_BATCH_MAX_SIZE:
+            return Response({'status': 'error', 'message': f'At most {settings.SUBMISSION_BATCH_MAX_SIZE} submissions per batch.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        codes = {item.get('gameCode') for item in items if isinstance(item, dict) and isinstance(item.get('gameCode'), str)}
+        game_ids = dict(ConnectionsGame.objects.filter(game_code__in=codes).values_list('game_code', 'pk')) if codes else {}
+
+        results = []
+        valid = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results.append({'index': index, 'status': 'error', 'message': 'Expected an object.'})
+                continue
+            game_code = item.get('gameCode')
+            game_id = game_ids.get(game_code) if isinstance(game_code, str) else None
+            if game_id is None:
+                results.append({'index': index, 'status': 'error', 'message': 'No ConnectionsGame matches the given query.'})
+                continue
+            serializer = SubmissionPayloadSerializer(data={
+                'guesses': item.get('submittedGuesses', []),
+                'time_taken': item.get('timeToGuess', []),
+                'is_won': item.get('isGameWon', False)
+            })
+            if not serializer.is_valid():
+                results.append({'index': index, 'status': 'error', 'errors': serializer.errors})
+                continue
+            results.append({'index': index, 'status': 'success'})
+            valid.append((game_id, serializer.validated_data))
+
+        try:
+            self.save_submissions(valid)
+        except Exception as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if len(valid) == len(items):
+            response_status = status.HTTP_201_CREATED
+        elif valid:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'created': len(valid), 'failed': len(items) - len(valid), 'results': results}, status=response_status)
+
+    @staticmethod
+    def save_submissions(submissions) -> None:
+        """
+        Store many (game_id, validated_data) pairs with one bulk insert.
+        """
+        if not submissions:
+            return
+        if settings.SUBMISSION_WRITE_MODE == 'buffered':
+            get_submission_buffer().extend(submissions)
+        else:
+            with transaction.atomic():
+                Submission.objects.bulk_create(prepare_for_storage(
+                    [Submission(game_id=game_id, **data) for game_id, data in submissions]))
+                record_guesses_batch([(game_id, data['guesses']) for game_id, data in submissions])
+        SUBMISSIONS_INGESTED.inc(len(submissions), mode=settings.SUBMISSION_WRITE_MODE)
+
+    @staticmethod
+    def save_submission(game_id, validated_data) -> None:
+        if settings.SUBMISSION_WRITE_MODE == 'buffered':
+            get_submission_buffer().append(game_id, **validated_data)
+        else:
+            with transaction.atomic():
+                submission = Submission(game_id=game_id, **validated_data)
+                prepare_for_storage([submission])
+                submission.save()
+                record_guesses(game_id, validated_data['guesses'])
+        SUBMISSIONS_INGESTED.inc(mode=settings.SUBMISSION_WRITE_MODE)
+
+    @staticmethod
+    def get_game_id(game_code):
+        # Students submit right after loading the game, so its cached payload usually has the id
+        cached = get_game_payload(game_code) if game_code else None
+        if cached is not None:
+            return cached['version'][0]
+        return get_object_or_404(ConnectionsGame.objects.values_list('pk', flat=True), game_code=game_code)
         
-class CoursePagination(PageNumberPagination):
+class CoursePagination(PageOrCursorPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class CourseViewSet(viewsets.ReadOnlyModelViewSet):
+class CourseViewSet(ReplicaReadsMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     pagination_class = CoursePagination
@@ -116,23 +250,53 @@ class CourseViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
-class CourseGamesViewSet(viewsets.ReadOnlyModelViewSet):
-    serializer_class = CourseSerializer
+class CourseGamesViewSet(ReplicaReadsMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Catalog of every course with its games.
+
+    Pass ?summary=true to leave out categories and words, and ?page / ?page_size (or ?cursor /
+    ?pagination=cursor) to paginate the courses. Without any of them the full, unpaginated
+    catalog is returned.
+    """
+    serializer_class = CourseCatalogSerializer
+    pagination_class = CoursePagination
+
+    def is_summary(self):
+        return self.request.query_params.get('summary', '').lower() in ('1', 'true', 'yes')
+
+    def get_serializer_class(self):
+        if self.is_summary():
+            return CourseCatalogSummarySerializer
+        return CourseCatalogSerializer
 
     def get_queryset(self):
-        return Course.objects.all()
+        games = ConnectionsGame.objects.order_by('id')
+        if not self.is_summary():
+            games = games.prefetch_related('categories__words')
+        return Course.objects.order_by('id').prefetch_related(Prefetch('games', queryset=games))
+
+    def get_catalog_version(self):
+        courses = Course.objects.aggregate(count=Count('id'), updated_at=Max('updated_at'))
+        games = ConnectionsGame.objects.aggregate(count=Count('id'), updated_at=Max('updated_at'))
+        last_modified = max(filter(None, [courses['updated_at'], games['updated_at']]), default=None)
+        version = (self.request.build_absolute_uri(), courses['count'], games['count'],
+                   courses['updated_at'], games['updated_at'])
+        return version, last_modified
 
-    def list(self, request):
-        courses = self.get_queryset()
-        response_data = []
+    def list(self, request, *args, **kwargs):
+        version, last_modified = self.get_catalog_version()
+        return conditional_response(request, version, last_modified, self.render_catalog)
 
-        for course in courses:
-            course_data = CourseSerializer(course).data
-            games = ConnectionsGame.objects.filter(course=course)
-            course_data['games'] = ConnectionsGameSerializer(games, many=True).data
-            response_data.append(course_data)
+    def render_catalog(self):
+        queryset = self.get_queryset()
+        params = self.request.query_params
+        if {'page', 'page_size', 'cursor', 'pagination'} & params.keys():
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
 
-        return Response(response_data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
             
 class PublicUploadViewSet(viewsets.ViewSet):
     def create(self, request):
@@ -148,42 +312,7 @@ class PublicUploadViewSet(viewsets.ViewSet):
             return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     def update_database(self, data) -> str:
-        unique_game_code = self.generate_game_code()
-        try:
-            course_name = data.get('course', 'unassigned').strip().lower()
-            course, _ = Course.objects.get_or_create(name__iexact=course_name)
-            game = ConnectionsGame.objects.create(
-                title=data['title'],
-                game_code=unique_game_code,
-                author=data['author'],
-                syntax_highlighting=data['syntax_highlighting'],
-                num_categories=data['num_categories'],
-                words_per_category=data['words_per_category'],
-                course=course,
-                relevant_info=data.get('relevant_info', "")
-            )
-
-            for category_data in data['game']:
-                category = Category.objects.create(
-                    related_game=game,
-                    category=category_data['category'],
-                    difficulty=category_data['difficulty'],
-                    explanation=category_data['explanation']
-                )
-
-                for word in category_data['words']:
-                    Word.objects.create(
-                        category=category,
-                        word=word
-                    )
-        except Exception as e:
-            raise e
-        return unique_game_code
-    
-    @staticmethod
-    def generate_game_code() -> str:
-        consonants = 'BCDFGHJKLMNPQRSTVWXYZ'  # All uppercase consonants
-        while True:
-            game_code = ''.join(random.choices(consonants, k=4))
-            if not ConnectionsGame.objects.filter(game_code=game_code).exists():
-                return game_code
\ No newline at end of file
+        validate_game_data(data)
+        game = create_with_game_code(lambda game_code: ingest_game(
+            data, game_code, course_name=data.get('course', 'unassigned'), create_course=True))
+        return game.game_code
\ No newline at end of file
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'connections_proj.settings')
+# Lets the settings pick database connection handling that suits ASGI
+os.environ['DJANGO_SERVER_INTERFACE'] = 'asgi'
 
 application = get_asgi_application()
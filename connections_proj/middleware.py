@@ -1,12 +1,119 @@
+import logging
+import time
+
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
 from django.shortcuts import redirect
 
+from connections_app import metrics
+
+logger = logging.getLogger(__name__)
+
 class RedirectLoggedInUserMiddleware:
+    # Works in both modes, so async views stay async under ASGI
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
         # Check if the user is trying to access the login page and is already authenticated
         if request.path == '/backend/admin/' and request.user.is_authenticated:
             return redirect('/backend/admin-tools/')  # Redirect to your specific URL
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+    async def __acall__(self, request):
+        if request.path == '/backend/admin/' and (await request.auser()).is_authenticated:
+            return redirect('/backend/admin-tools/')
+        return await self.get_response(request)
+
+class RequestTimingMiddleware:
+    """
+    Time every request and count its database queries on every connection, then report them in
+    a Server-Timing header (total, db) and log requests slower than SLOW_REQUEST_MS along with
+    the statements that took longest. Also feeds the request count and latency metrics.
+
+    Each query costs two clock reads and a dict update, cheap enough to leave on in production.
+    Queries run while a streaming response is consumed happen after the header is sent and are
+    not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = getattr(settings, 'REQUEST_TIMING_HEADER', True)
+        self.slow_ms = getattr(settings, 'SLOW_REQUEST_MS', 500)
+        self.top_queries = getattr(settings, 'SLOW_REQUEST_TOP_QUERIES', 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = RequestTiming()
+        with timing.wrap_connections():
+            response = self.get_response(request)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        with timing.wrap_connections():
+            response = await self.get_response(request)
+        return self.finish(request, response, timing)
+
+    def finish(self, request, response, timing):
+        elapsed = time.perf_counter() - timing.start
+        total_ms = elapsed * 1000
+        route = request.resolver_match.url_name if request.resolver_match else None
+        metrics.observe_request(route or 'unmatched', request.method, response.status_code, elapsed)
+        if self.header:
+            response['Server-Timing'] = (f'total;dur={total_ms:.1f}, '
+                                         f'db;dur={timing.db_seconds * 1000:.1f};desc="{timing.queries} queries"')
+        if self.slow_ms and total_ms >= self.slow_ms:
+            statements = ''.join(f'\n  {seconds * 1000:.1f} ms in {count} x {sql[:500]}'
+                                 for sql, (count, seconds) in timing.slowest(self.top_queries))
+            logger.warning('Slow request: %s %s -> %s in %.1f ms, %d queries in %.1f ms%s',
+                           request.method, request.get_full_path(), response.status_code, total_ms,
+                           timing.queries, timing.db_seconds * 1000, statements)
+        return response
+
+class RequestTiming:
+    """
+    Query count, database time and per-statement totals of one request.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_seconds += elapsed
+            # Grouped by the SQL text, so an N+1 shows up as one statement run N times
+            count, seconds = self.statements.get(sql, (0, 0.0))
+            self.statements[sql] = (count + 1, seconds + elapsed)
+
+    def wrap_connections(self):
+        stack = ExitStack()
+        for db in connections.all():
+            stack.enter_context(db.execute_wrapper(self))
+        return stack
+
+    def slowest(self, count):
+        return sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)[:count]
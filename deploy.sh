@@ -24,6 +24,8 @@ if [ $LOCAL != $REMOTE ]; then
     python manage.py makemigrations
     python manage.py migrate
     deactivate
+    # Every worker restarts, so start the metrics totals over
+    rm -rf "$REPO_DIR/.metrics"
     sudo systemctl restart apache2
     echo "Deployment completed successfully!" >> "$LOG_FILE"
 else
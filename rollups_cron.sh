@@ -0,0 +1,16 @@
+#!/bin/bash
+
+# Keeps the dashboard rollups current. Run from cron alongside deploy.sh, e.g.
+# */15 * * * * /home/fongetha/connections-api/connections-backend/rollups_cron.sh
+
+REPO_DIR="/home/fongetha/connections-api/connections-backend"
+LOG_FILE="/home/fongetha/connections-api/connections-backend/rollups_cron.log"
+
+# Write the timestamp
+echo "----- $(date) -----" >> "$LOG_FILE"
+
+cd $REPO_DIR
+
+source /home/fongetha/connections-api/connections-backend/venv/bin/activate
+python manage.py refresh_rollups >> "$LOG_FILE" 2>&1
+deactivate